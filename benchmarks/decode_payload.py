@@ -0,0 +1,74 @@
+"""
+Micro-benchmark of Medium response decoding: the old str-based path (decode the body, replace the
+XSSI prefix, json.loads) against decode_payload on bytes, with and without orjson.
+
+    python -m benchmarks.decode_payload [--posts N] [--repeat R]
+"""
+import argparse
+import json
+import timeit
+from unittest.mock import patch
+
+import medium_stats.scraper as scraper
+from medium_stats.scraper import decode_payload
+from medium_stats.scraper import xssi_prefix
+
+
+def stats_page(n_posts):
+
+    record = {
+        "postId": "",
+        "title": "A story about cafés – and other things",
+        "createdAt": 1570229100438,
+        "firstPublishedAt": 1570229100438,
+        "views": 1234,
+        "reads": 567,
+        "claps": 89,
+        "upvotes": 12,
+        "readingTime": 6.283018867924528,
+        "collectionId": "",
+        "isSeries": False,
+    }
+    value = [{**record, "postId": f"{i:012x}"} for i in range(n_posts)]
+    body = {"success": True, "payload": {"value": value, "paging": {"path": "/@user/stats"}}}
+
+    return (xssi_prefix + json.dumps(body)).encode()
+
+
+def legacy_decode(content):
+
+    text = content.decode("utf-8")
+    cleaned = text.replace(xssi_prefix, "")
+    return json.loads(cleaned)["payload"]
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    body = stats_page(args.posts)
+    assert legacy_decode(body) == decode_payload(body)
+    print(f"body: {len(body) / 1024**2:.1f} MB, {args.posts} records, best of {args.repeat}")
+
+    def best(func):
+        return min(timeit.repeat(lambda: func(body), number=1, repeat=args.repeat))
+
+    baseline = best(legacy_decode)
+    print(f"  {'str + replace + json.loads':<32} {baseline * 1000:8.1f} ms")
+
+    with patch.object(scraper, "orjson", None):
+        stdlib = best(decode_payload)
+    print(f"  {'decode_payload (json)':<32} {stdlib * 1000:8.1f} ms  {baseline / stdlib:5.2f}x")
+
+    if scraper.orjson is not None:
+        fast = best(decode_payload)
+        print(f"  {'decode_payload (orjson)':<32} {fast * 1000:8.1f} ms  {baseline / fast:5.2f}x")
+    else:
+        print("  orjson not installed; pip install medium_stats[speedups] for the fast path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Throughput benchmark of every CLI mode against a local mock of medium.com (benchmarks/mock_server.py).
+Each mode runs in its own process; wall time, requests/second and peak RSS are reported per mode.
+
+    python -m benchmarks.harness [--posts N] [--page-size N] [--days N] [--latency SECONDS] \\
+        [--concurrency N] [--batch-size K] [--pipeline] [--json-out PATH] [--baseline PATH [--max-regression R]]
+
+With --baseline, exits non-zero when a mode's wall time, request count or peak RSS grew by more
+than --max-regression (a fraction) over the baseline's --json-out results. The mock's latency
+dominates wall time at the defaults, which keeps results comparable across machines.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_server import MockMediumConfig
+from benchmarks.mock_server import MockMediumServer
+from medium_stats.cli import PUB_MODE_CHOICES
+from medium_stats.cli import USER_MODE_CHOICES
+from medium_stats.scheduler import ScheduledAdapter
+
+# absolute slack per metric, so tiny timings don't flag regressions on noise alone
+REGRESSION_FLOORS = {"wall_seconds": 0.1, "requests": 0, "peak_rss_mb": 5.0}
+
+TARGETS = {"scrape_user": ["-u", "bench"], "scrape_publication": ["-u", "bench", "-s", "bench-pub"]}
+COMMAND_MODES = {"scrape_user": USER_MODE_CHOICES, "scrape_publication": PUB_MODE_CHOICES}
+
+
+class RedirectAdapter(ScheduledAdapter):
+    """Sends requests meant for https://medium.com to the mock server instead"""
+
+    def __init__(self, base_url, **kwargs):
+
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+
+        request.url = request.url.replace("https://medium.com", self.base_url, 1)
+        return super().send(request, **kwargs)
+
+
+def run_child(argv):
+    """Child process: runs one CLI command against the mock server and prints its timings as JSON"""
+
+    from medium_stats.__main__ import build_shared
+    from medium_stats.__main__ import build_store
+    from medium_stats.__main__ import scrape
+    from medium_stats.cli import get_argparser
+    from medium_stats.cli import parse_scraper_args
+
+    base_url, argv = argv[0], argv[1:]
+    parser = get_argparser()
+    args = parse_scraper_args(parser.parse_args(argv), parser)
+    cache, scheduler = build_shared(args)
+    adapter = RedirectAdapter(base_url, scheduler=scheduler, pool_connections=1, pool_maxsize=max(10, args.concurrency))
+
+    store = build_store(args)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scrape(args, cache, scheduler, adapter, store=store)
+    elapsed = time.perf_counter() - started
+    if store:
+        store.close()
+
+    print(json.dumps({"elapsed": elapsed}))
+
+
+def peak_rss_mb(rusage):
+
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1024**2 if sys.platform == "darwin" else 1024
+    return rusage.ru_maxrss / scale
+
+
+def run_mode(server, command, mode, args, work_dir):
+
+    creds = os.path.join(work_dir, "creds.ini")
+    with open(creds, "w") as f:
+        f.write("[bench]\nsid = sid\nuid = uid\n")
+
+    argv = [command, *TARGETS[command], "--creds", creds, "--all", "--mode", mode]
+    argv += ["--output_dir", work_dir, "--no-cache"]
+    argv += ["--concurrency", str(args.concurrency), "--batch-size", str(args.batch_size)]
+    if getattr(args, "pipeline", False):
+        argv.append("--pipeline")
+
+    before = server.counters["requests"]
+    child = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.harness", "--child", server.base_url, *argv], stdout=subprocess.PIPE
+    )
+    output = child.stdout.read()
+    # wait4 gives this child's own resource usage, peak RSS included
+    _, status, rusage = os.wait4(child.pid, 0)
+    if status:
+        raise RuntimeError(f"{command} --mode {mode} failed with wait status {status}")
+
+    elapsed = json.loads(output.splitlines()[-1])["elapsed"]
+    requests = server.counters["requests"] - before
+    return {
+        "command": command,
+        "mode": mode,
+        "wall_seconds": round(elapsed, 4),
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 1),
+        "peak_rss_mb": round(peak_rss_mb(rusage), 1),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Lines describing every mode that regressed against the baseline"""
+
+    previous = {(r["command"], r["mode"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = previous.get((r["command"], r["mode"]))
+        if not before:
+            continue
+        for metric, floor in REGRESSION_FLOORS.items():
+            grown = r[metric] - before[metric]
+            if grown > floor and r[metric] > before[metric] * (1 + max_regression):
+                regressions.append(f'{r["command"]} {r["mode"]}: {metric} {before[metric]} -> {r[metric]}')
+
+    return regressions
+
+
+def get_argparser():
+
+    parser = argparse.ArgumentParser(description="Benchmark every CLI mode against a local mock of medium.com")
+    parser.add_argument("--posts", type=int, default=200, help="posts on the mock account / publication")
+    parser.add_argument("--page-size", type=int, default=50, help="records per summary / overview page")
+    parser.add_argument("--days", type=int, default=30, help="daily stats per post")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the mock server waits per request")
+    parser.add_argument("--commands", nargs="*", choices=list(COMMAND_MODES), default=list(COMMAND_MODES))
+    parser.add_argument("--modes", nargs="*", help="limit to these modes")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--pipeline", action="store_true", help="run the modes with --pipeline")
+    parser.add_argument("--json-out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+
+    return parser
+
+
+def main(argv=None):
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        return run_child(argv[1:])
+
+    args = get_argparser().parse_args(argv)
+    config = MockMediumConfig(posts=args.posts, page_size=args.page_size, days=args.days, latency=args.latency)
+
+    results = []
+    with MockMediumServer(config) as server, tempfile.TemporaryDirectory() as work_dir:
+        for command in args.commands:
+            for mode in COMMAND_MODES[command]:
+                if args.modes and mode not in args.modes:
+                    continue
+                results.append(run_mode(server, command, mode, args, work_dir))
+
+    print(f"{'command':<20} {'mode':<16} {'wall (s)':>9} {'requests':>9} {'req/s':>8} {'peak RSS (MB)':>14}")
+    for r in results:
+        print(
+            f'{r["command"]:<20} {r["mode"]:<16} {r["wall_seconds"]:>9.3f} {r["requests"]:>9} '
+            f'{r["requests_per_second"]:>8.1f} {r["peak_rss_mb"]:>14.1f}'
+        )
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"config": vars(config), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\nRegressions:", *regressions, sep="\n  ")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Startup cost of the CLI entry point, measured with "python -X importtime" in fresh interpreters:
+
+    python -m benchmarks.import_time [--repeat R] [--budget-ms MS] [--top N]
+
+Reports the best cumulative import time of medium_stats.__main__ over R runs and its slowest imports.
+Exits non-zero when that exceeds --budget-ms, or when a module in DEFERRED_MODULES was imported:
+those should only load once a scrape command runs. test/test_benchmarks.py enforces both.
+"""
+import argparse
+import subprocess
+import sys
+
+ENTRY_POINT = "medium_stats.__main__"
+
+# the HTTP stack & HTML parser; imported inside the functions that scrape
+DEFERRED_MODULES = (
+    "requests",
+    "urllib3",
+    "lxml",
+    "medium_stats.scraper",
+    "medium_stats.cache",
+    "medium_stats.scheduler",
+)
+
+# generous for slow CI machines; importing the scraper at startup alone costs more than this
+IMPORT_BUDGET_MS = 100
+
+
+def measure(module=ENTRY_POINT):
+    """{module name: (self µs, cumulative µs)} for every module imported by "import <module>" in a new interpreter"""
+
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stderr
+
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if name.strip() == "site":
+            # everything so far was interpreter startup (site-packages .pth hooks and the like)
+            timings = {}
+            continue
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return timings
+
+
+def entry_point_ms(timings, module=ENTRY_POINT):
+    """Cumulative milliseconds spent importing "module", its parent packages included"""
+
+    parts = module.split(".")
+    packages = {".".join(parts[: i + 1]) for i in range(len(parts))}
+
+    return sum(timings[name][1] for name in packages if name in timings) / 1000
+
+
+def deferred_imports(timings):
+
+    return [m for m in DEFERRED_MODULES if m in timings]
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Import time of the medium-stats CLI entry point")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(args.repeat)]
+    best = min(runs, key=entry_point_ms)
+    elapsed = entry_point_ms(best)
+
+    print(f"{ENTRY_POINT}: {elapsed:.1f} ms (best of {args.repeat}, budget {args.budget_ms:g} ms)")
+    print(f"  {'module':<40} {'self (ms)':>10} {'cumulative (ms)':>16}")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda t: -t[1][0])[: args.top]:
+        print(f"  {name:<40} {self_us / 1000:>10.1f} {cumulative_us / 1000:>16.1f}")
+
+    failures = []
+    if elapsed > args.budget_ms:
+        failures.append(f"import time {elapsed:.1f} ms is over the {args.budget_ms:g} ms budget")
+    deferred = deferred_imports(best)
+    if deferred:
+        failures.append(f"imported at startup: {', '.join(deferred)}")
+    if failures:
+        print("", *failures, sep="\n")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
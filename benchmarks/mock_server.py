@@ -0,0 +1,239 @@
+"""
+Local stand-in for the medium.com endpoints the scraper uses, serving synthetic responses shaped
+like recorded ones (see the example output in the README):
+
+    GET  /@USER/stats                           paginated summary stats
+    GET  /@USER/stats/total/START/STOP          summary events
+    GET  /SLUG                                  publication homepage
+    GET  /SLUG/stats/stories                    paginated story overview
+    GET  /_/api/collections/ID/stats/TYPE       publication views / visitors
+    POST /_/graphql                             StatsPostChart & StatsPostReferrersContainer (+ aliased batches)
+"""
+import json
+import re
+import socketserver
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from medium_stats.scraper import xssi_prefix
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class MockMediumConfig:
+    def __init__(self, posts=100, page_size=50, days=30, referrers=5, latency=0.0):
+
+        self.posts = posts
+        # summary / story overview pages hold page_size records, so pagination depth is posts / page_size
+        self.page_size = page_size
+        self.days = days
+        self.referrers = referrers
+        self.latency = latency
+
+
+def post_id(i):
+
+    return f"{i:012x}"
+
+
+def summary_record(i):
+
+    return {
+        "postId": post_id(i),
+        "title": f"Story {i}",
+        "slug": f"story-{i}",
+        "type": "PostStat",
+        "collectionId": "",
+        "creatorId": "UID",
+        "createdAt": 1570229100438 + i * DAY_MS,
+        "firstPublishedAt": 1583526956495 + i * DAY_MS,
+        "readingTime": 7,
+        "views": 394 + i,
+        "reads": 67,
+        "upvotes": 3,
+        "claps": 3,
+        "internalReferrerViews": 17,
+        "friendsLinkViews": 46,
+        "syndicatedViews": 0,
+        "updateNotificationSubscribers": 0,
+        "isSeries": False,
+        "visibility": 0,
+    }
+
+
+def daily_stats(start, days):
+
+    return [
+        {
+            "__typename": "DailyPostStat",
+            "periodStartedAt": start + d * DAY_MS,
+            "views": 8 + d,
+            "internalReferrerViews": 1,
+            "memberTtr": 119,
+        }
+        for d in range(days)
+    ]
+
+
+def post_chart(pid, start, days):
+
+    return {
+        "__typename": "Post",
+        "id": pid,
+        "dailyStats": daily_stats(start, days),
+        "earnings": {
+            "__typename": "PostEarnings",
+            "dailyEarnings": [
+                {
+                    "__typename": "DailyPostEarning",
+                    "periodStartedAt": start,
+                    "periodEndedAt": start + DAY_MS,
+                    "amount": 3,
+                }
+            ],
+            "lastCommittedPeriodStartedAt": start,
+        },
+    }
+
+
+def post_referrers(pid, n):
+
+    referrers = [
+        {
+            "__typename": "Referrer",
+            "postId": pid,
+            "sourceIdentifier": f"site{r}.com",
+            "totalCount": 10 + r,
+            "type": "SITE",
+            "internal": None,
+            "search": None,
+            "site": {"__typename": "SiteReferrer", "href": f"https://site{r}.com/", "title": None},
+            "platform": None,
+        }
+        for r in range(n)
+    ]
+    return {
+        "__typename": "Post",
+        "id": pid,
+        "title": "TITLE_HERE",
+        "referrers": referrers,
+        "totalStats": {"__typename": "SummaryPostStat", "views": 395},
+    }
+
+
+class MockMediumHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes; without this, delayed ACKs add ~40ms per request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, status=200):
+
+        with self.server.lock:
+            self.server.counters["requests"] += 1
+            self.server.counters["bytes"] += len(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_payload(self, payload):
+
+        self._send((xssi_prefix + json.dumps({"success": True, "payload": payload})).encode())
+
+    def _page(self, records, query):
+
+        size = self.server.config.page_size
+        page = int(query.get("to", ["0"])[0])
+        value = records(range(page * size, min((page + 1) * size, self.server.config.posts)))
+        more = (page + 1) * size < self.server.config.posts
+        return {"value": value, "paging": {"next": {"to": page + 1}} if more else {}}
+
+    def do_GET(self):
+
+        time.sleep(self.server.config.latency)
+        url = urlparse(self.path)
+        path, query = url.path.rstrip("/"), parse_qs(url.query)
+        config = self.server.config
+
+        if re.fullmatch(r"/@[^/]+/stats/total/\d+/\d+", path):
+            start = int(path.split("/")[-2])
+            events = [
+                {"timestampMs": start + h * DAY_MS // 24, "views": 1, "reads": 0} for h in range(config.days * 24)
+            ]
+            return self._send_payload({"value": events})
+        if re.fullmatch(r"/@[^/]+/stats", path):
+            return self._send_payload(self._page(lambda ids: [summary_record(i) for i in ids], query))
+        if re.fullmatch(r"/_/api/collections/[^/]+/stats/(views|visitors)", path):
+            start = int(query.get("from", ["0"])[0])
+            return self._send_payload(
+                {"value": [{"timestampMs": start + d * DAY_MS, "views": 5} for d in range(config.days)]}
+            )
+        if re.fullmatch(r"/[^/@_]+/stats/stories", path):
+            return self._send_payload(self._page(lambda ids: [summary_record(i) for i in ids], query))
+        if re.fullmatch(r"/[^/@_]+", path):
+            slug = path[1:]
+            collection = {"id": "bench0collection", "slug": slug, "name": slug, "creatorId": "UID", "description": ""}
+            return self._send_payload({"collection": collection})
+
+        self._send(b'{"error": "not found"}', status=404)
+
+    def do_POST(self):
+
+        time.sleep(self.server.config.latency)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if urlparse(self.path).path != "/_/graphql":
+            return self._send(b'{"error": "not found"}', status=404)
+
+        config = self.server.config
+        variables = body["variables"]
+        if body["operationName"].startswith("StatsPostChart"):
+            start = max(variables["startAt"], variables["endAt"] - config.days * DAY_MS)
+            build = lambda pid: post_chart(pid, start, config.days)
+        else:
+            build = lambda pid: post_referrers(pid, config.referrers)
+
+        if body["operationName"].endswith("Batch"):
+            data = {alias: build(pid) for alias, pid in variables.items() if re.fullmatch(r"p\d+", alias)}
+        else:
+            data = {"post": build(variables["postId"])}
+        self._send(json.dumps({"data": data}).encode())
+
+
+class MockMediumServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Serves on 127.0.0.1 from a background thread; use as a context manager. Built from ThreadingMixIn
+    since http.server.ThreadingHTTPServer needs Python 3.7.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config=None, port=0):
+
+        super().__init__(("127.0.0.1", port), MockMediumHandler)
+        self.config = config or MockMediumConfig()
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.shutdown()
+        self.server_close()
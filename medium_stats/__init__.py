@@ -1,2 +1,21 @@
-from .scraper import StatGrabberPublication
-from .scraper import StatGrabberUser
+import sys
+import types
+
+# the scraper (and requests) load on first use, so the CLI can start without them
+__all__ = ["StatGrabberPublication", "StatGrabberUser"]
+
+
+class _LazyModule(types.ModuleType):
+    # a module-level __getattr__ (PEP 562) would need Python 3.7; swapping the module's class works on 3.6
+
+    def __getattr__(self, name):
+
+        if name in __all__:
+            from medium_stats import scraper
+
+            return getattr(scraper, name)
+
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+sys.modules[__name__].__class__ = _LazyModule
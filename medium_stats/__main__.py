@@ -1,13 +1,34 @@
 import os
+import time
+import traceback
+from datetime import datetime
+from datetime import timezone
 from functools import partial
+from itertools import tee
 
+from medium_stats.checkpoint import RunCheckpoint
 from medium_stats.cli import MediumConfigHelper
 from medium_stats.cli import create_directories
 from medium_stats.cli import get_argparser
 from medium_stats.cli import parse_scraper_args
-from medium_stats.scraper import StatGrabberPublication
-from medium_stats.scraper import StatGrabberUser
+from medium_stats.cli import read_manifest
+from medium_stats.columnar import PostEventsTable
+from medium_stats.metrics import Metrics
+from medium_stats.metrics import sink_for_path
+from medium_stats.state import FingerprintIndex
+from medium_stats.state import ScrapeState
+from medium_stats.state import fingerprint
+from medium_stats.utils import convert_datetime_to_unix
 from medium_stats.utils import dt_formatter
+from medium_stats.writers import OUTPUT_SUFFIX
+from medium_stats.writers import output_path
+from medium_stats.writers import output_stem
+from medium_stats.writers import read_json
+from medium_stats.writers import read_ndjson
+from medium_stats.writers import resolve_compression
+
+# The HTTP stack (requests, via the scraper, cache & scheduler modules) is imported inside the
+# functions that scrape, so "--help" and argument errors don't pay for it; see benchmarks/import_time.py
 
 section_break = "\n{0}\n".format("+" * 30)
 
@@ -67,6 +88,9 @@ pub_mode_attrs = {**pub_mode_attrs, **common_mode_attrs}
 
 def get_extra_attrs(sg, mode):
 
+    from medium_stats.scraper import StatGrabberPublication
+    from medium_stats.scraper import StatGrabberUser
+
     if isinstance(sg, StatGrabberUser):
         extras = user_mode_attrs[mode]
     elif isinstance(sg, StatGrabberPublication):
@@ -75,7 +99,10 @@ def get_extra_attrs(sg, mode):
     return extras
 
 
-def get_stats(sg, mode, now, articles=None):
+def get_stats(sg, mode, now, articles=None, since=None):
+
+    from medium_stats.scraper import StatGrabberPublication
+    from medium_stats.scraper import StatGrabberUser
 
     extras = get_extra_attrs(sg, mode)
 
@@ -99,9 +126,7 @@ def get_stats(sg, mode, now, articles=None):
             non_attrib_events = sg.get_summary_stats(events=True)
             data = {"data": {"events": non_attrib_events}}
         elif isinstance(sg, StatGrabberPublication):
-            views = sg.get_events(type_="views")
-            visitors = sg.get_events(type_="visitors")
-            data = {"data": {"views": views, "visitors": visitors}}
+            data = {"data": sg.get_all_events(("views", "visitors"))}
 
     elif mode == "story_overview":
 
@@ -110,11 +135,11 @@ def get_stats(sg, mode, now, articles=None):
 
     elif mode == "articles":
 
-        data = sg.get_all_story_stats(articles)
+        data = {"data": {"post": sg.iter_story_stats_stream(articles, since=since)}}
 
     elif mode == "referrers":
 
-        data = sg.get_all_story_stats(articles, type_="referrer")
+        data = {"data": {"post": sg.iter_story_stats_stream(articles, type_="referrer")}}
 
     else:
         # TODO remove hardcoding from this message - make choice list dynamic from keys
@@ -132,7 +157,8 @@ def get_stats(sg, mode, now, articles=None):
     return {**data, **extras}
 
 
-def write_stats(sg, data, mode, now, sub_dir):
+def stats_filename(sg, mode, now, sub_dir):
+    """Where write_stats() writes a mode, minus its extension: events & articles by period, the rest by run time"""
 
     extras = get_extra_attrs(sg, mode)
     now_prefix = dt_formatter(now, "filename")
@@ -148,12 +174,454 @@ def write_stats(sg, data, mode, now, sub_dir):
             sg.slug,
             extras["filename_suffix"],
         )
-    path = sg.write_json(data, filename)
+
+    return filename
+
+
+def read_export(path):
+    """
+    The posts ({postId: post}) and periodBegin of an earlier "articles" export at path, in any format;
+    ({}, None) when there's none. ndjson exports hold no periodBegin.
+    """
+
+    if not os.path.exists(path):
+        return {}, None
+
+    if OUTPUT_SUFFIX.search(path).group(1):
+        posts, begin = read_ndjson(path), None
+    else:
+        export = read_json(path)
+        posts, begin = export["data"]["post"], export.get("periodBegin")
+
+    return {p["id"]: p for p in posts if p}, begin
+
+
+def merge_export(sg, data, fetched, marks, earlier, begin=None):
+    """
+    --incremental / --changed-only: merges the "fetched" posts of "data" into those ({postId: post}) of an
+    "earlier" export of the same period, the fresh copy of a day winning; earlier posts not fetched again
+    follow at the end. Marked posts are only fetched from their mark, so periodBegin is then set to the
+    earliest day the file holds.
+    """
+
+    from medium_stats.scraper import merge_post_shards
+
+    starts = [begin] if begin else []
+    for post in fetched:
+        if post:
+            start = sg.window_start(post["id"], marks)
+            starts.append(dt_formatter(datetime.fromtimestamp(start / 1000, timezone.utc), "json"))
+            if post["id"] in earlier:
+                post = merge_post_shards([post, earlier.pop(post["id"])])
+        yield post
+    yield from earlier.values()
+
+    # periodBegin is written after "data", so it can still change here
+    if starts:
+        data["periodBegin"] = min(starts)
+
+
+def write_stats(sg, data, mode, now, sub_dir, format_="json", store=None, compress=None):
+    """
+    Writes one mode's data to a new timestamped file, or upserts it into "store" (a SqliteStore) instead.
+    Returns the file's path, which is also the basis of the columnar export's name when storing.
+    """
+
+    extras = get_extra_attrs(sg, mode)
+    filename = stats_filename(sg, mode, now, sub_dir)
+    if store:
+        store.write(mode, sg.slug, data, convert_datetime_to_unix(now))
+        print(f'{extras["title"]} stored in:')
+        print(store.path, section_break, sep="\n")
+        return filename
+
+    path = sg.write_json(data, filename, format_, compress)
     print(f'{extras["title"]} written to:')
     print(path, section_break, sep="\n")
     return path
 
 
+def export_columnar(table, json_path, format_):
+
+    filepath = output_stem(json_path)
+    path = table.write(filepath, format_)
+    print(f"Flattened Article Events ({len(table)} rows) written to:")
+    print(path, section_break, sep="\n")
+    return path
+
+
+def scrape_mode(sg, mode, articles, sub_dir, args, state=None, checkpoint=None, index=None, store=None):
+    """
+    Fetches and writes one of the remaining (non-preliminary) modes, plus its incremental/columnar extras.
+    "articles" is the postIds to fetch stats for: a list, or with --pipeline a PostIdFeed that pagination
+    is still filling. Either way they're consumed as the requests go out; a repeated postId is fetched once.
+    """
+
+    marks = state.get_marks(mode) if state and mode == "articles" else None
+    sharded = mode == "articles" and args.shard_days
+    # daily events are only fetched over the period, so a post is only skipped if its last fetch covered it
+    window = (sg.start_unix, sg.stop_unix) if mode == "articles" else None
+    # no stats predate a post, so sharded windows start at its creation rather than 1999
+    since = {} if sharded else marks
+    arrived, requested = set(), []
+
+    def unique(post_ids):
+        for post_id in post_ids:
+            if post_id not in arrived:
+                arrived.add(post_id)
+                yield post_id
+
+    def select(post_ids):
+        post_ids = unique(post_ids)
+        if index:
+            # posts whose totals match the last run's can't have new daily events or referrers
+            post_ids = index.iter_changed(mode, post_ids, sg.post_fingerprints, window)
+        for post_id in post_ids:
+            if sharded:
+                created, mark = sg.post_created.get(post_id), (marks or {}).get(post_id)
+                if created or mark:
+                    since[post_id] = max(created or 0, mark or 0)
+            requested.append(post_id)
+            yield post_id
+
+    if mode == "events":
+        data = get_stats(sg, mode, sg.now)
+    elif checkpoint and checkpoint.spool:
+        # only fetch posts an interrupted attempt of this run didn't get to
+        done = checkpoint.completed_posts(mode)
+        post_ids, todo = tee(select(articles))
+        data = get_stats(sg, mode, sg.now, (a for a in todo if a not in done), since=since)
+        data["data"]["post"] = checkpoint.track(mode, post_ids, done, data["data"]["post"])
+    else:
+        data = get_stats(sg, mode, sg.now, select(articles), since=since)
+
+    if mode == "articles" and (state or index) and not store:
+        # the store upserts days in place, but a file of the same period would be replaced by a partial one
+        path = output_path(stats_filename(sg, mode, sg.now, sub_dir), args.format, resolve_compression(args.compress))
+        data["data"]["post"] = merge_export(sg, data, data["data"]["post"], marks or {}, *read_export(path))
+    if mode == "articles" and state:
+        # record marks as posts stream past the writer
+        data["data"]["post"] = state.track(mode, data["data"]["post"])
+    if mode == "articles" and args.columnar:
+        table = PostEventsTable()
+        data["data"]["post"] = table.track(data["data"]["post"])
+
+    path = write_stats(sg, data, mode, sg.now, sub_dir, args.format, store, args.compress)
+
+    if checkpoint:
+        checkpoint.mark_complete(mode)
+    if mode == "articles" and state:
+        state.save()
+    if mode == "articles" and args.columnar:
+        export_columnar(table, path, args.columnar)
+    if index and mode != "events":
+        index.update(mode, {a: sg.post_fingerprints[a] for a in requested}, window)
+        index.save()
+        skipped = len(arrived) - len(requested)
+        sg.metrics.inc("posts_skipped_total", skipped, mode=mode)
+        print(f"\nSkipped {skipped} posts unchanged since the last {mode} run", end="\n")
+
+    return path
+
+
+def run_modes(sg, modes, articles, sub_dir, args, state=None, checkpoint=None, index=None, store=None):
+    """
+    Runs the remaining modes side by side, each writing its own file. They don't depend on each other,
+    and their per-post requests share the grabber's worker pool, so --concurrency still caps the total.
+    """
+
+    if len(modes) <= 1:
+        for m in modes:
+            scrape_mode(sg, m, articles, sub_dir, args, state, checkpoint, index, store)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with sg.shared_pool(), ThreadPoolExecutor(max_workers=len(modes)) as pool:
+        futures = [
+            pool.submit(scrape_mode, sg, m, articles, sub_dir, args, state, checkpoint, index, store) for m in modes
+        ]
+
+    # every mode gets to finish (and be checkpointed) before the first failure is raised
+    for future in futures:
+        future.result()
+
+
+def stream_preliminary(sg, records, mode, modes, sub_dir, format_="json", store=None, compress=None, feeds=()):
+    """
+    Streams paginated summary/overview records to disk as they arrive (when "mode" was requested),
+    keeping only their postIds in memory for the per-post modes. With "feeds" (the PostIdFeeds of
+    per-post modes already running), each postId is also handed on as soon as its page arrives.
+    """
+
+    # filled in place: per-post modes running alongside (--pipeline) look posts up as pagination goes on
+    articles, created, fingerprints = sg.articles, sg.post_created, sg.post_fingerprints
+
+    def track_ids(records):
+        for r in records:
+            fingerprints[r["postId"]] = fingerprint(r)
+            if r.get("createdAt"):
+                created[r["postId"]] = r["createdAt"]
+            articles.append(r["postId"])
+            for feed in feeds:
+                feed.put(r["postId"])
+            yield r
+
+    if mode in modes:
+        write_stats(sg, track_ids(records), mode, sg.now, sub_dir, format_, store, compress)
+    else:
+        for _ in track_ids(records):
+            pass
+
+    return articles
+
+
+def run_pipeline(sg, preliminary, modes, sub_dir, args, state=None, checkpoint=None, index=None, store=None):
+    """
+    --pipeline: runs the remaining modes while the preliminary mode is still paginating. "preliminary"
+    is called with the per-post modes' PostIdFeeds and hands each page's postIds to them, so their
+    requests start right away rather than after the last page; a full feed holds pagination back until
+    its mode catches up. Returns what "preliminary" returns.
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from medium_stats.pipeline import PostIdFeed
+
+    feeds = {m: PostIdFeed() for m in modes if m != "events"}
+    with sg.shared_pool(), ThreadPoolExecutor(max_workers=max(len(modes), 1)) as pool:
+        futures = []
+        for m in modes:
+            future = pool.submit(scrape_mode, sg, m, feeds.get(m), sub_dir, args, state, checkpoint, index, store)
+            if m in feeds:
+                # a mode that stopped early mustn't leave pagination blocked on its full feed
+                future.add_done_callback(lambda _, feed=feeds[m]: feed.cancel())
+            futures.append(future)
+
+        try:
+            articles = preliminary(feeds.values())
+        except BaseException as e:
+            for feed in feeds.values():
+                feed.close(e)
+            raise
+        for feed in feeds.values():
+            feed.close()
+
+    # every mode gets to finish (and be checkpointed) before the first failure is raised
+    for future in futures:
+        future.result()
+
+    return articles
+
+
+def scrape(args, cache=None, scheduler=None, adapter=None, metrics=None, store=None):
+    """
+    Runs one parsed scrape_user / scrape_publication command. The cache, scheduler, adapter,
+    metrics and store may be shared between several runs in one process.
+    """
+
+    from medium_stats.cache import PublicationIdCache
+    from medium_stats.scraper import StatGrabberPublication
+    from medium_stats.scraper import StatGrabberUser
+
+    if args.creds:
+        cfg = MediumConfigHelper(args.creds, args.u)
+        sid, uid = cfg.sid, cfg.uid
+    else:
+        sid, uid = args.sid, args.uid
+
+    command = args.command
+    modes = list(args.mode)
+    sg_kwargs = {
+        "already_utc": True,
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "shard_days": args.shard_days,
+        "cache": cache,
+        "scheduler": scheduler,
+        "adapter": adapter,
+        "metrics": metrics,
+    }
+
+    get_folders = lambda x: [x[m]["folder"] for m in modes]
+    target = args.u if command == "scrape_user" else args.s
+
+    if args.resume:
+        checkpoint = RunCheckpoint.load(args.output_dir, args.resume, command, target)
+        args.start, args.end, now = checkpoint.period
+    else:
+        now = datetime.now(timezone.utc)
+        checkpoint = RunCheckpoint.create(args.output_dir, command, target, args.start, args.end, now, args.checkpoint)
+    print(f"\nRun id: {checkpoint.run_id} (if interrupted, re-run with --resume {checkpoint.run_id})")
+    # a finished preliminary mode needs its postIds again, but not its file
+    pending = [m for m in modes if not checkpoint.is_complete(m)]
+
+    print("\nGetting Preliminary Data...", end="\n\n")
+    if command == "scrape_user":
+        username = args.u
+        sg = StatGrabberUser(username, sid, uid, args.start, args.end, now=now, **sg_kwargs)
+        folders = get_folders(user_mode_attrs)
+        sub_dir = create_directories(args.output_dir, sg.slug, folders)
+
+        # get summary stats to derive article_ids and user creation_time
+        mode, records = "summary", sg.iter_summary_stats()
+
+    else:
+        url = args.s
+        # collection ids are remembered next to the response cache
+        id_cache = None if args.no_cache else PublicationIdCache(args.cache_dir)
+        sg = StatGrabberPublication(
+            url,
+            sid,
+            uid,
+            args.start,
+            args.end,
+            now=now,
+            collection_id=args.collection_id,
+            id_cache=id_cache,
+            **sg_kwargs,
+        )
+        folders = get_folders(pub_mode_attrs)
+        sub_dir = create_directories(args.output_dir, sg.slug, folders)
+        mode, records = "story_overview", sg.iter_story_overview()
+
+    # filled in by stream_preliminary
+    sg.articles, sg.post_created, sg.post_fingerprints = [], {}, {}
+
+    def preliminary(feeds=()):
+        articles = stream_preliminary(sg, records, mode, pending, sub_dir, args.format, store, args.compress, feeds)
+        if mode in pending:
+            checkpoint.mark_complete(mode)
+        return articles
+
+    # high-water marks from previous runs; only "articles" stats are windowed per post
+    state = ScrapeState.load(sub_dir) if args.incremental else None
+    index = FingerprintIndex.load(sub_dir) if args.changed_only else None
+
+    # go through remainder of modes
+    remaining = []
+    for m in modes:
+        if m in ("summary", "story_overview"):
+            continue
+        if checkpoint.is_complete(m):
+            print(f"\nSkipping {m}; already completed in run {checkpoint.run_id}", end="\n\n")
+            continue
+        remaining.append(m)
+
+    if args.pipeline:
+        articles = run_pipeline(sg, preliminary, remaining, sub_dir, args, state, checkpoint, index, store)
+    else:
+        # events don't need postIds, so they're fetched while the preliminary mode paginates
+        early = [m for m in remaining if m == "events"]
+        run_early = partial(run_modes, sg, early, [], sub_dir, args, state, checkpoint, index, store)
+        articles, early_error = sg.gather(preliminary, run_early, return_exceptions=True)
+        if isinstance(articles, BaseException):
+            raise articles
+        run_modes(
+            sg, [m for m in remaining if m not in early], articles, sub_dir, args, state, checkpoint, index, store
+        )
+        if early_error:
+            raise early_error
+
+    checkpoint.finish()
+
+    return {"target": target, "slug": sg.slug, "posts": len(articles), "modes": modes}
+
+
+def build_shared(args):
+
+    from medium_stats.cache import ResponseCache
+    from medium_stats.scheduler import RequestScheduler
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    max_in_flight = getattr(args, "max_in_flight", None)
+    scheduler = RequestScheduler(
+        rate=args.rate_limit,
+        max_retries=args.max_retries,
+        retry_budget=args.retry_budget,
+        max_in_flight=max_in_flight,
+    )
+
+    return cache, scheduler
+
+
+def build_store(args):
+
+    if not args.store:
+        return None
+
+    from medium_stats.store import open_store
+
+    return open_store(args.store)
+
+
+def build_metrics(args):
+
+    metrics = Metrics()
+    if args.metrics_out:
+        metrics.add_sink(sink_for_path(args.metrics_out))
+
+    return metrics
+
+
+def print_request_stats(scheduler):
+
+    print("Request stats:", ", ".join(f"{k}={v:g}" for k, v in sorted(scheduler.stats().items())))
+
+
+def flush_metrics(metrics, scheduler):
+
+    # run-wide throttling & backoff totals are only tracked by the scheduler
+    for name, value in scheduler.stats().items():
+        metrics.inc(f"scheduler_{name}", value)
+    metrics.flush()
+
+
+def run_batch(args, parser):
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from medium_stats.scraper import build_adapter
+
+    jobs = read_manifest(args.manifest, args, parser)
+    cache, scheduler = build_shared(args)
+    metrics = build_metrics(args)
+    # one connection pool for every account; cookies stay on each grabber's own session
+    adapter = build_adapter(cache, scheduler, pool_maxsize=args.max_in_flight, metrics=metrics)
+    store = build_store(args)
+
+    def run(job):
+        started = time.monotonic()
+        try:
+            summary = scrape(job, cache, scheduler, adapter, metrics, store)
+            summary["status"] = "ok"
+        except Exception as e:
+            traceback.print_exc()
+            target = job.u if job.command == "scrape_user" else job.s
+            summary = {"target": target, "status": f"FAILED ({type(e).__name__}: {e})"}
+        summary["elapsed"] = time.monotonic() - started
+        return summary
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            summaries = list(pool.map(run, jobs))
+    finally:
+        if store:
+            store.close()
+
+    print(section_break)
+    print("Batch summary:")
+    for s in summaries:
+        posts = f'{s["posts"]} posts' if "posts" in s else ""
+        print(f'  {s["target"]:<30} {posts:>10} {s["elapsed"]:>8.1f}s  {s["status"]}')
+    print_request_stats(scheduler)
+    flush_metrics(metrics, scheduler)
+
+    failed = [s for s in summaries if s["status"] != "ok"]
+    if failed:
+        raise SystemExit(f"{len(failed)} of {len(summaries)} batch jobs failed")
+
+
 def unpack_email_pwd(args):
 
     env_flag = args.pwd_in_env
@@ -188,48 +656,20 @@ def main():
 
     elif command in ["scrape_user", "scrape_publication"]:
         args = parse_scraper_args(args, parser)
-
-        if args.creds:
-            cfg = MediumConfigHelper(args.creds, args.u)
-            sid, uid = cfg.sid, cfg.uid
-        else:
-            sid, uid = args.sid, args.uid
-
-        modes = list(args.mode)
-
-        get_folders = lambda x: [x[m]["folder"] for m in modes]
-
-        print("\nGetting Preliminary Data...", end="\n\n")
-        if command == "scrape_user":
-            username = args.u
-            sg = StatGrabberUser(username, sid, uid, args.start, args.end, already_utc=True)
-            folders = get_folders(user_mode_attrs)
-            sub_dir = create_directories(args.output_dir, sg.slug, folders)
-
-            # get summary stats to derive article_ids and user creation_time
-            data = sg.get_summary_stats()
-            articles = sg.get_article_ids(data)
-            if "summary" in modes:
-                write_stats(sg, data, "summary", sg.now, sub_dir)
-
-        else:
-            url = args.s
-            sg = StatGrabberPublication(url, sid, uid, args.start, args.end, already_utc=True)
-            folders = get_folders(pub_mode_attrs)
-            sub_dir = create_directories(args.output_dir, sg.slug, folders)
-            data = sg.get_all_story_overview()
-            articles = sg.get_article_ids(data)
-            if "story_overview" in modes:
-                write_stats(sg, data, "story_overview", sg.now, sub_dir)
-
-        # go through remainder of modes
-        remaining = [m for m in modes if m not in ("summary", "story_overview")]
-        for m in remaining:
-            if m == "events":
-                data = get_stats(sg, m, sg.now)
-            else:
-                data = get_stats(sg, m, sg.now, articles)
-            write_stats(sg, data, m, sg.now, sub_dir)
+        cache, scheduler = build_shared(args)
+        metrics = build_metrics(args)
+        store = build_store(args)
+
+        try:
+            scrape(args, cache, scheduler, metrics=metrics, store=store)
+        finally:
+            if store:
+                store.close()
+        print_request_stats(scheduler)
+        flush_metrics(metrics, scheduler)
+
+    elif command == "scrape_batch":
+        run_batch(args, parser)
 
     print("All done!")
 
@@ -0,0 +1,186 @@
+import glob
+import os
+
+import numpy as np
+
+from medium_stats.columnar import flatten_post_events
+from medium_stats.writers import COMPRESSIONS
+from medium_stats.writers import OUTPUT_SUFFIX
+from medium_stats.writers import read_json
+from medium_stats.writers import read_ndjson
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+FREQUENCIES = ("day", "week", "month")
+
+# value columns of PostEvents, in flatten_post_events row order
+EVENT_FIELDS = ("views", "internalReferrerViews", "memberTtr", "amount")
+
+
+def _last_per_key(post_index, period):
+    """Row positions keeping the last of each (post, period), sorted by post then period"""
+
+    order = np.lexsort((np.arange(len(period)), period, post_index))
+    post_index, period = post_index[order], period[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (post_index[1:] != post_index[:-1]) | (period[1:] != period[:-1])
+
+    return order[last]
+
+
+def read_post_events(path):
+    """
+    Yields the post stats objects of one "articles" file written by write_stats (json, compact or ndjson,
+    compressed or not)
+    """
+
+    suffix = OUTPUT_SUFFIX.search(path)
+    if suffix and suffix.group(1):
+        yield from read_ndjson(path)
+    else:
+        yield from read_json(path)["data"]["post"]
+
+
+class PostEvents:
+    """
+    Daily post events as NumPy columns, one row per post per day, for rollups without a Python loop per
+    row. Build it from fresh results with from_posts() / from_frame(), or from the "articles" files under
+    stats_exports/<handle>/post_events with load(). A (post, day) seen more than once keeps its last row.
+    Value columns are float64 with NaN where Medium sent nothing; rollups count NaN as 0.
+    """
+
+    def __init__(self, post_ids, post_index, period, columns):
+
+        keep = _last_per_key(post_index, period)
+        self.post_ids = list(post_ids)
+        self.post_index = post_index[keep]
+        self.period = period[keep]
+        self.columns = {f: columns[f][keep] for f in EVENT_FIELDS}
+
+    def __len__(self):
+
+        return len(self.period)
+
+    @classmethod
+    def from_posts(cls, posts):
+        """From post stats objects, e.g. get_all_story_stats(...)["data"]["post"] or iter_all_story_stats(...)"""
+
+        post_ids, positions, rows = [], {}, []
+        for post in posts:
+            for post_id, period, *values in flatten_post_events(post):
+                if post_id not in positions:
+                    positions[post_id] = len(post_ids)
+                    post_ids.append(post_id)
+                rows.append((positions[post_id], period, *values))
+
+        table = np.array(rows, dtype=float).reshape(-1, 2 + len(EVENT_FIELDS))
+        columns = {f: table[:, i + 2] for i, f in enumerate(EVENT_FIELDS)}
+
+        return cls(post_ids, table[:, 0].astype(np.int64), table[:, 1].astype(np.int64), columns)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """From a DailyStatsFrame (get_story_stats_frame); it holds no earnings, so "amount" is all NaN"""
+
+        arrays = frame.to_numpy()
+        columns = {f: arrays[f].astype(float) for f in EVENT_FIELDS if f in arrays}
+        columns["amount"] = np.full(len(frame), np.nan)
+
+        # a post fetched more than once has several entries in frame.post_ids
+        positions = {}
+        remap = np.array([positions.setdefault(p, len(positions)) for p in frame.post_ids], dtype=np.int64)
+        post_index = remap[arrays["post_index"]] if len(frame) else arrays["post_index"]
+
+        return cls(list(positions), post_index, arrays["periodStartedAt"].copy(), columns)
+
+    @classmethod
+    def load(cls, path):
+        """
+        From "articles" files: a file, a post_events folder or a stats_exports/<handle> folder. Files are
+        read in name order, which is period order, so the latest run's rows win where runs overlap.
+        """
+
+        if os.path.isdir(os.path.join(path, "post_events")):
+            path = os.path.join(path, "post_events")
+        if os.path.isdir(path):
+            suffixes = [f"{ext}{c}" for ext in (".json", ".ndjson") for c in ("", *COMPRESSIONS.values())]
+            paths = sorted(p for suffix in suffixes for p in glob.glob(os.path.join(path, f"*{suffix}")))
+        else:
+            paths = [path]
+
+        return cls.from_posts(post for p in paths for post in read_post_events(p))
+
+    def _buckets(self, freq):
+        """Each row's bucket start, as days since the epoch"""
+
+        if freq not in FREQUENCIES:
+            raise ValueError(f'"freq" param must be one of {list(FREQUENCIES)}, not "{freq}"')
+
+        days = self.period // DAY_MS
+        if freq == "week":
+            # the epoch was a Thursday; weeks start on Mondays
+            return (days + 3) // 7 * 7 - 3
+        if freq == "month":
+            return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+        return days
+
+    def _sum(self, field, keys):
+
+        return np.bincount(keys, weights=np.nan_to_num(self.columns[field])).astype(float)
+
+    def totals(self, field="views", freq="day"):
+        """(bucket start dates, totals of "field") per "day", "week" (from Monday) or "month" with any rows"""
+
+        starts, keys = np.unique(self._buckets(freq), return_inverse=True)
+
+        return starts.astype("datetime64[D]"), self._sum(field, keys)
+
+    def totals_by(self, groups, field="views", freq="day"):
+        """
+        Totals of "field" per group and bucket, where "groups" maps postIds to a label (e.g. a tag; posts
+        not in it are left out). Returns (labels, bucket start dates, totals[label, bucket]).
+        """
+
+        labels = sorted(set(groups.values()))
+        positions = {label: i for i, label in enumerate(labels)}
+        label_of_post = np.array([positions[groups[p]] if p in groups else -1 for p in self.post_ids] + [-1])
+        row_labels = label_of_post[self.post_index] if len(self) else np.empty(0, dtype=np.int64)
+        rows = row_labels >= 0
+
+        starts, buckets = np.unique(self._buckets(freq)[rows], return_inverse=True)
+        keys = row_labels[rows] * len(starts) + buckets
+        weights = np.nan_to_num(self.columns[field][rows])
+        sums = np.bincount(keys, weights=weights, minlength=len(labels) * len(starts)).astype(float)
+
+        return labels, starts.astype("datetime64[D]"), sums.reshape(len(labels), len(starts))
+
+    def rolling_mean(self, field="views", window=7):
+        """
+        (dates, mean of the daily totals over the "window" days ending on each date), for every day
+        from the first to the last with rows; days without rows count as 0, the first window - 1 are NaN.
+        """
+
+        if int(window) < 1:
+            raise ValueError(f'"window" param must be a positive integer, not "{window}"')
+        window = int(window)
+        if not len(self):
+            return np.empty(0, dtype="datetime64[D]"), np.empty(0)
+
+        days = self._buckets("day")
+        first = days.min()
+        daily = np.bincount(days - first, weights=np.nan_to_num(self.columns[field]))
+        cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+        means = np.full(len(daily), np.nan)
+        means[window - 1 :] = (cumulative[window:] - cumulative[:-window]) / window
+
+        return np.arange(first, first + len(daily)).astype("datetime64[D]"), means
+
+    def earnings_per_view(self, freq="month"):
+        """(bucket start dates, summed earnings "amount" / summed views), NaN for buckets without views"""
+
+        starts, amounts = self.totals("amount", freq)
+        _, views = self.totals("views", freq)
+        ratio = np.divide(amounts, views, out=np.full(len(views), np.nan), where=views > 0)
+
+        return starts, ratio
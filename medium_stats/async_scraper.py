@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import aiohttp
+
+from medium_stats.columnar import DailyStatsFrame
+from medium_stats.scraper import PublicationRequestsMixin
+from medium_stats.scraper import StatGrabberCore
+from medium_stats.scraper import UserRequestsMixin
+from medium_stats.scraper import gql_endpoint
+
+default_headers = {"content-type": "application/json", "accept": "application/json"}
+
+
+class AsyncStatGrabberBase(StatGrabberCore):
+    """
+    asyncio counterpart of StatGrabberBase on a pooled aiohttp session. Use it as an async context
+    manager (or await open() / close()) so the pool is released:
+
+        async with AsyncStatGrabberUser(username, sid, uid, start, stop) as sg:
+            summary = await sg.get_summary_stats()
+
+    An existing aiohttp.ClientSession may be passed in as "session"; it is then left open on close().
+    "concurrency" caps the connections of the session created otherwise.
+    """
+
+    def __init__(self, sid, uid, start, stop, now=None, already_utc=False, concurrency=10, session=None):
+
+        super().__init__(sid, uid, start, stop, now, already_utc)
+        if int(concurrency) < 1:
+            raise ValueError(f'"concurrency" param must be a positive integer, not "{concurrency}"')
+        self.concurrency = int(concurrency)
+        self.session = session
+        self._owns_session = session is None
+
+    async def open(self):
+
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def close(self):
+
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+
+        await self.close()
+
+    async def _fetch_body(self, url, params=None):
+
+        # cookies go with each request so a session shared between accounts stays account-neutral
+        async with self.session.get(url, params=params, headers=default_headers, cookies=self.cookies) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def _fetch_payload(self, url, params=None):
+
+        return self._decode_body(await self._fetch_body(url, params))
+
+    async def get_story_stats(self, post_id, type_="view_read", start_unix=None, end_unix=None):
+
+        post_data = self._story_stats_request(post_id, type_, start_unix, end_unix)
+        async with self.session.post(
+            gql_endpoint, json=post_data, headers=default_headers, cookies=self.cookies
+        ) as response:
+            response.raise_for_status()
+            return json.loads(await response.text())
+
+    async def get_all_story_stats(self, post_ids, type_="view_read"):
+        """Fetches every post's stats concurrently; posts stay in post_ids order"""
+
+        responses = await asyncio.gather(*(self.get_story_stats(p, type_=type_) for p in post_ids))
+        container = {"data": {"post": [r["data"]["post"] for r in responses]}}
+
+        return container
+
+    async def get_story_stats_frame(self, post_ids):
+
+        responses = await asyncio.gather(*(self.get_story_stats(p) for p in post_ids))
+
+        return DailyStatsFrame.from_posts(r["data"]["post"] for r in responses)
+
+
+class AsyncStatGrabberUser(UserRequestsMixin, AsyncStatGrabberBase):
+    def __init__(self, username, sid, uid, start, stop, now=None, already_utc=False, **kwargs):
+
+        super().__init__(sid, uid, start, stop, now, already_utc, **kwargs)
+        self._set_user_endpoints(username)
+
+    async def iter_summary_stats(self, events=False, limit=50, **kwargs):
+        """Yields summary records page by page, following "paging.next" cursors iteratively"""
+
+        url, params = self._summary_request(events, limit, **kwargs)
+
+        while True:
+            data = await self._fetch_payload(url, params)
+            for record in data["value"]:
+                yield record
+
+            params = self._next_summary_params(data, limit)
+            if not params:
+                break
+
+    async def get_summary_stats(self, events=False, limit=50, **kwargs):
+
+        return [r async for r in self.iter_summary_stats(events=events, limit=limit, **kwargs)]
+
+
+class AsyncStatGrabberPublication(PublicationRequestsMixin, AsyncStatGrabberBase):
+    """Attributes other than slug & id (name, description, ...) need an "await load_attrs()" first"""
+
+    def __init__(
+        self,
+        slug,
+        sid,
+        uid,
+        start,
+        stop,
+        now=None,
+        already_utc=False,
+        collection_id=None,
+        id_cache=None,
+        **kwargs,
+    ):
+
+        self._set_publication(slug, collection_id, id_cache)
+        super().__init__(sid, uid, start, stop, now, already_utc, **kwargs)
+
+    def _load_attrs(self):
+
+        raise RuntimeError('publication attributes not loaded yet; "await load_attrs()" first')
+
+    async def load_attrs(self):
+
+        data = await self._fetch_payload(self.url)
+        self._unpack_attrs(data["collection"])
+
+    async def get_events(self, type_="views"):
+
+        if self._id is None:
+            await self.load_attrs()
+        data = await self._fetch_payload(self._events_url(type_))
+
+        return data["value"]
+
+    async def get_all_events(self, types=("views", "visitors")):
+        """{type_: get_events(type_)} for each of "types", fetched concurrently"""
+
+        if self._id is None:
+            await self.load_attrs()
+        results = await asyncio.gather(*(self.get_events(type_=t) for t in types))
+
+        return dict(zip(types, results))
+
+    async def iter_story_overview(self, limit=50, **kwargs):
+        """Yields story overview records page by page, following "paging.next" cursors iteratively"""
+
+        endpoint, params = self._story_overview_request(limit, **kwargs)
+
+        while True:
+            data = await self._fetch_payload(endpoint, params)
+            for record in data["value"]:
+                yield record
+
+            params = self._next_story_overview_params(data, limit)
+            if not params:
+                break
+
+    async def get_all_story_overview(self, limit=50, **kwargs):
+
+        return [r async for r in self.iter_story_overview(limit=limit, **kwargs)]
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from medium_stats.metrics import request_labels
+from medium_stats.scheduler import ScheduledAdapter
+from medium_stats.scheduler import request_payload
+from medium_stats.utils import DEFAULT_CACHE_DIR
+from medium_stats.writers import atomic_path
+
+# seconds a cached response stays fresh, by the scrape mode that requested it
+DEFAULT_TTLS = {
+    "summary": 60 * 60,
+    "events": 60 * 60,
+    "story_overview": 60 * 60,
+    "articles": 60 * 60,
+    "referrers": 24 * 60 * 60,
+    "publication": 7 * 24 * 60 * 60,
+    "default": 60 * 60,
+}
+
+gql_operation_modes = {"StatsPostChart": "articles", "StatsPostReferrersContainer": "referrers"}
+
+# response headers worth replaying; the body is stored already decoded, so encoding/length are dropped
+cached_headers = ["content-type", "etag", "last-modified", "date"]
+
+
+def classify_request(url, payload=None):
+    """Maps a request to the scrape mode whose TTL applies to it"""
+
+    if payload:
+        operation = str(payload.get("operationName", "")).replace("Batch", "")
+        return gql_operation_modes.get(operation, "default")
+
+    path = urlparse(url).path.rstrip("/")
+    if "/stats/total/" in path or path.startswith("/_/api/collections/"):
+        return "events"
+    if path.endswith("/stats/stories"):
+        return "story_overview"
+    if path.endswith("/stats"):
+        return "summary"
+    if path.count("/") == 1:
+        return "publication"
+
+    return "default"
+
+
+class ResponseCache:
+    """
+    On-disk response store: one file per request key holding a JSON metadata line followed by the
+    raw body. Total body size is bounded; least recently used entries (by file mtime) are evicted first.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttls=None, max_bytes=500 * 1024**2):
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(os.path.getsize(p) for p in self._entry_paths())
+
+    def _entry_paths(self):
+
+        return [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".cache")]
+
+    def _path(self, key):
+
+        return os.path.join(self.cache_dir, f"{key}.cache")
+
+    @staticmethod
+    def key(method, url, payload=None):
+        """Keys on URL plus GraphQL operationName & variables; the query text is folded in as a hash"""
+
+        parts = {"method": method, "url": url}
+        if payload:
+            parts["operationName"] = payload.get("operationName")
+            parts["variables"] = payload.get("variables")
+            parts["query"] = hashlib.sha256(str(payload.get("query", "")).encode()).hexdigest()
+        serialized = json.dumps(parts, sort_keys=True)
+
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def get(self, key):
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            # touch for LRU ordering
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None, None
+
+        return meta, body
+
+    def set(self, key, meta, body):
+
+        path = self._path(key)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            with atomic_path(path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    f.write(json.dumps(meta).encode() + b"\n")
+                    f.write(body)
+            self._size += os.path.getsize(path) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def is_fresh(self, meta):
+
+        ttl = self.ttls.get(meta.get("mode"), self.ttls["default"])
+        return time.time() - meta["stored_at"] < ttl
+
+    def _evict(self):
+
+        # drop least recently used entries until comfortably under the size bound
+        entries = sorted(self._entry_paths(), key=lambda p: os.stat(p).st_mtime)
+        target = self.max_bytes * 0.9
+        for path in entries:
+            if self._size <= target:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+
+    def clear(self):
+
+        with self._lock:
+            for path in self._entry_paths():
+                os.remove(path)
+            self._size = 0
+
+
+class PublicationIdCache:
+    """
+    Persistent slug -> collection id map, so repeat runs can skip fetching a publication's homepage.
+    Collection ids never change, so entries don't expire.
+    """
+
+    filename = "publication_ids.json"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, self.filename)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.ids = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.ids = {}
+
+    def get(self, slug):
+
+        return self.ids.get(slug)
+
+    def set(self, slug, collection_id):
+
+        with self._lock:
+            if self.ids.get(slug) == collection_id:
+                return
+            self.ids[slug] = collection_id
+            with atomic_path(self.path) as tmp_path:
+                with open(tmp_path, "w") as f:
+                    json.dump(self.ids, f, indent=2, sort_keys=True)
+
+
+class CachingAdapter(ScheduledAdapter):
+    """
+    Transport adapter serving fresh responses from a ResponseCache. Stale entries are revalidated with
+    If-None-Match / If-Modified-Since when Medium supplied an ETag / Last-Modified header. Only requests
+    that reach the network go through the (optional) scheduler.
+    """
+
+    def __init__(self, cache, **kwargs):
+
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+
+        payload = request_payload(request)
+        key = self.cache.key(request.method, request.url, payload)
+        meta, body = self.cache.get(key)
+
+        if meta and self.cache.is_fresh(meta):
+            if self.metrics:
+                self.metrics.inc("cache_hits_total", **request_labels(request.url, payload))
+            return self._build_response(request, meta, body)
+
+        if meta:
+            if meta["headers"].get("etag"):
+                request.headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"):
+                request.headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and meta:
+            meta["stored_at"] = time.time()
+            self.cache.set(key, meta, body)
+            return self._build_response(request, meta, body)
+
+        # GraphQL reports failures inside a 200 body; never replay those
+        graphql_error = payload is not None and b'"errors":' in response.content
+        if response.status_code == 200 and not graphql_error:
+            meta = {
+                "stored_at": time.time(),
+                "mode": classify_request(request.url, payload),
+                "status_code": response.status_code,
+                "headers": {h: response.headers[h] for h in cached_headers if h in response.headers},
+            }
+            self.cache.set(key, meta, response.content)
+
+        return response
+
+    @staticmethod
+    def _build_response(request, meta, body):
+
+        response = Response()
+        response.status_code = meta["status_code"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.from_cache = True
+
+        return response
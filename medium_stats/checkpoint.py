@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from datetime import timezone
+
+from medium_stats.utils import dt_formatter
+from medium_stats.writers import atomic_path
+
+RUNS_DIR = ".runs"
+
+
+def _parse_dt(string):
+
+    return datetime.strptime(string, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+
+
+class RunCheckpoint:
+    """
+    Spool directory for one scrape run under <output_dir>/stats_exports/.runs/<run_id>/:
+    run.json holds the run's period and finished modes. With "spool" set (--checkpoint), <mode>.ndjson
+    is also an append-only log of every post already fetched for a per-post mode. A resumed run skips
+    everything recorded there.
+    """
+
+    def __init__(self, run_dir, meta):
+
+        self.run_dir = run_dir
+        self.meta = meta
+        self.run_id = meta["run_id"]
+        # modes run side by side may finish at the same time
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _run_dir(root_dir, run_id):
+
+        return os.path.join(root_dir, "stats_exports", RUNS_DIR, run_id)
+
+    @classmethod
+    def create(cls, root_dir, command, target, start, stop, now, spool=False):
+
+        run_id = f"{target}-{dt_formatter(now, 'filename')}"
+        run_dir = cls._run_dir(root_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+        meta = {
+            "run_id": run_id,
+            "command": command,
+            "target": target,
+            "start": dt_formatter(start, "json"),
+            "stop": dt_formatter(stop, "json"),
+            "now": dt_formatter(now, "json"),
+            "completed_modes": [],
+            "spool": spool,
+        }
+        checkpoint = cls(run_dir, meta)
+        checkpoint._save_meta()
+
+        return checkpoint
+
+    @classmethod
+    def load(cls, root_dir, run_id, command, target):
+
+        run_dir = cls._run_dir(root_dir, run_id)
+        meta_path = os.path.join(run_dir, "run.json")
+        if not os.path.exists(meta_path):
+            raise ValueError(f'No run "{run_id}" to resume under {os.path.dirname(run_dir)}')
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if (meta["command"], meta["target"]) != (command, target):
+            raise ValueError(f'Run "{run_id}" was a {meta["command"]} run for "{meta["target"]}"')
+
+        return cls(run_dir, meta)
+
+    @property
+    def spool(self):
+
+        # runs checkpointed before the spool was optional always logged their posts
+        return self.meta.get("spool", True)
+
+    @property
+    def period(self):
+
+        return tuple(_parse_dt(self.meta[k]) for k in ("start", "stop", "now"))
+
+    def _save_meta(self):
+
+        with atomic_path(os.path.join(self.run_dir, "run.json")) as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(self.meta, f, indent=2)
+
+    def _log_path(self, mode):
+
+        return os.path.join(self.run_dir, f"{mode}.ndjson")
+
+    def is_complete(self, mode):
+
+        return mode in self.meta["completed_modes"]
+
+    def mark_complete(self, mode):
+
+        with self._lock:
+            self.meta["completed_modes"].append(mode)
+            self._save_meta()
+
+    def completed_posts(self, mode):
+        """Posts logged by earlier attempts, keyed by postId"""
+
+        done = {}
+        if not os.path.exists(self._log_path(mode)):
+            return done
+
+        with open(self._log_path(mode)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a crash can leave the last line half-written
+                    break
+                done[entry["postId"]] = entry["post"]
+
+        return done
+
+    def track(self, mode, post_ids, done, fetched):
+        """
+        Yields the stats of every post in post_ids order, taking logged posts from "done" and the rest,
+        in order, from "fetched" - logging each newly fetched post as soon as it arrives.
+        """
+
+        fetched = iter(fetched)
+        with open(self._log_path(mode), "a") as log:
+            for post_id in post_ids:
+                if post_id in done:
+                    yield done[post_id]
+                    continue
+                post = next(fetched)
+                log.write(json.dumps({"postId": post_id, "post": post}, separators=(",", ":")) + "\n")
+                log.flush()
+                yield post
+
+    def finish(self):
+
+        shutil.rmtree(self.run_dir, ignore_errors=True)
@@ -1,14 +1,18 @@
 import argparse
 import configparser
 import os
+import shlex
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
 from functools import partial
-from inspect import cleandoc
 
+from medium_stats.columnar import COLUMNAR_FORMATS
+from medium_stats.utils import DEFAULT_CACHE_DIR
 from medium_stats.utils import make_utc_explicit
 from medium_stats.utils import valid_date
+from medium_stats.writers import COMPRESSIONS
+from medium_stats.writers import OUTPUT_FORMATS
 
 USER_MODE_CHOICES = ["summary", "events", "articles", "referrers"]
 PUB_MODE_CHOICES = ["events", "story_overview", "articles", "referrers"]
@@ -25,21 +29,52 @@ def valid_path(path):
     return path
 
 
+def valid_store(string):
+
+    from medium_stats.store import parse_store_spec
+
+    try:
+        parse_store_spec(string)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return string
+
+
+def positive_int(string):
+
+    try:
+        value = int(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{string}' is not an integer")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"'{string}' must be a positive integer")
+    return value
+
+
+def positive_float(string):
+
+    try:
+        value = float(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{string}' is not a number")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"'{string}' must be a positive number")
+    return value
+
+
 def create_directories(root_dir, handle, folders):
 
     sub_dir = f"{root_dir}/stats_exports/{handle}"
-    if not os.path.exists(sub_dir):
-        os.chdir(root_dir)
-        for f in folders:
-            dir_ = "{0}/{1}".format(sub_dir, f)
-            # TODO only make folder if doesn't already exist
-            os.makedirs(dir_)
+    for f in folders:
+        dir_ = "{0}/{1}".format(sub_dir, f)
+        # earlier runs may have created the handle directory with other modes' folders only
+        os.makedirs(dir_, exist_ok=True)
 
     return sub_dir
 
 
 def get_argparser():
-    def add_subarguments(parser):
+    def add_output_arguments(parser):
 
         parser.add_argument(
             "--output_dir",
@@ -48,6 +83,70 @@ def get_argparser():
             default=os.getcwd(),
             help="output file directory",
         )
+        parser.add_argument(
+            "--format",
+            choices=OUTPUT_FORMATS,
+            default="json",
+            help="output file format: indented JSON, compact JSON or newline-delimited JSON",
+        )
+        parser.add_argument(
+            "--compress",
+            choices=COMPRESSIONS,
+            help="compress output files as they are written (.gz / .zst); zstd needs the zstandard package",
+        )
+        parser.add_argument(
+            "--store",
+            type=valid_store,
+            metavar="sqlite:PATH",
+            help="upsert stats into a SQLite database instead of writing a new file per mode and run",
+        )
+
+    def add_request_arguments(parser, perf_group):
+
+        perf_group.add_argument(
+            "--rate-limit",
+            type=positive_float,
+            metavar="R",
+            help="maximum requests per second to Medium, shared by all workers; unlimited by default",
+        )
+        perf_group.add_argument(
+            "--max-retries",
+            type=int,
+            metavar="N",
+            default=5,
+            help="retries per request after a 429, 5xx or connection error, with jittered exponential backoff",
+        )
+        perf_group.add_argument(
+            "--retry-budget",
+            type=int,
+            metavar="N",
+            default=100,
+            help="total retries allowed across the whole run",
+        )
+        perf_group.add_argument(
+            "--metrics-out",
+            metavar="PATH",
+            help="write request/decode/write timings & counters at the end of the run: "
+            'Prometheus textfile for a ".prom" path, JSON otherwise, "-" for stdout',
+        )
+
+        cache_group = parser.add_argument_group("cache")
+        cache_group.add_argument(
+            "--cache-dir",
+            metavar="PATH",
+            default=DEFAULT_CACHE_DIR,
+            help="directory for cached Medium responses, reused by re-runs until they expire",
+        )
+        cache_group.add_argument("--no-cache", action="store_true", help="always fetch fresh responses")
+
+    def add_subarguments(parser):
+
+        add_output_arguments(parser)
+        parser.add_argument(
+            "--columnar",
+            choices=COLUMNAR_FORMATS,
+            help="also write flattened daily article events as Parquet/Arrow (needs pyarrow) or CSV",
+        )
         creds_group = parser.add_argument_group("creds")
         creds_group.add_argument(
             "--creds",
@@ -72,6 +171,54 @@ def get_argparser():
         period_group.add_argument("--start", type=valid_date, help="stats start date, format=YYYY-MM-DD")
         period_group.add_argument("--end", type=valid_date, help="stats end date, format=YYYY-MM-DD")
         period_group.add_argument("--is-utc", action="store_true", help="start/end times are in UTC")
+        period_group.add_argument(
+            "--resume",
+            metavar="RUN_ID",
+            help="finish an interrupted run, reusing its period, completed modes and any posts it checkpointed",
+        )
+        period_group.add_argument(
+            "--checkpoint",
+            action="store_true",
+            help="also log every fetched post, so --resume can skip them; doubles the disk written",
+        )
+        period_group.add_argument(
+            "--incremental",
+            action="store_true",
+            help="only fetch post events newer than those fetched by previous runs",
+        )
+        period_group.add_argument(
+            "--changed-only",
+            action="store_true",
+            help="only fetch per-post stats for posts whose totals changed since previous runs",
+        )
+
+        perf_group = parser.add_argument_group("performance")
+        perf_group.add_argument(
+            "--concurrency",
+            type=positive_int,
+            metavar="N",
+            default=1,
+            help="number of per-post stats requests to run in parallel",
+        )
+        perf_group.add_argument(
+            "--batch-size",
+            type=positive_int,
+            metavar="K",
+            default=1,
+            help="number of posts to request per GraphQL query; shrinks automatically if rejected",
+        )
+        perf_group.add_argument(
+            "--shard-days",
+            type=positive_int,
+            metavar="N",
+            help="split each post's daily stats window into N-day shards; they run in parallel up to --concurrency",
+        )
+        perf_group.add_argument(
+            "--pipeline",
+            action="store_true",
+            help="start per-post requests as each summary / story overview page arrives, not after the last page",
+        )
+        add_request_arguments(parser, perf_group)
 
     cli_parser = argparse.ArgumentParser()
     subparser = cli_parser.add_subparsers(title="commands", dest="command")
@@ -102,10 +249,13 @@ def get_argparser():
 
     # USER
     usage = """\
-    medium-stats scrape_user -u USERNAME [--output_dir DIR] \
-    (--creds PATH | (--sid SID --uid UID)) \
-    (--all | [--start PERIOD_START] [--end PERIOD END]) [--is-utc]\
-    [--mode {summary, events, articles, referrers}]"""
+    medium-stats scrape_user -u USERNAME [--output_dir DIR] [--format FORMAT] [--compress {gzip, zstd}] \
+    [--columnar FORMAT] [--store sqlite:PATH] (--creds PATH | (--sid SID --uid UID)) \
+    (--all | [--start PERIOD_START] [--end PERIOD END]) [--is-utc] [--incremental] [--changed-only] \
+    [--resume RUN_ID] [--checkpoint]\
+    [--mode {summary, events, articles, referrers}] [--concurrency N] [--batch-size K]\
+    [--shard-days N] [--pipeline] [--rate-limit R] [--max-retries N] [--retry-budget N] [--metrics-out PATH]\
+    [--cache-dir PATH | --no-cache]"""
     usage = usage.replace("    ", "")
 
     scrape_user = subparser.add_parser("scrape_user", usage=usage, help="get user statistics")
@@ -122,10 +272,14 @@ def get_argparser():
 
     # PUBLICATION
     usage = """\
-    medium-stats scrape_publication -u USERNAME -s PUBLICATION_SLUG [--output_dir DIR] \
+    medium-stats scrape_publication -u USERNAME -s PUBLICATION_SLUG [--collection-id ID] [--output_dir DIR] \
+    [--format FORMAT] [--compress {gzip, zstd}] [--columnar FORMAT] [--store sqlite:PATH] \
     (--creds PATH | (--sid SID --uid UID)) \
-    (--all | [--start PERIOD_START] [--end PERIOD_END]) [--is-utc]\
-    [--mode {events, story_overview, articles, referrers}]"""
+    (--all | [--start PERIOD_START] [--end PERIOD_END]) [--is-utc] [--incremental] [--changed-only] \
+    [--resume RUN_ID] [--checkpoint]\
+    [--mode {events, story_overview, articles, referrers}] [--concurrency N] [--batch-size K]\
+    [--shard-days N] [--pipeline] [--rate-limit R] [--max-retries N] [--retry-budget N] [--metrics-out PATH]\
+    [--cache-dir PATH | --no-cache]"""
     usage = usage.replace("    ", "")
 
     scrape_pub = subparser.add_parser("scrape_publication", usage=usage, help="get publication statistics")
@@ -133,7 +287,12 @@ def get_argparser():
     slug_msg = """ 
     publication slug, e.g. "publication-name" if url is "medium.com/publication-name"
     """
-    scrape_pub.add_argument("-s", metavar="PUBLICATION_SLUG", help=cleandoc(slug_msg))
+    scrape_pub.add_argument("-s", metavar="PUBLICATION_SLUG", help=slug_msg.strip())
+    scrape_pub.add_argument(
+        "--collection-id",
+        metavar="ID",
+        help="publication's collection id, if known; skips looking it up from the publication homepage",
+    )
     add_subarguments(scrape_pub)
     scrape_pub.add_argument(
         "--mode",
@@ -143,6 +302,43 @@ def get_argparser():
         help="limit retrieval to particular statistics; defaults to all modes",
     )
 
+    # BATCH
+    usage = """\
+    medium-stats scrape_batch MANIFEST [--output_dir DIR] [--format FORMAT] [--compress {gzip, zstd}] \
+    [--store sqlite:PATH] [--creds PATH] [--jobs J] [--max-in-flight N] [--rate-limit R] [--max-retries N] \
+    [--retry-budget N] [--metrics-out PATH] \
+    [--cache-dir PATH | --no-cache]"""
+    usage = usage.replace("    ", "")
+
+    batch_help = "run many scrape_user/scrape_publication commands in one process"
+    scrape_batch = subparser.add_parser("scrape_batch", usage=usage, help=batch_help)
+    manifest_msg = """
+    file with one scrape_user/scrape_publication command per line, e.g. "scrape_user -u USERNAME --all"
+    """
+    scrape_batch.add_argument("manifest", metavar="MANIFEST", type=valid_path, help=manifest_msg.strip())
+    add_output_arguments(scrape_batch)
+    scrape_batch.add_argument(
+        "--creds",
+        default=default_creds,
+        help='.ini file path with a "sid"/"uid" section per account; sections are matched by -u',
+    )
+    perf_group = scrape_batch.add_argument_group("performance")
+    perf_group.add_argument(
+        "--jobs",
+        type=positive_int,
+        metavar="J",
+        default=4,
+        help="number of accounts/publications scraped at the same time",
+    )
+    perf_group.add_argument(
+        "--max-in-flight",
+        type=positive_int,
+        metavar="N",
+        default=8,
+        help="maximum concurrent requests to Medium across all accounts",
+    )
+    add_request_arguments(scrape_batch, perf_group)
+
     return cli_parser
 
 
@@ -160,6 +356,11 @@ def parse_scraper_args(args, parser):
     if cookies_supplied:
         args.creds = None
 
+    if args.resume:
+        if bool(args.all or args.start or args.end):
+            parser.error("Can't set a period with \"--resume\"; the resumed run's period is used")
+        return args
+
     if not bool(args.all or args.start or args.end):
         parser.error('Period must be set as "--all" or a range with "--start" and/or "--stop" values')
 
@@ -190,6 +391,32 @@ def parse_scraper_args(args, parser):
     return args
 
 
+def read_manifest(path, args, parser):
+    """
+    Parses a batch manifest: one scrape_user / scrape_publication command line per line, written as on
+    the command line minus "medium-stats". Blank lines and "#" comments are skipped. The batch's
+    --output_dir, --creds, --format and --compress apply unless a line sets its own.
+    """
+
+    jobs = []
+    with open(path) as f:
+        for n, line in enumerate(f, start=1):
+            tokens = shlex.split(line, comments=True)
+            if not tokens:
+                continue
+            if tokens[0] not in ("scrape_user", "scrape_publication"):
+                parser.error(f"manifest line {n}: command must be scrape_user or scrape_publication")
+            inherited = ["--output_dir", args.output_dir, "--creds", args.creds, "--format", args.format]
+            if args.compress:
+                inherited += ["--compress", args.compress]
+            job = parser.parse_args(tokens[:1] + inherited + tokens[1:])
+            # the cache and the store are shared by the whole batch
+            job.cache_dir, job.no_cache, job.store = args.cache_dir, args.no_cache, args.store
+            jobs.append(parse_scraper_args(job, parser))
+
+    return jobs
+
+
 class MediumConfigHelper:
     def __init__(self, config_path, account_name):
 
@@ -0,0 +1,182 @@
+import csv
+from array import array
+from importlib.util import find_spec
+
+from medium_stats.writers import atomic_path
+
+POST_EVENT_FIELDS = ["post_id", "periodStartedAt", "views", "internalReferrerViews", "memberTtr", "amount"]
+
+# dailyStats fields held by DailyStatsFrame, as signed 64-bit integer columns
+DAILY_STATS_COLUMNS = ["periodStartedAt", "views", "internalReferrerViews", "memberTtr"]
+
+# columnar format -> file extension
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+
+def flatten_post_events(post):
+    """
+    Yields one row tuple (in POST_EVENT_FIELDS order) per day of a post's "articles" stats,
+    joining "dailyStats" and "earnings.dailyEarnings" on periodStartedAt.
+    """
+
+    if not post:
+        return
+
+    rows = {}
+    for day in post.get("dailyStats") or []:
+        rows[day["periodStartedAt"]] = [day.get("views"), day.get("internalReferrerViews"), day.get("memberTtr"), None]
+
+    earnings = (post.get("earnings") or {}).get("dailyEarnings") or []
+    for day in earnings:
+        row = rows.setdefault(day["periodStartedAt"], [None, None, None, None])
+        row[3] = day.get("amount")
+
+    for period in sorted(rows):
+        yield (post["id"], period, *rows[period])
+
+
+def resolve_columnar_format(format_):
+    """Falls back to CSV when a pyarrow-backed format is requested but pyarrow isn't installed"""
+
+    if format_ not in COLUMNAR_FORMATS:
+        raise ValueError(f'"format_" param must be one of {list(COLUMNAR_FORMATS)}, not "{format_}"')
+
+    if format_ != "csv" and not find_spec("pyarrow"):
+        print(f'pyarrow is not installed; writing CSV instead of "{format_}"')
+        print('Install it by executing "pip install medium_stats[columnar]"')
+        return "csv"
+
+    return format_
+
+
+class PostEventsTable:
+    """Accumulates flattened daily post events column by column for a columnar export"""
+
+    def __init__(self):
+
+        self.columns = {f: [] for f in POST_EVENT_FIELDS}
+
+    def __len__(self):
+
+        return len(self.columns["post_id"])
+
+    def append(self, post):
+
+        for row in flatten_post_events(post):
+            for field, value in zip(POST_EVENT_FIELDS, row):
+                self.columns[field].append(value)
+
+    def track(self, posts):
+        """Passes posts through unchanged, flattening each one into the table as it goes by"""
+
+        for post in posts:
+            self.append(post)
+            yield post
+
+    def to_arrow(self):
+
+        import pyarrow as pa
+
+        schema = pa.schema(
+            [
+                ("post_id", pa.string()),
+                ("periodStartedAt", pa.timestamp("ms", tz="UTC")),
+                ("views", pa.int64()),
+                ("internalReferrerViews", pa.int64()),
+                ("memberTtr", pa.int64()),
+                ("amount", pa.float64()),
+            ]
+        )
+        return pa.Table.from_pydict(self.columns, schema=schema)
+
+    def write(self, filepath, format_="parquet"):
+        """Writes the table to "filepath" (extension set by format_) and returns the path written"""
+
+        format_ = resolve_columnar_format(format_)
+        filepath = f"{filepath}{COLUMNAR_FORMATS[format_]}"
+
+        with atomic_path(filepath) as tmp_path:
+            if format_ == "csv":
+                with open(tmp_path, "w", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(POST_EVENT_FIELDS)
+                    writer.writerows(zip(*self.columns.values()))
+            elif format_ == "parquet":
+                import pyarrow.parquet as pq
+
+                pq.write_table(self.to_arrow(), tmp_path)
+            else:
+                import pyarrow as pa
+
+                table = self.to_arrow()
+                with pa.OSFile(tmp_path, "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+
+        return filepath
+
+
+class DailyStatsFrame:
+    """
+    Compact in-memory form of many posts' "articles" dailyStats: one array("q") column per field in
+    DAILY_STATS_COLUMNS, all posts' rows back to back, with "offsets" marking where each post's rows
+    start (rows of post_ids[i] are offsets[i]:offsets[i + 1]). Missing values are stored as 0.
+    """
+
+    def __init__(self):
+
+        self.post_ids = []
+        self.offsets = array("q", [0])
+        self.columns = {f: array("q") for f in DAILY_STATS_COLUMNS}
+
+    @classmethod
+    def from_posts(cls, posts):
+        """Builds a frame from an iterable of post stats objects, consuming it lazily"""
+
+        frame = cls()
+        for post in posts:
+            frame.append(post)
+
+        return frame
+
+    def __len__(self):
+
+        return self.offsets[-1]
+
+    @property
+    def nbytes(self):
+
+        return sum(c.itemsize * len(c) for c in (self.offsets, *self.columns.values()))
+
+    def append(self, post):
+
+        if not post:
+            return
+
+        days = post.get("dailyStats") or []
+        for field, column in self.columns.items():
+            column.extend(day.get(field) or 0 for day in days)
+        self.post_ids.append(post["id"])
+        self.offsets.append(self.offsets[-1] + len(days))
+
+    def post(self, post_id):
+        """One post's columns, as array slices"""
+
+        i = self.post_ids.index(post_id)
+        start, stop = self.offsets[i], self.offsets[i + 1]
+
+        return {field: column[start:stop] for field, column in self.columns.items()}
+
+    def to_numpy(self):
+        """
+        The columns as NumPy int64 arrays viewing the same memory, plus "post_index" (each row's
+        position in post_ids). Needs numpy ("pip install medium_stats[numpy]").
+        """
+
+        import numpy as np
+
+        counts = np.diff(np.frombuffer(self.offsets, dtype=np.int64))
+        arrays = {f: np.frombuffer(c, dtype=np.int64) if c else np.empty(0, np.int64) for f, c in self.columns.items()}
+        arrays["post_index"] = np.repeat(np.arange(len(self.post_ids)), counts)
+
+        return arrays
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from medium_stats.writers import atomic_path
+
+METRIC_PREFIX = "medium_stats_"
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+gql_endpoint_path = "/_/graphql"
+
+
+def request_labels(url, payload=None):
+    """Labels a request by the stats endpoint it hits and, for GraphQL, its operationName"""
+
+    # imported here as the cache module builds on the scheduler, which records into Metrics
+    from medium_stats.cache import classify_request
+
+    if payload is not None or url.endswith(gql_endpoint_path):
+        return {"endpoint": "graphql", "operation": (payload or {}).get("operationName", "")}
+
+    return {"endpoint": classify_request(url)}
+
+
+def _label_key(labels):
+
+    return tuple(sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+
+        cumulative, running = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += count
+            cumulative[bound] = running
+
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": cumulative}
+
+
+class Metrics:
+    """
+    Thread-safe counters and latency histograms, each keyed by name plus labels (e.g. endpoint,
+    operation). flush() hands a snapshot to every sink; a sink is any object with a write(snapshot) method.
+    """
+
+    def __init__(self, sinks=None):
+
+        self.sinks = list(sinks or [])
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+
+        self.sinks.append(sink)
+
+    def inc(self, name, value=1, **labels):
+
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observes the seconds spent inside the block, whether or not it raises"""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self._counters.items())]
+            histograms = [
+                {"name": n, "labels": dict(l), **h.to_dict()} for (n, l), h in sorted(self._histograms.items())
+            ]
+
+        return {"counters": counters, "histograms": histograms}
+
+    def flush(self):
+
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.write(snapshot)
+
+
+class JsonSummarySink:
+    """Writes the metrics snapshot as JSON to "path", or prints it when path is None or '-'"""
+
+    def __init__(self, path=None):
+
+        self.path = None if path == "-" else path
+
+    def write(self, snapshot):
+
+        if self.path is None:
+            print(json.dumps(snapshot, indent=2))
+            return
+
+        with atomic_path(self.path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f, indent=2)
+
+
+class PrometheusTextfileSink:
+    """Writes the metrics snapshot in the Prometheus text format, e.g. for node_exporter's textfile collector"""
+
+    def __init__(self, path):
+
+        self.path = path
+
+    @staticmethod
+    def _format_labels(labels):
+
+        if not labels:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in labels.values())
+        return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+    def render(self, snapshot):
+
+        lines, typed = [], set()
+        for c in snapshot["counters"]:
+            name = f"{METRIC_PREFIX}{c['name']}"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{self._format_labels(c['labels'])} {c['value']}")
+
+        for h in snapshot["histograms"]:
+            name = f"{METRIC_PREFIX}{h['name']}"
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in h["buckets"].items():
+                lines.append(f"{name}_bucket{self._format_labels({**h['labels'], 'le': bound})} {count}")
+            lines.append(f"{name}_sum{self._format_labels(h['labels'])} {h['sum']}")
+            lines.append(f"{name}_count{self._format_labels(h['labels'])} {h['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, snapshot):
+
+        with atomic_path(self.path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                f.write(self.render(snapshot))
+
+
+def sink_for_path(path):
+    """Prometheus textfile for a ".prom" path, JSON otherwise ("-" prints the JSON to stdout)"""
+
+    if path != "-" and os.path.splitext(path)[1] == ".prom":
+        return PrometheusTextfileSink(path)
+
+    return JsonSummarySink(path)
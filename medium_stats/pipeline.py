@@ -0,0 +1,57 @@
+import queue
+import threading
+
+# postIds buffered between pagination and each per-post mode: ten summary pages
+FEED_SIZE = 500
+
+# how often a producer blocked on a full feed checks whether its consumer went away
+_PUT_POLL_SECONDS = 0.1
+
+_END = object()
+
+
+class FeedAborted(Exception):
+    """Raised to a feed's consumer when its producer failed before delivering every postId"""
+
+
+class PostIdFeed:
+    """
+    Bounded hand-off of postIds from pagination (the producer) to one per-post mode (the consumer), which
+    iterates the feed as pages arrive. put() blocks while the feed is full, so a consumer that falls behind
+    throttles pagination. Once the consumer stops early (cancel()), further puts are dropped instead.
+    """
+
+    def __init__(self, maxsize=FEED_SIZE):
+
+        self._queue = queue.Queue(maxsize)
+        self._cancelled = threading.Event()
+        self._error = None
+
+    def put(self, item):
+
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, error=None):
+        """Ends the feed; pass the producer's exception to make the consumer raise FeedAborted instead"""
+
+        self._error = error
+        self.put(_END)
+
+    def cancel(self):
+
+        self._cancelled.set()
+
+    def __iter__(self):
+
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                if self._error is not None:
+                    raise FeedAborted("pagination failed before every postId was delivered") from self._error
+                return
+            yield item
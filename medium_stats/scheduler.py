@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.exceptions import Timeout
+
+from medium_stats.metrics import request_labels
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """Returns the seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Shared by every worker of a run: a token bucket caps the request rate, failed requests back off
+    with jittered exponential delays (or as long as Retry-After asks), and all retries draw on one budget.
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        burst=None,
+        max_retries=5,
+        retry_budget=100,
+        backoff_base=0.5,
+        backoff_max=60.0,
+        max_in_flight=None,
+    ):
+
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.counters = Counter()
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        # caps concurrent requests across every grabber sharing this scheduler
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def acquire(self):
+        """Blocks until a request may be sent"""
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0 and self.rate:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+                    self._last_refill = now
+                    wait = (1 - self._tokens) / self.rate
+                if wait <= 0:
+                    if self.rate:
+                        self._tokens -= 1
+                    self.counters["requests"] += 1
+                    return
+            self.count("throttled_seconds", wait)
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self):
+        """Holds one of the max_in_flight request slots for the duration of a send"""
+
+        if not self._slots:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds this worker should sleep before retry number "attempt"; a Retry-After pauses every worker"""
+
+        if retry_after is not None:
+            # acquire() holds back every worker, this one included, until the pause ends
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.count("backoff_seconds", retry_after)
+            return 0.0
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        self.count("backoff_seconds", delay)
+        return delay
+
+    def spend_retry(self, attempt):
+        """Claims one retry from the shared budget; False once this request or the run is out of retries"""
+
+        with self._lock:
+            if attempt >= self.max_retries:
+                return False
+            if self.counters["retries"] >= self.retry_budget:
+                self.counters["budget_exhausted"] += 1
+                return False
+            self.counters["retries"] += 1
+            return True
+
+    def count(self, name, value=1):
+
+        with self._lock:
+            self.counters[name] += value
+
+    def stats(self):
+
+        with self._lock:
+            return dict(self.counters)
+
+
+def request_payload(request):
+    """The JSON body of a POST request (i.e. a GraphQL query), or None"""
+
+    if request.method != "POST" or not request.body:
+        return None
+    try:
+        return json.loads(request.body)
+    except ValueError:
+        return None
+
+
+class ScheduledAdapter(HTTPAdapter):
+    """
+    Transport adapter sending every request through a RequestScheduler, when one is given.
+    Retries are counted per endpoint into "metrics", when given.
+    """
+
+    def __init__(self, scheduler=None, metrics=None, **kwargs):
+
+        self.scheduler = scheduler
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def _count_retry(self, request, reason):
+
+        if self.metrics:
+            labels = request_labels(request.url, request_payload(request))
+            self.metrics.inc("retries_total", **labels, reason=reason)
+
+    def send(self, request, **kwargs):
+
+        if not self.scheduler:
+            return super().send(request, **kwargs)
+
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            try:
+                with self.scheduler.slot():
+                    response = super().send(request, **kwargs)
+            except (ConnectionError, Timeout):
+                self.scheduler.count("connection_errors")
+                if not self.scheduler.spend_retry(attempt):
+                    raise
+                self._count_retry(request, "connection_error")
+                time.sleep(self.scheduler.backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                return response
+
+            self.scheduler.count(f"status_{response.status_code}")
+            if not self.scheduler.spend_retry(attempt):
+                return response
+            self._count_retry(request, str(response.status_code))
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            # hand the unread body's connection back to the pool before waiting to retry
+            response.close()
+            time.sleep(self.scheduler.backoff(attempt, retry_after))
+            attempt += 1
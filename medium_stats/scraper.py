@@ -1,27 +1,38 @@
 import json
+import os
 import re
-import traceback
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
 from functools import partial
 
 import requests
-from lxml import html
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from medium_stats.cache import CachingAdapter
+from medium_stats.columnar import DailyStatsFrame
+from medium_stats.metrics import Metrics
+from medium_stats.metrics import request_labels
+from medium_stats.scheduler import ScheduledAdapter
 from medium_stats.utils import convert_datetime_to_unix
 from medium_stats.utils import make_utc_explicit
+from medium_stats.writers import write_records
 
-stats_post_chart_q = """\
-    query StatsPostChart($postId: ID!, $startAt: Long!, $endAt: Long!) {
-      post(id: $postId) {
+stats_post_chart_fields = """\
         id
         ...StatsPostChart_dailyStats
         ...StatsPostChart_dailyEarnings
-        __typename
-      }
-    }
+        __typename"""
 
+stats_post_chart_fragments = """\
     fragment StatsPostChart_dailyStats on Post {
       dailyStats(startAt: $startAt, endAt: $endAt) {
         periodStartedAt
@@ -47,9 +58,16 @@ stats_post_chart_q = """\
       __typename
     }"""
 
-stats_post_ref_q = """\
-    query StatsPostReferrersContainer($postId: ID!) {
-        post(id: $postId) {
+stats_post_chart_q = f"""\
+    query StatsPostChart($postId: ID!, $startAt: Long!, $endAt: Long!) {{
+      post(id: $postId) {{
+{stats_post_chart_fields}
+      }}
+    }}
+
+{stats_post_chart_fragments}"""
+
+stats_post_ref_fields = """\
             id
             ...StatsPostReferrersExternalRow_post
             referrers {
@@ -60,10 +78,9 @@ stats_post_ref_q = """\
               ...StatsPostReferrersAll_totalStats
               __typename
             }
-            __typename
-        }
-    }
+            __typename"""
 
+stats_post_ref_fragments = """\
     fragment StatsPostReferrersExternalRow_post on Post {
       title
       __typename
@@ -101,8 +118,138 @@ stats_post_ref_q = """\
     }
 """
 
+stats_post_ref_q = f"""\
+    query StatsPostReferrersContainer($postId: ID!) {{
+        post(id: $postId) {{
+{stats_post_ref_fields}
+        }}
+    }}
+
+{stats_post_ref_fragments}"""
+
+story_stats_queries = {
+    "view_read": {
+        "operationName": "StatsPostChart",
+        "fields": stats_post_chart_fields,
+        "fragments": stats_post_chart_fragments,
+        "variables": "$startAt: Long!, $endAt: Long!",
+    },
+    "referrer": {
+        "operationName": "StatsPostReferrersContainer",
+        "fields": stats_post_ref_fields,
+        "fragments": stats_post_ref_fragments,
+        "variables": "",
+    },
+}
+
+gql_endpoint = "https://medium.com/_/graphql"
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# anti-JSON-hijacking prefix Medium puts in front of its JSON responses
+xssi_prefix = "])}while(1);</x>"
+xssi_prefix_bytes = xssi_prefix.encode()
+
+# GraphQL error messages signalling that an aliased batch query asked for too much at once; a bare
+# "exceeded" or "too many" isn't enough, as rate limit errors ("Too many requests") say them too
+batch_rejection_pattern = re.compile(
+    r"too (large|complex)|too many (fields|aliases|nodes)|complexity|(size|depth|cost)\b.*\bexceed", re.IGNORECASE
+)
+
+
+def build_batch_query(type_, size):
+    """
+    Builds an aliased multi-post query, e.g. for size=2:
+    query StatsPostChartBatch($p0: ID!, $p1: ID!, ...) {
+      p0: post(id: $p0) {...}
+      p1: post(id: $p1) {...}
+    }
+    """
+
+    q = story_stats_queries[type_]
+    aliases = [f"p{i}" for i in range(size)]
+    var_defs = ", ".join([f"${a}: ID!" for a in aliases] + ([q["variables"]] if q["variables"] else []))
+    selections = "\n".join(f"      {a}: post(id: ${a}) {{\n{q['fields']}\n      }}" for a in aliases)
+    operation = f"{q['operationName']}Batch"
+
+    query = f"    query {operation}({var_defs}) {{\n{selections}\n    }}\n\n{q['fragments']}"
+    return operation, query
+
+
+def build_adapter(cache=None, scheduler=None, pool_maxsize=10, metrics=None):
+    """Transport adapter for medium.com, with optional response caching and request scheduling"""
+
+    # size the connection pool so concurrent workers don't discard connections
+    pool_kwargs = {"pool_connections": 1, "pool_maxsize": max(pool_maxsize, 10)}
+    if cache:
+        return CachingAdapter(cache, scheduler=scheduler, metrics=metrics, **pool_kwargs)
+
+    return ScheduledAdapter(scheduler=scheduler, metrics=metrics, **pool_kwargs)
+
+
+def decode_payload(body):
+    """
+    Returns the "payload" of a Medium JSON response body, given as bytes (preferably) or str.
+    The XSSI prefix is skipped by offset rather than replaced, and bytes go to orjson as-is when
+    it's installed, so large bodies aren't copied on their way to the parser.
+    """
+
+    if isinstance(body, str):
+        offset = len(xssi_prefix) if body.startswith(xssi_prefix) else 0
+        return (orjson or json).loads(body[offset:])["payload"]
+
+    offset = len(xssi_prefix_bytes) if body.startswith(xssi_prefix_bytes) else 0
+    view = memoryview(body)[offset:]
+    if orjson is not None:
+        return orjson.loads(view)["payload"]
+
+    # decoding straight from the view skips the copy a bytes slice would make
+    return json.loads(str(view, "utf-8"))["payload"]
+
+
+def _merge_daily(rows_lists):
+
+    merged = {}
+    for rows in rows_lists:
+        for row in rows or []:
+            merged.setdefault(row["periodStartedAt"], row)
+
+    return [merged[period] for period in sorted(merged)]
+
+
+def merge_post_shards(posts):
+    """
+    Merges the "view_read" stats of one post fetched over several date shards: daily stats and
+    earnings are concatenated and deduped by periodStartedAt, other fields come from the first shard.
+    """
+
+    posts = [p for p in posts if p]
+    if len(posts) <= 1:
+        return posts[0] if posts else None
+
+    merged = {**posts[0], "dailyStats": _merge_daily(p.get("dailyStats") for p in posts)}
+    earnings = [p["earnings"] for p in posts if p.get("earnings")]
+    if earnings:
+        committed = [e.get("lastCommittedPeriodStartedAt") for e in earnings]
+        merged["earnings"] = {
+            **earnings[0],
+            "dailyEarnings": _merge_daily(e.get("dailyEarnings") for e in earnings),
+            "lastCommittedPeriodStartedAt": max((c for c in committed if c is not None), default=None),
+        }
+
+    return merged
+
+
+class BatchRejectedError(Exception):
+    """Raised when the GraphQL server refuses a batched query as too large or too complex"""
+
+
+class StatGrabberCore:
+    """
+    Period handling, request building and response decoding shared by the sync and async grabbers.
+    Nothing here does any I/O.
+    """
 
-class StatGrabberBase:
     def __init__(self, sid, uid, start, stop, now=None, already_utc=False):
 
         for s in [start, stop]:
@@ -116,7 +263,6 @@ class StatGrabberBase:
         self.sid = sid
         self.uid = uid
         self.cookies = {"sid": sid, "uid": uid}
-        self._setup_requests()
         if not now:
             self.now = datetime.now(timezone.utc)
         else:
@@ -124,30 +270,131 @@ class StatGrabberBase:
                 raise AttributeError(f'"now" param ({now}) must be tz-aware datetime')
             self.now = make_utc_explicit(now, utc_naive=False)
 
+    def get_article_ids(self, summary_stats_json):
+
+        ids = [a["postId"] for a in summary_stats_json]
+        self.articles = ids
+        return ids
+
+    def window_start(self, post_id, since):
+        """Unix ms start of a post's "view_read" window, given "since" floors ({postId: unix ms})"""
+
+        start = since.get(post_id, self.start_unix)
+        # a floor outside the period (e.g. a mark left by a later period's run) doesn't narrow it
+        return start if self.start_unix < start < self.stop_unix else self.start_unix
+
+    @staticmethod
+    def _decode_body(body):
+
+        return decode_payload(body)
+
+    @staticmethod
+    def _next_page_params(data, params):
+        """Params for the page after "data", or None on the last page"""
+
+        next_page = data.get("paging", {}).get("next")
+        if not next_page:
+            return None
+        return {**params, "to": next_page["to"]}
+
+    def _story_stats_request(self, post_id, type_="view_read", start_unix=None, end_unix=None):
+        """GraphQL POST body for one post's stats"""
+
+        if type_ not in ["view_read", "referrer"]:
+            raise ValueError('"type" param must be either "view_read" or "referrer"')
+
+        post_data = {"variables": {"postId": post_id}}
+
+        if type_ == "view_read":
+            post_data["operationName"] = "StatsPostChart"
+            v = post_data["variables"]
+            v["startAt"] = self.start_unix if start_unix is None else start_unix
+            v["endAt"] = self.stop_unix if end_unix is None else end_unix
+            post_data["query"] = stats_post_chart_q
+        elif type_ == "referrer":
+            post_data["operationName"] = "StatsPostReferrersContainer"
+            post_data["query"] = stats_post_ref_q
+
+        return post_data
+
+
+class StatGrabberBase(StatGrabberCore):
+    def __init__(
+        self,
+        sid,
+        uid,
+        start,
+        stop,
+        now=None,
+        already_utc=False,
+        concurrency=1,
+        batch_size=1,
+        cache=None,
+        scheduler=None,
+        adapter=None,
+        metrics=None,
+        shard_days=None,
+    ):
+
+        super().__init__(sid, uid, start, stop, now, already_utc)
+        if int(concurrency) < 1:
+            raise ValueError(f'"concurrency" param must be a positive integer, not "{concurrency}"')
+        self.concurrency = int(concurrency)
+        if int(batch_size) < 1:
+            raise ValueError(f'"batch_size" param must be a positive integer, not "{batch_size}"')
+        self.batch_size = int(batch_size)
+        if shard_days is not None and int(shard_days) < 1:
+            raise ValueError(f'"shard_days" param must be a positive integer, not "{shard_days}"')
+        self.shard_days = int(shard_days) if shard_days else None
+        self._batch_lock = threading.Lock()
+        self._pool = None
+        self.cache = cache
+        self.scheduler = scheduler
+        self.adapter = adapter
+        self.metrics = metrics or Metrics()
+        self._setup_requests()
+
     def _setup_requests(self):
 
         s = requests.Session()
         s.headers.update({"content-type": "application/json", "accept": "application/json"})
+        # a shared adapter lets several grabbers (e.g. accounts in a batch run) reuse one connection pool
+        adapter = self.adapter or build_adapter(
+            self.cache, self.scheduler, pool_maxsize=self.concurrency, metrics=self.metrics
+        )
+        s.mount("https://", adapter)
 
         cookies = requests.utils.cookiejar_from_dict(self.cookies)
         s.cookies = cookies
         self.session = s
 
+    def _record_response(self, response, labels):
+
+        self.metrics.inc("requests_total", **labels)
+        self.metrics.inc("response_bytes_total", len(response.content), **labels)
+        if response.status_code >= 400:
+            self.metrics.inc("errors_total", **labels, status=str(response.status_code))
+
     def _fetch(self, url, params=None):
 
-        response = self.session.get(url, params=params)
+        labels = request_labels(url)
+        with self.metrics.timer("request_seconds", **labels):
+            response = self.session.get(url, params=params)
+        self._record_response(response, labels)
         response.raise_for_status()
         return response
 
     def _decode_json(self, response):
 
         # TODO add TypeError if response is not a response object
-        cleaned = response.text.replace("])}while(1);</x>", "")
-        return json.loads(cleaned)["payload"]
+        with self.metrics.timer("decode_seconds", **request_labels(str(response.url))):
+            return self._decode_body(response.content)
 
     # TODO - delete if unnecessary
     def _find_data_in_html(self, response):
 
+        from lxml import html
+
         etree = html.fromstring(response)
         refs = etree.xpath('//script[contains(text(), "references")]')[0]
         refs = refs.replace('// <![CDATA[\nwindow["obvInit"](', "")
@@ -155,146 +402,467 @@ class StatGrabberBase:
 
         return json.loads(refs)
 
-    def get_article_ids(self, summary_stats_json):
+    def get_story_stats(self, post_id, type_="view_read", start_unix=None, end_unix=None):
 
-        ids = [a["postId"] for a in summary_stats_json]
-        self.articles = ids
-        return ids
+        post_data = self._story_stats_request(post_id, type_, start_unix, end_unix)
+        labels = request_labels(gql_endpoint, post_data)
+        with self.metrics.timer("request_seconds", **labels):
+            r = self.session.post(gql_endpoint, json=post_data)
+        self._record_response(r, labels)
+        r.raise_for_status()
+
+        with self.metrics.timer("decode_seconds", **labels):
+            return r.json()
 
-    def get_story_stats(self, post_id, type_="view_read"):
+    def get_story_stats_batch(self, post_ids, type_="view_read", start_unix=None, end_unix=None):
+        """
+        Fetches stats for several posts in one aliased GraphQL request.
+        Returns the list of "post" objects in the same order as post_ids.
+        """
 
         if type_ not in ["view_read", "referrer"]:
             raise ValueError('"type" param must be either "view_read" or "referrer"')
 
-        gql_endpoint = "https://medium.com/_/graphql"
-
-        post_data = {"variables": {"postId": post_id}}
-
+        operation, query = build_batch_query(type_, len(post_ids))
+        variables = {f"p{i}": post_id for i, post_id in enumerate(post_ids)}
         if type_ == "view_read":
-            post_data["operationName"] = "StatsPostChart"
-            v = post_data["variables"]
-            v["startAt"], v["endAt"] = self.start_unix, self.stop_unix
-            post_data["query"] = stats_post_chart_q
-        elif type_ == "referrer":
-            post_data["operationName"] = "StatsPostReferrersContainer"
-            post_data["query"] = stats_post_ref_q
+            variables["startAt"] = self.start_unix if start_unix is None else start_unix
+            variables["endAt"] = self.stop_unix if end_unix is None else end_unix
+        post_data = {"operationName": operation, "variables": variables, "query": query}
 
-        r = self.session.post(gql_endpoint, json=post_data)
+        labels = request_labels(gql_endpoint, post_data)
+        with self.metrics.timer("request_seconds", **labels):
+            r = self.session.post(gql_endpoint, json=post_data)
+        self._record_response(r, labels)
 
-        return r.json()
+        if r.status_code == 413:
+            raise BatchRejectedError(f"batch of {len(post_ids)} posts rejected as too large")
+        r.raise_for_status()
+        with self.metrics.timer("decode_seconds", **labels):
+            data = r.json()
+        errors = data.get("errors") or []
+        if any(batch_rejection_pattern.search(str(e.get("message", ""))) for e in errors):
+            raise BatchRejectedError(f"batch of {len(post_ids)} posts rejected: {errors[0]['message']}")
 
-    def get_all_story_stats(self, post_ids, type_="view_read"):
+        return [data["data"][f"p{i}"] for i in range(len(post_ids))]
 
-        container = {"data": {"post": []}}
+    def _get_story_stats_adaptive(self, post_ids, type_="view_read", start_unix=None, end_unix=None):
 
-        for post in post_ids:
-            data = self.get_story_stats(post, type_=type_)
-            container["data"]["post"] += [data["data"]["post"]]
+        try:
+            return self.get_story_stats_batch(post_ids, type_=type_, start_unix=start_unix, end_unix=end_unix)
+        except BatchRejectedError:
+            if len(post_ids) == 1:
+                raise
+            # split the rejected batch and remember the smaller size for later batches
+            half = len(post_ids) // 2
+            with self._batch_lock:
+                self.batch_size = min(self.batch_size, half)
+            fetch = partial(self._get_story_stats_adaptive, type_=type_, start_unix=start_unix, end_unix=end_unix)
+            return fetch(post_ids[:half]) + fetch(post_ids[half:])
+
+    def _chunk_post_ids(self, post_ids):
+
+        post_ids = list(post_ids)
+        idx = 0
+        while idx < len(post_ids):
+            # batch_size is read per chunk so a shrink applies to chunks not yet handed out
+            size = self.batch_size
+            yield post_ids[idx : idx + size]
+            idx += size
+
+    @contextmanager
+    def shared_pool(self):
+        """
+        Runs every _map call made inside the block on one pool of "concurrency" workers, so callers in
+        other threads (e.g. modes run side by side) interleave their requests under one concurrency cap.
+        """
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            self._pool = pool
+            try:
+                yield pool
+            finally:
+                self._pool = None
+
+    def _map(self, func, iterable):
+
+        if self._pool is not None:
+            # keep at most "concurrency" tasks queued per caller, so concurrent callers take turns
+            pending = deque()
+            for item in iterable:
+                pending.append(self._pool.submit(func, item))
+                if len(pending) >= self.concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        elif self.concurrency > 1:
+            # executor.map yields results in input order regardless of completion order
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                yield from pool.map(func, iterable)
+        else:
+            yield from map(func, iterable)
+
+    def gather(self, *calls, return_exceptions=False):
+        """
+        Runs independent top-level fetches (zero-argument callables, e.g. partial(self.get_events, "views"))
+        side by side over the shared session and returns their results in order. Like asyncio.gather,
+        the first failure is raised - once every call has finished - unless return_exceptions is set,
+        in which case exceptions are returned in place of results.
+        """
+
+        with ThreadPoolExecutor(max_workers=max(len(calls), 1)) as pool:
+            futures = [pool.submit(call) for call in calls]
+
+        if return_exceptions:
+            return [f.exception() or f.result() for f in futures]
+        return [f.result() for f in futures]
+
+    def _group_by_window(self, post_ids, type_, since):
+
+        # posts sharing a window start can share a request; only "view_read" stats are windowed
+        post_ids = list(dict.fromkeys(post_ids))
+        if not since or type_ != "view_read":
+            return {None: post_ids}
+
+        windows = {}
+        for post_id in post_ids:
+            start = self.window_start(post_id, since)
+            windows.setdefault(start, []).append(post_id)
+
+        return windows
+
+    def _shard_window(self, start, type_):
+        """
+        Splits the window from "start" (None for the grabber's start) to the grabber's stop into
+        [start, end) shards of shard_days, on a grid anchored at the grabber's start so posts with
+        different window starts still share shards (and batched requests) after their first one.
+        """
+
+        if not self.shard_days or type_ != "view_read":
+            return [(start, None)]
+
+        start = self.start_unix if start is None else start
+        shard_ms = self.shard_days * DAY_MS
+        boundary = self.start_unix + (start - self.start_unix) // shard_ms * shard_ms
+        shards = []
+        while boundary < self.stop_unix:
+            end = min(boundary + shard_ms, self.stop_unix)
+            shards.append((max(boundary, start), end))
+            boundary = end
+
+        return shards or [(start, None)]
+
+    def _fetch_story_stats_task(self, task, type_="view_read"):
+        """(postIds, their post stats objects) for a (postIds, window start, window end) task"""
+
+        ids, start, end = task
+        if self.batch_size > 1:
+            return ids, self._get_story_stats_adaptive(ids, type_=type_, start_unix=start, end_unix=end)
+        data = self.get_story_stats(ids[0], type_=type_, start_unix=start, end_unix=end)
+        return ids, [data["data"]["post"]]
+
+    def iter_all_story_stats(self, post_ids, type_="view_read", since=None):
+        """
+        Yields each post's stats object in the order of post_ids, as soon as it has been fetched.
+        "since" optionally maps postIds to a unix-ms window start (e.g. a previous run's last
+        periodStartedAt) so only newer daily stats are requested for those posts.
+        With shard_days set, each post's window is fetched in shards that are merged back together.
+        """
+
+        post_ids = list(post_ids)
+        shards, shard_counts = {}, {}
+        for start, ids in self._group_by_window(post_ids, type_, since).items():
+            windows = self._shard_window(start, type_)
+            for window in windows:
+                shards.setdefault(window, []).extend(ids)
+            shard_counts.update(dict.fromkeys(ids, len(windows)))
+
+        def tasks():
+            for (start, end), ids in shards.items():
+                chunks = self._chunk_post_ids(ids) if self.batch_size > 1 else ([i] for i in ids)
+                for chunk in chunks:
+                    yield chunk, start, end
+
+        # posts grouped into other windows may arrive early; hold them until their turn
+        last_seen = {post_id: i for i, post_id in enumerate(post_ids)}
+        fetched, parts, position = {}, {}, 0
+        for ids, posts in self._map(partial(self._fetch_story_stats_task, type_=type_), tasks()):
+            for post_id, post in zip(ids, posts):
+                parts.setdefault(post_id, []).append(post)
+                if len(parts[post_id]) == shard_counts[post_id]:
+                    fetched[post_id] = merge_post_shards(parts.pop(post_id))
+            while position < len(post_ids) and post_ids[position] in fetched:
+                post_id = post_ids[position]
+                yield fetched.pop(post_id) if last_seen[post_id] == position else fetched[post_id]
+                position += 1
+
+    def iter_story_stats_stream(self, post_ids, type_="view_read", since=None):
+        """
+        Like iter_all_story_stats, but consumes post_ids lazily, e.g. from a PostIdFeed that pagination
+        is still filling: a window's request starts as soon as a batch's worth of its postIds has arrived,
+        and partial batches go out once post_ids is exhausted. Posts are yielded in arrival order; a
+        repeated postId is fetched and yielded once. "since" is read per post as it arrives, so it may
+        be filled in alongside post_ids.
+        """
+
+        order, shard_counts = deque(), {}
+
+        def tasks():
+            pending = {}
+            for post_id in post_ids:
+                if post_id in shard_counts:
+                    continue
+                start = None
+                if since is not None and type_ == "view_read":
+                    start = self.window_start(post_id, since)
+                windows = self._shard_window(start, type_)
+                shard_counts[post_id] = len(windows)
+                order.append(post_id)
+                for window in windows:
+                    ids = pending.setdefault(window, [])
+                    ids.append(post_id)
+                    if len(ids) >= self.batch_size:
+                        yield (pending.pop(window), *window)
+            for window, ids in pending.items():
+                for chunk in self._chunk_post_ids(ids):
+                    yield (chunk, *window)
+
+        fetched, parts = {}, {}
+        for ids, posts in self._map(partial(self._fetch_story_stats_task, type_=type_), tasks()):
+            for post_id, post in zip(ids, posts):
+                parts.setdefault(post_id, []).append(post)
+                if len(parts[post_id]) == shard_counts[post_id]:
+                    fetched[post_id] = merge_post_shards(parts.pop(post_id))
+            while order and order[0] in fetched:
+                yield fetched.pop(order.popleft())
+
+    def get_all_story_stats(self, post_ids, type_="view_read", since=None):
+
+        container = {"data": {"post": list(self.iter_all_story_stats(post_ids, type_=type_, since=since))}}
 
         return container
 
-    def write_json(self, data, filepath):
+    def get_story_stats_frame(self, post_ids, since=None):
+        """
+        Like get_all_story_stats(post_ids, "view_read", since), but packs the dailyStats into a
+        DailyStatsFrame as posts arrive instead of keeping a dict per day
+        """
 
-        if not re.search(".json$", filepath):
-            filepath = f"{filepath}.json"
+        return DailyStatsFrame.from_posts(self.iter_all_story_stats(post_ids, since=since))
 
-        try:
-            data = json.dumps(data, indent=2)
-        except:
-            traceback.print_exc()
+    def write_json(self, data, filepath, format_="json", compress=None):
+        """
+        Streams "data" to disk via a temp file and atomic rename. Lazy iterables inside "data"
+        are serialized one record at a time. format_ is one of "json" (indented), "compact"
+        or "ndjson"; compress, if given, "gzip" or "zstd".
+        """
 
-        with open(filepath, "w") as f:
-            f.write(data)
+        with self.metrics.timer("write_seconds", format=format_):
+            path = write_records(data, filepath, format_, compress)
+        self.metrics.inc("written_bytes_total", os.path.getsize(path), format=format_)
 
-        return filepath
+        return path
 
 
-class StatGrabberUser(StatGrabberBase):
-    def __init__(self, username, sid, uid, start, stop, now=None, already_utc=False):
+class UserRequestsMixin:
+    """Endpoints & params for a user's stats; shared by StatGrabberUser and its async counterpart"""
+
+    def _set_user_endpoints(self, username):
 
         self.username = str(username)
         self.slug = str(username)
-        super().__init__(sid, uid, start, stop, now, already_utc)
         self.stats_url = f"https://medium.com/@{username}/stats"
         self.totals_endpoint = f"https://medium.com/@{username}/stats/total/{self.start_unix}/{self.stop_unix}"
 
+    def _summary_request(self, events=False, limit=50, **kwargs):
+        """(url, params) of the first summary page"""
+
+        if events:
+            return self.totals_endpoint, None
+        return self.stats_url, {"filter": "not-response", "limit": limit, **kwargs}
+
+    def _next_summary_params(self, data, limit=50):
+
+        return self._next_page_params(data, {"filter": "not-response", "limit": limit})
+
     def __repr__(self):
         return f"username: {self.username} // uid: {self.uid}"
 
+
+class StatGrabberUser(UserRequestsMixin, StatGrabberBase):
+    def __init__(self, username, sid, uid, start, stop, now=None, already_utc=False, **kwargs):
+
+        super().__init__(sid, uid, start, stop, now, already_utc, **kwargs)
+        self._set_user_endpoints(username)
+
+    def iter_summary_stats(self, events=False, limit=50, **kwargs):
+        """Yields summary records page by page, following "paging.next" cursors iteratively"""
+
+        url, params = self._summary_request(events, limit, **kwargs)
+
+        while True:
+            response = self._fetch(url, params=params)
+            data = self._decode_json(response)
+            yield from data["value"]
+
+            params = self._next_summary_params(data, limit)
+            if not params:
+                break
+
     def get_summary_stats(self, events=False, limit=50, **kwargs):
-        params = {"filter": "not-response", "limit": limit, **kwargs}
-        if events:
-            response = self._fetch(self.totals_endpoint)
-        else:
-            response = self._fetch(self.stats_url, params=params)
 
-        data = self._decode_json(response)
+        return list(self.iter_summary_stats(events=events, limit=limit, **kwargs))
 
-        if data.get("paging", {}).get("next"):
-            next_cursor_idx = data["paging"]["next"]["to"]
-            next_page = self.get_summary_stats(limit=limit, to=next_cursor_idx)
-            data["value"].extend(next_page)
 
-        return data["value"]
+class PublicationRequestsMixin:
+    """
+    Endpoints & params for a publication's stats; shared by StatGrabberPublication and its async counterpart.
+    Only the slug is needed up front: the collection id comes from the "collection_id" param, the
+    slug->id cache or the publication homepage, and the other attributes are loaded from the homepage
+    on first use, by the _load_attrs() each grabber class defines.
+    """
 
+    def _set_publication(self, slug, collection_id=None, id_cache=None):
 
-class StatGrabberPublication(StatGrabberBase):
-    def __init__(self, slug, sid, uid, start, stop, now=None, already_utc=False):
+        self.url = "https://medium.com/" + slug
+        self.slug = slug
+        self.id_cache = id_cache
+        self._id = collection_id or (id_cache.get(slug) if id_cache else None)
+        self._attrs_json = None
 
-        url = "https://medium.com/" + slug
-        self.url = url
-        super().__init__(sid, uid, start, stop, now, already_utc)
-        homepage = self._fetch(self.url)
-        # TODO figure out why requests lib doesn't get full html from this url
-        data = self._decode_json(homepage)
-        self.attrs_json = data["collection"]
-        self._unpack_attrs(self.attrs_json)
+    def _unpack_attrs(self, attrs_json):
+
+        self._attrs_json = attrs_json
+        self._id = attrs_json["id"]
+        if self.id_cache:
+            self.id_cache.set(self.slug, self._id)
+
+    @property
+    def attrs_json(self):
+
+        if self._attrs_json is None:
+            self._load_attrs()
+        return self._attrs_json
+
+    @property
+    def id(self):
+
+        if self._id is None:
+            self._load_attrs()
+        return self._id
+
+    @property
+    def name(self):
+        return self.attrs_json["name"]
+
+    @property
+    def creator(self):
+        return self.attrs_json["creatorId"]
+
+    @property
+    def description(self):
+        return self.attrs_json["description"]
+
+    @property
+    def domain(self):
+        return self.attrs_json.get("domain")
+
+    def _collection_endpoint(self, type_):
 
-        collections_endpoint = f"https://medium.com/_/api/collections/{self.id}/stats/"
         timeframe = f"?from={self.start_unix}&to={self.stop_unix}"
-        create_endpoint = lambda x: collections_endpoint + x + timeframe
-        self.views_endpoint = create_endpoint("views")
-        self.visitors_endpoint = create_endpoint("visitors")
+        return f"https://medium.com/_/api/collections/{self.id}/stats/{type_}{timeframe}"
 
-    # TODO - create a helper classmethod that takes in a URL and extracts slug
+    @property
+    def views_endpoint(self):
+        return self._collection_endpoint("views")
 
-    def _unpack_attrs(self, attrs_json):
+    @property
+    def visitors_endpoint(self):
+        return self._collection_endpoint("visitors")
 
-        self.id = self.attrs_json["id"]
-        self.slug = self.attrs_json["slug"]
-        self.name = self.attrs_json["name"]
-        self.creator = self.attrs_json["creatorId"]
-        self.description = self.attrs_json["description"]
-        try:
-            self.domain = self.attrs_json["domain"]
-        except:
-            self.domain = None
+    def _events_url(self, type_="views"):
+
+        if type_ == "views":
+            return self.views_endpoint
+        elif type_ == "visitors":
+            return self.visitors_endpoint
+        raise ValueError('"type_" param must be either "views" or "visitors"')
+
+    def _story_overview_request(self, limit=50, **kwargs):
+        """(url, params) of the first story overview page"""
+
+        return f"https://medium.com/{self.slug}/stats/stories", {"limit": limit, **kwargs}
+
+    def _next_story_overview_params(self, data, limit=50):
+
+        return self._next_page_params(data, {"limit": limit})
 
     def __repr__(self):
+
+        # attributes load on first use, which the async grabber can't do from here
+        if self._attrs_json is None:
+            return self.slug
         return f"{self.name} - {self.description}"
 
-    def get_events(self, type_="views"):
 
-        if type_ == "views":
-            response = self._fetch(self.views_endpoint)
-        elif type_ == "visitors":
-            response = self._fetch(self.visitors_endpoint)
-        else:
-            raise ValueError('"type_" param must be either "views" or "visitors"')
+class StatGrabberPublication(PublicationRequestsMixin, StatGrabberBase):
+    def __init__(
+        self,
+        slug,
+        sid,
+        uid,
+        start,
+        stop,
+        now=None,
+        already_utc=False,
+        collection_id=None,
+        id_cache=None,
+        **kwargs,
+    ):
 
-        data = self._decode_json(response)
+        self._set_publication(slug, collection_id, id_cache)
+        super().__init__(sid, uid, start, stop, now, already_utc, **kwargs)
 
-        return data["value"]
+    def _load_attrs(self):
 
-    def get_all_story_overview(self, limit=50, **kwargs):
-        params = {"limit": limit, **kwargs}
-        endpoint = f"https://medium.com/{self.slug}/stats/stories"
-        response = self._fetch(endpoint, params)
+        homepage = self._fetch(self.url)
+        # TODO figure out why requests lib doesn't get full html from this url
+        data = self._decode_json(homepage)
+        self._unpack_attrs(data["collection"])
 
+    # TODO - create a helper classmethod that takes in a URL and extracts slug
+
+    def get_events(self, type_="views"):
+
+        response = self._fetch(self._events_url(type_))
         data = self._decode_json(response)
-        if data.get("paging", {}).get("next"):
-            next_cursor_idx = data["paging"]["next"]["to"]
-            next_page = self.get_all_story_overview(limit=limit, to=next_cursor_idx)
-            data["value"].extend(next_page)
 
         return data["value"]
+
+    def get_all_events(self, types=("views", "visitors")):
+        """{type_: get_events(type_)} for each of "types", fetched side by side"""
+
+        # load the collection id once, rather than in every thread
+        if self._id is None:
+            self._load_attrs()
+        results = self.gather(*(partial(self.get_events, type_=t) for t in types))
+
+        return dict(zip(types, results))
+
+    def iter_story_overview(self, limit=50, **kwargs):
+        """Yields story overview records page by page, following "paging.next" cursors iteratively"""
+
+        endpoint, params = self._story_overview_request(limit, **kwargs)
+
+        while True:
+            response = self._fetch(endpoint, params)
+            data = self._decode_json(response)
+            yield from data["value"]
+
+            params = self._next_story_overview_params(data, limit)
+            if not params:
+                break
+
+    def get_all_story_overview(self, limit=50, **kwargs):
+
+        return list(self.iter_story_overview(limit=limit, **kwargs))
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import threading
+
+from medium_stats.writers import atomic_path
+
+STATE_FILENAME = "scrape_state.json"
+
+
+class ScrapeState:
+    """
+    High-water marks for incremental runs, persisted as JSON under stats_exports/<handle>/:
+    {"articles": {"<postId>": <last periodStartedAt fetched, unix ms>}}
+    """
+
+    def __init__(self, path, marks=None):
+
+        self.path = path
+        self.marks = marks or {}
+
+    @classmethod
+    def load(cls, sub_dir):
+
+        path = os.path.join(sub_dir, STATE_FILENAME)
+        if not os.path.exists(path):
+            return cls(path)
+
+        with open(path) as f:
+            marks = json.load(f)
+
+        return cls(path, marks)
+
+    def get_marks(self, mode):
+
+        return dict(self.marks.get(mode, {}))
+
+    def update(self, mode, posts):
+        """Merges the latest dailyStats periodStartedAt of each fetched post into the marks for mode"""
+
+        marks = self.marks.setdefault(mode, {})
+        for post in posts:
+            if not post:
+                continue
+            periods = [d["periodStartedAt"] for d in post.get("dailyStats") or []]
+            if not periods:
+                continue
+            marks[post["id"]] = max(marks.get(post["id"], 0), *periods)
+
+        return marks
+
+    def track(self, mode, posts):
+        """Passes posts through unchanged, merging each one's marks as it goes by"""
+
+        for post in posts:
+            self.update(mode, [post])
+            yield post
+
+    def save(self):
+
+        # write-then-rename so an interrupted run can't leave a truncated state file
+        with atomic_path(self.path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(self.marks, f, indent=2, sort_keys=True)
+
+        return self.path
+
+
+FINGERPRINTS_FILENAME = "fingerprints.json"
+
+# per-post totals in summary / story overview records; daily events or referrers can't change without them
+FINGERPRINT_FIELDS = (
+    "views",
+    "reads",
+    "upvotes",
+    "claps",
+    "internalReferrerViews",
+    "friendsLinkViews",
+    "syndicatedViews",
+    "updateNotificationSubscribers",
+)
+
+
+def fingerprint(record):
+    """Short digest of a summary / story overview record's totals"""
+
+    totals = json.dumps([record.get(f) for f in FINGERPRINT_FIELDS])
+    return hashlib.sha1(totals.encode()).hexdigest()[:16]
+
+
+def _unchanged(entry, current, window=None):
+    """Whether an index entry has the "current" fingerprint and, given a window, was fetched over all of it"""
+
+    # files written before windows were recorded hold bare fingerprints
+    entry = {"fingerprint": entry} if isinstance(entry, str) else entry or {}
+    if entry.get("fingerprint") != current:
+        return False
+    if window is None:
+        return True
+    if "startAt" not in entry:
+        return False
+
+    start, end = window
+    return entry["startAt"] <= start and entry["endAt"] >= end
+
+
+class FingerprintIndex:
+    """
+    Fingerprints of each post's totals as of the last run that fetched its per-post stats, persisted
+    as JSON under stats_exports/<handle>/: {"<mode>": {"<postId>": "<fingerprint>"}}. Windowed modes
+    also record the period fetched: {"fingerprint": "<fingerprint>", "startAt": <unix ms>, "endAt": ...}
+    """
+
+    def __init__(self, path, fingerprints=None):
+
+        self.path = path
+        self.fingerprints = fingerprints or {}
+        # the articles and referrers modes update their fingerprints side by side
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, sub_dir):
+
+        path = os.path.join(sub_dir, FINGERPRINTS_FILENAME)
+        if not os.path.exists(path):
+            return cls(path)
+
+        with open(path) as f:
+            fingerprints = json.load(f)
+
+        return cls(path, fingerprints)
+
+    def iter_changed(self, mode, post_ids, current, window=None):
+        """
+        Like changed(), but lazily over post_ids (e.g. a PostIdFeed), looking each one's fingerprint up
+        in "current" as it arrives
+        """
+
+        with self._lock:
+            previous = dict(self.fingerprints.get(mode, {}))
+        for post_id in post_ids:
+            if not _unchanged(previous.get(post_id), current.get(post_id), window):
+                yield post_id
+
+    def changed(self, mode, current, window=None):
+        """
+        postIds of "current" ({postId: fingerprint}, in order) not fetched for mode with the same totals;
+        with a window ((startAt, endAt), unix ms), also those whose last fetch didn't cover all of it
+        """
+
+        return list(self.iter_changed(mode, current, current, window))
+
+    def update(self, mode, current, window=None):
+
+        if window is not None:
+            start, end = window
+            current = {p: {"fingerprint": fp, "startAt": start, "endAt": end} for p, fp in current.items()}
+        with self._lock:
+            self.fingerprints.setdefault(mode, {}).update(current)
+
+    def save(self):
+
+        with self._lock, atomic_path(self.path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(self.fingerprints, f, indent=2, sort_keys=True)
+
+        return self.path
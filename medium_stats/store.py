@@ -0,0 +1,303 @@
+import sqlite3
+import threading
+from itertools import islice
+
+# --store values are "<scheme>:<path>"
+STORE_SCHEMES = ("sqlite",)
+
+# rows per executemany / transaction
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_summaries (
+    target TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    title TEXT,
+    slug TEXT,
+    created_at INTEGER,
+    first_published_at INTEGER,
+    reading_time REAL,
+    views INTEGER,
+    reads INTEGER,
+    upvotes INTEGER,
+    claps INTEGER,
+    internal_referrer_views INTEGER,
+    friends_link_views INTEGER,
+    syndicated_views INTEGER,
+    update_notification_subscribers INTEGER,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (target, post_id)
+);
+CREATE INDEX IF NOT EXISTS post_summaries_post_id ON post_summaries (post_id);
+
+CREATE TABLE IF NOT EXISTS post_daily_stats (
+    post_id TEXT NOT NULL,
+    period_started_at INTEGER NOT NULL,
+    views INTEGER,
+    internal_referrer_views INTEGER,
+    member_ttr INTEGER,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (post_id, period_started_at)
+);
+CREATE INDEX IF NOT EXISTS post_daily_stats_period ON post_daily_stats (period_started_at);
+
+CREATE TABLE IF NOT EXISTS post_earnings (
+    post_id TEXT NOT NULL,
+    period_started_at INTEGER NOT NULL,
+    period_ended_at INTEGER,
+    amount REAL,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (post_id, period_started_at)
+);
+CREATE INDEX IF NOT EXISTS post_earnings_period ON post_earnings (period_started_at);
+
+CREATE TABLE IF NOT EXISTS post_referrers (
+    post_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    source_identifier TEXT NOT NULL,
+    total_count INTEGER,
+    href TEXT,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (post_id, type, source_identifier)
+);
+CREATE INDEX IF NOT EXISTS post_referrers_source ON post_referrers (source_identifier);
+
+CREATE TABLE IF NOT EXISTS user_events (
+    target TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    views INTEGER,
+    reads INTEGER,
+    claps INTEGER,
+    upvotes INTEGER,
+    update_notification_subscribers INTEGER,
+    flagged_spam INTEGER,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (target, timestamp_ms)
+);
+CREATE INDEX IF NOT EXISTS user_events_timestamp ON user_events (timestamp_ms);
+
+CREATE TABLE IF NOT EXISTS publication_events (
+    target TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    count INTEGER,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (target, type, timestamp_ms)
+);
+CREATE INDEX IF NOT EXISTS publication_events_timestamp ON publication_events (timestamp_ms);
+"""
+
+# table -> columns filled by the upserts, in row order
+COLUMNS = {
+    "post_summaries": (
+        "target",
+        "post_id",
+        "title",
+        "slug",
+        "created_at",
+        "first_published_at",
+        "reading_time",
+        "views",
+        "reads",
+        "upvotes",
+        "claps",
+        "internal_referrer_views",
+        "friends_link_views",
+        "syndicated_views",
+        "update_notification_subscribers",
+        "fetched_at",
+    ),
+    "post_daily_stats": (
+        "post_id",
+        "period_started_at",
+        "views",
+        "internal_referrer_views",
+        "member_ttr",
+        "fetched_at",
+    ),
+    "post_earnings": ("post_id", "period_started_at", "period_ended_at", "amount", "fetched_at"),
+    "post_referrers": ("post_id", "type", "source_identifier", "total_count", "href", "fetched_at"),
+    "user_events": (
+        "target",
+        "timestamp_ms",
+        "views",
+        "reads",
+        "claps",
+        "upvotes",
+        "update_notification_subscribers",
+        "flagged_spam",
+        "fetched_at",
+    ),
+    "publication_events": ("target", "type", "timestamp_ms", "count", "fetched_at"),
+}
+
+# summary / story overview record fields, in post_summaries column order after target & post_id
+SUMMARY_FIELDS = (
+    "title",
+    "slug",
+    "createdAt",
+    "firstPublishedAt",
+    "readingTime",
+    "views",
+    "reads",
+    "upvotes",
+    "claps",
+    "internalReferrerViews",
+    "friendsLinkViews",
+    "syndicatedViews",
+    "updateNotificationSubscribers",
+)
+
+USER_EVENT_FIELDS = ("views", "reads", "claps", "upvotes", "updateNotificationSubscribers", "flaggedSpam")
+
+
+def parse_store_spec(spec):
+    """("sqlite", PATH) from a --store value like "sqlite:stats.db"; raises ValueError otherwise"""
+
+    scheme, _, path = spec.partition(":")
+    if scheme not in STORE_SCHEMES or not path:
+        raise ValueError(f'store must be given as "<{"|".join(STORE_SCHEMES)}>:PATH", not "{spec}"')
+
+    return scheme, path
+
+
+def open_store(spec):
+
+    _, path = parse_store_spec(spec)
+    return SqliteStore(path)
+
+
+def _records(data, *names):
+    """The records of a stats container ({"data": {name: records}}), or "data" itself if it's already records"""
+
+    if not isinstance(data, dict):
+        return data
+
+    for name in names:
+        if name in data["data"]:
+            return data["data"][name]
+
+    return []
+
+
+class SqliteStore:
+    """
+    Upserts every scrape mode's records into normalized SQLite tables (see SCHEMA), keyed so repeated and
+    overlapping runs update rows in place: e.g. daily post stats on (post_id, period_started_at).
+    Rows go in with executemany, BATCH_SIZE per transaction. Modes writing from several threads share
+    one connection behind a lock.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+        self._lock = threading.Lock()
+        # batch jobs may open the same file side by side; wait out their transactions
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+
+        self.conn.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+
+    def upsert(self, table, rows):
+        """Inserts or replaces rows (tuples in COLUMNS[table] order); returns the number written"""
+
+        columns = COLUMNS[table]
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+        rows, written = iter(rows), 0
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                return written
+            with self._lock, self.conn:
+                self.conn.executemany(sql, batch)
+            written += len(batch)
+
+    def _upsert_posts(self, posts, row_builders):
+        """
+        Streams posts into several tables at once, each row builder turning a post into rows for its
+        table; rows are flushed per table every BATCH_SIZE
+        """
+
+        pending = {table: [] for table in row_builders}
+        for post in posts:
+            if not post:
+                continue
+            for table, build in row_builders.items():
+                rows = pending[table]
+                rows.extend(build(post))
+                while len(rows) >= BATCH_SIZE:
+                    self.upsert(table, rows[:BATCH_SIZE])
+                    del rows[:BATCH_SIZE]
+
+        for table, rows in pending.items():
+            self.upsert(table, rows)
+
+    def write(self, mode, target, data, fetched_at):
+        """
+        Stores one mode's output: "data" is what write_stats would write to a file (a stats container,
+        or the records themselves for summary / story_overview). "target" is the username or publication
+        slug, "fetched_at" the run's unix-ms timestamp.
+        """
+
+        if mode in ("summary", "story_overview"):
+            records = _records(data, "post", "story")
+            rows = ((target, r["postId"], *(r.get(f) for f in SUMMARY_FIELDS), fetched_at) for r in records)
+            self.upsert("post_summaries", rows)
+
+        elif mode == "events" and isinstance(data, dict) and "events" in data["data"]:
+            rows = (
+                (target, r["timestampMs"], *(r.get(f) for f in USER_EVENT_FIELDS), fetched_at)
+                for r in data["data"]["events"]
+            )
+            self.upsert("user_events", rows)
+
+        elif mode == "events":
+            for type_, records in data["data"].items():
+                # the count's key isn't documented for every series; take the series name, else "views"
+                rows = ((target, type_, r["timestampMs"], r.get(type_, r.get("views")), fetched_at) for r in records)
+                self.upsert("publication_events", rows)
+
+        elif mode == "articles":
+
+            def daily_rows(post):
+                for d in post.get("dailyStats") or []:
+                    yield (
+                        post["id"],
+                        d["periodStartedAt"],
+                        d.get("views"),
+                        d.get("internalReferrerViews"),
+                        d.get("memberTtr"),
+                        fetched_at,
+                    )
+
+            def earnings_rows(post):
+                for d in (post.get("earnings") or {}).get("dailyEarnings") or []:
+                    yield (post["id"], d["periodStartedAt"], d.get("periodEndedAt"), d.get("amount"), fetched_at)
+
+            posts = _records(data, "post")
+            self._upsert_posts(posts, {"post_daily_stats": daily_rows, "post_earnings": earnings_rows})
+
+        elif mode == "referrers":
+
+            def referrer_rows(post):
+                for r in post.get("referrers") or []:
+                    href = (r.get("site") or {}).get("href")
+                    yield (post["id"], r["type"], r["sourceIdentifier"], r.get("totalCount"), href, fetched_at)
+
+            self._upsert_posts(_records(data, "post"), {"post_referrers": referrer_rows})
+
+        else:
+            raise ValueError('"mode" param must be of choice {summary, events, story_overview, articles, referrers}')
@@ -1,9 +1,13 @@
+import os
 from datetime import datetime
 from datetime import timezone
 from importlib.util import find_spec
 
 extras = ("selenium", "webdriver_manager")
 
+# shared by the response cache and the CLI, which shouldn't import the cache (and requests) to show a default
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "medium_stats")
+
 
 def check_dependencies_missing(extras=extras):
     dependencies = [bool(find_spec(e)) for e in extras]
@@ -0,0 +1,207 @@
+import gzip
+import io
+import json
+import os
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from importlib.util import find_spec
+
+# output format -> file extension
+OUTPUT_FORMATS = {"json": ".json", "compact": ".json", "ndjson": ".ndjson"}
+
+# --compress codec -> suffix appended to the format's extension
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# speed over ratio: level 9 gzip is several times slower for a few % smaller files
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+OUTPUT_SUFFIX = re.compile(r"\.(nd)?json(\.gz|\.zst)?$")
+
+
+def iter_json(obj, indent=None, _level=0):
+    """
+    Yields the JSON text of "obj" in chunks. Lazy iterables (generators, map objects, ...)
+    anywhere in the dict skeleton are streamed as arrays one element at a time; the output
+    is identical to json.dumps(obj, indent=indent) on the materialized data, or to
+    json.dumps(obj, separators=(",", ":")) when indent is None.
+    """
+
+    if indent is None:
+        item_sep, key_sep, pad, close_pad = ",", ":", "", ""
+    else:
+        item_sep, key_sep = ",", ": "
+        pad, close_pad = "\n" + " " * indent * (_level + 1), "\n" + " " * indent * _level
+
+    if isinstance(obj, dict):
+        if not obj:
+            yield "{}"
+            return
+        for i, (key, value) in enumerate(obj.items()):
+            yield ("{" if i == 0 else item_sep) + pad + json.dumps(str(key)) + key_sep
+            yield from iter_json(value, indent, _level + 1)
+        yield close_pad + "}"
+
+    elif isinstance(obj, (list, tuple, Iterator)):
+        empty = True
+        for item in obj:
+            text = json.dumps(item, indent=indent, separators=(item_sep, key_sep))
+            yield ("[" if empty else item_sep) + pad + text.replace("\n", pad)
+            empty = False
+        yield "[]" if empty else close_pad + "]"
+
+    else:
+        yield json.dumps(obj)
+
+
+def iter_ndjson(obj):
+    """
+    Yields one compact JSON document per line. Stats containers ({"data": {...}, **metadata})
+    are written as the records of their collection; when "data" holds several collections
+    (e.g. publication views & visitors) each line is tagged with its "collection" name.
+    """
+
+    if isinstance(obj, dict) and isinstance(obj.get("data"), dict):
+        collections = obj["data"]
+        tagged = len(collections) > 1
+        for name, records in collections.items():
+            for record in records:
+                if tagged:
+                    record = {"collection": name, "record": record}
+                yield json.dumps(record, separators=(",", ":")) + "\n"
+
+    elif isinstance(obj, (list, tuple, Iterator)):
+        for record in obj:
+            yield json.dumps(record, separators=(",", ":")) + "\n"
+
+    else:
+        yield json.dumps(obj, separators=(",", ":")) + "\n"
+
+
+def resolve_compression(compress):
+    """Falls back to gzip when zstd is requested but zstandard isn't installed"""
+
+    if compress is None:
+        return None
+    if compress not in COMPRESSIONS:
+        raise ValueError(f'"compress" param must be one of {list(COMPRESSIONS)}, not "{compress}"')
+
+    if compress == "zstd" and not find_spec("zstandard"):
+        print('zstandard is not installed; writing gzip instead of "zstd"')
+        print('Install it by executing "pip install medium_stats[zstd]"')
+        return "gzip"
+
+    return compress
+
+
+def output_stem(filepath):
+    """The path without its output extension (.json, .ndjson, plus .gz / .zst if compressed)"""
+
+    return OUTPUT_SUFFIX.sub("", filepath)
+
+
+def output_path(filepath, format_="json", compress=None):
+
+    if format_ not in OUTPUT_FORMATS:
+        raise ValueError(f'"format_" param must be one of {list(OUTPUT_FORMATS)}, not "{format_}"')
+    if compress is not None and compress not in COMPRESSIONS:
+        raise ValueError(f'"compress" param must be one of {list(COMPRESSIONS)}, not "{compress}"')
+
+    return output_stem(filepath) + OUTPUT_FORMATS[format_] + COMPRESSIONS.get(compress, "")
+
+
+@contextmanager
+def atomic_path(filepath):
+    """Yields a temp path beside "filepath" that is renamed into place only if the block succeeds"""
+
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def _open_text(path, compress=None):
+    """Text file for writing at "path", compressing as it's written when "compress" is set"""
+
+    if compress is None:
+        with open(path, "w") as f:
+            yield f
+        return
+
+    with open(path, "wb") as raw:
+        if compress == "gzip":
+            # filename="" keeps the temp file's name out of the gzip header
+            binary = gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=GZIP_LEVEL)
+        else:
+            import zstandard
+
+            # threads=-1: one compression worker per CPU
+            binary = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1).stream_writer(raw, closefd=False)
+        with io.TextIOWrapper(binary, encoding="utf-8") as f:
+            yield f
+
+
+def open_output(filepath):
+    """Opens an output file for reading as text, decompressing it per its .gz / .zst suffix"""
+
+    if filepath.endswith(COMPRESSIONS["gzip"]):
+        return gzip.open(filepath, "rt", encoding="utf-8")
+
+    if filepath.endswith(COMPRESSIONS["zstd"]):
+        if not find_spec("zstandard"):
+            raise ImportError('reading .zst files needs zstandard: "pip install medium_stats[zstd]"')
+        import zstandard
+
+        reader = zstandard.ZstdDecompressor().stream_reader(open(filepath, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+
+    return open(filepath)
+
+
+def read_json(filepath):
+    """The document in a "json" / "compact" output file, compressed or not"""
+
+    with open_output(filepath) as f:
+        return json.load(f)
+
+
+def read_ndjson(filepath):
+    """Yields the records of an "ndjson" output file, compressed or not, one line at a time"""
+
+    with open_output(filepath) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_stream(chunks, filepath, compress=None):
+    """
+    Writes text chunks to a temp file beside "filepath" and atomically renames it into place,
+    compressing them on the way when "compress" ("gzip" or "zstd") is set
+    """
+
+    with atomic_path(filepath) as tmp_path:
+        with _open_text(tmp_path, compress) as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    return filepath
+
+
+def write_records(data, filepath, format_="json", compress=None):
+
+    compress = resolve_compression(compress)
+    filepath = output_path(filepath, format_, compress)
+
+    if format_ == "ndjson":
+        chunks = iter_ndjson(data)
+    else:
+        chunks = iter_json(data, indent=2 if format_ == "json" else None)
+
+    return write_stream(chunks, filepath, compress)
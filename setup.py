@@ -16,7 +16,14 @@ setup(
     packages=find_packages(exclude=("test",)),
     python_requires=">=3.6",
     install_requires=["requests", "lxml"],
-    extras_require={"selenium": ["selenium", "webdriver_manager"]},
+    extras_require={
+        "selenium": ["selenium", "webdriver_manager"],
+        "columnar": ["pyarrow"],
+        "async": ["aiohttp"],
+        "speedups": ["orjson"],
+        "numpy": ["numpy"],
+        "zstd": ["zstandard"],
+    },
     author="Oliver Tosky",
     author_email="olivertosky@gmail.com",
     description="CLI tool to fetch your Medium stats",
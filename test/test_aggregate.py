@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+
+from medium_stats.columnar import DailyStatsFrame
+from medium_stats.writers import write_records
+
+HAS_NUMPY = bool(find_spec("numpy"))
+if HAS_NUMPY:
+    import numpy as np
+
+    from medium_stats.aggregate import PostEvents
+
+DAY_MS = 24 * 60 * 60 * 1000
+# 2020-01-06 was a Monday
+MONDAY = 18267 * DAY_MS
+
+
+def fake_post(post_id, days, views=10, amount=None):
+    post = {
+        "id": post_id,
+        "dailyStats": [
+            {"periodStartedAt": MONDAY + d * DAY_MS, "views": views, "internalReferrerViews": 1, "memberTtr": 60}
+            for d in days
+        ],
+    }
+    if amount is not None:
+        post["earnings"] = {"dailyEarnings": [{"periodStartedAt": MONDAY + d * DAY_MS, "amount": amount} for d in days]}
+    return post
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class TestPostEvents(unittest.TestCase):
+    def setUp(self):
+
+        self.posts = [fake_post("a1", range(10), amount=2), fake_post("a2", [3, 8], views=100)]
+        self.events = PostEvents.from_posts(self.posts)
+
+    def test_totals_per_day_week_and_month(self):
+
+        days, totals = self.events.totals()
+        self.assertEqual(str(days[0]), "2020-01-06")
+        self.assertEqual(totals[3], 110)
+
+        weeks, totals = self.events.totals(freq="week")
+        self.assertEqual([str(w) for w in weeks], ["2020-01-06", "2020-01-13"])
+        self.assertEqual(totals.tolist(), [170, 130])
+
+        months, totals = self.events.totals("memberTtr", freq="month")
+        self.assertEqual((str(months[0]), totals.tolist()), ("2020-01-01", [720]))
+
+        with self.assertRaises(ValueError):
+            self.events.totals(freq="year")
+
+    def test_totals_by_groups_posts(self):
+
+        labels, weeks, totals = self.events.totals_by({"a1": "python", "a2": "data"}, freq="week")
+
+        self.assertEqual(labels, ["data", "python"])
+        self.assertEqual(totals.tolist(), [[100, 100], [70, 30]])
+
+    def test_rolling_mean_fills_missing_days_with_zero(self):
+
+        events = PostEvents.from_posts([fake_post("a1", [0, 2], views=6)])
+        days, means = events.rolling_mean(window=2)
+
+        self.assertEqual(len(days), 3)
+        self.assertTrue(np.isnan(means[0]))
+        self.assertEqual(means[1:].tolist(), [3, 3])
+
+    def test_earnings_per_view(self):
+
+        _, ratio = self.events.earnings_per_view(freq="week")
+
+        self.assertEqual(ratio.tolist(), [14 / 170, 6 / 130])
+
+    def test_repeated_post_days_keep_last_row(self):
+
+        events = PostEvents.from_posts(self.posts + [fake_post("a1", [9], views=50)])
+
+        self.assertEqual(len(events), 12)
+        self.assertEqual(events.totals()[1][-1], 50)
+
+    def test_from_frame_matches_from_posts(self):
+
+        frame = DailyStatsFrame.from_posts(self.posts)
+        events = PostEvents.from_frame(frame)
+
+        self.assertEqual(events.totals(freq="week")[1].tolist(), self.events.totals(freq="week")[1].tolist())
+        self.assertTrue(np.isnan(events.columns["amount"]).all())
+
+    def test_load_reads_json_and_ndjson_post_events(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = os.path.join(tmp, "post_events")
+            os.makedirs(folder)
+            with open(os.path.join(folder, "2020_a_user_events.json"), "w") as f:
+                json.dump({"data": {"post": self.posts[:1]}}, f)
+            with open(os.path.join(folder, "2020_b_user_events.ndjson"), "w") as f:
+                f.write(json.dumps(self.posts[1]) + "\n")
+
+            events = PostEvents.load(tmp)
+
+        self.assertEqual(events.post_ids, ["a1", "a2"])
+        self.assertEqual(len(events), 12)
+
+    def test_load_reads_compressed_post_events(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_records({"data": {"post": self.posts[:1]}}, os.path.join(tmp, "2020_a_user_events"), "json", "gzip")
+            write_records({"data": {"post": self.posts[1:]}}, os.path.join(tmp, "2020_b_user_events"), "ndjson", "gzip")
+
+            events = PostEvents.load(tmp)
+
+        self.assertEqual(events.post_ids, ["a1", "a2"])
+        self.assertEqual(len(events), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
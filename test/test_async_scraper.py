@@ -0,0 +1,208 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime
+from functools import wraps
+from importlib.util import find_spec
+
+from medium_stats.scraper import xssi_prefix
+
+HAS_AIOHTTP = bool(find_spec("aiohttp"))
+if HAS_AIOHTTP:
+    from medium_stats.async_scraper import AsyncStatGrabberPublication
+    from medium_stats.async_scraper import AsyncStatGrabberUser
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def text(self):
+        return self.body
+
+    async def read(self):
+        return self.body.encode()
+
+
+class FakeSession:
+    """Stands in for aiohttp.ClientSession; "routes" maps URLs to lists of payloads served in turn"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append((url, params, kwargs))
+        payload = self.routes[url].pop(0)
+        return FakeResponse(xssi_prefix + json.dumps({"payload": payload}))
+
+    def post(self, url, **kwargs):
+        post_data = kwargs.pop("json")
+        self.calls.append((url, post_data, kwargs))
+        return FakeResponse(json.dumps({"data": {"post": {"id": post_data["variables"]["postId"]}}}))
+
+
+def async_test(test):
+    """Runs a coroutine test method on a fresh event loop; IsolatedAsyncioTestCase needs Python 3.8"""
+
+    @wraps(test)
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(test(self))
+        finally:
+            loop.close()
+
+    return run
+
+
+def pages(n_pages, per_page=2):
+    return [
+        {
+            "value": [{"postId": f"p{page}-{i}"} for i in range(per_page)],
+            "paging": {"next": {"to": page + 1}} if page < n_pages - 1 else {},
+        }
+        for page in range(n_pages)
+    ]
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp not installed")
+class TestAsyncStatGrabberUser(unittest.TestCase):
+    def setUp(self):
+
+        self.start = datetime(year=2020, month=1, day=11)
+        self.stop = datetime(year=2020, month=2, day=11)
+
+    def grabber(self, routes):
+
+        session = FakeSession(routes)
+        sg = AsyncStatGrabberUser("user", "sid", "uid", self.start, self.stop, session=session)
+        return sg, session
+
+    @async_test
+    async def test_get_summary_stats_follows_paging_cursors(self):
+
+        sg, session = self.grabber({"https://medium.com/@user/stats": pages(3)})
+        records = await sg.get_summary_stats()
+
+        self.assertEqual(len(records), 6)
+        self.assertEqual([c[1].get("to") for c in session.calls], [None, 1, 2])
+        self.assertEqual(session.calls[0][2]["cookies"], {"sid": "sid", "uid": "uid"})
+
+    @async_test
+    async def test_events_hit_totals_endpoint_with_same_urls_as_sync_grabber(self):
+
+        sg, session = self.grabber({})
+        session.routes[sg.totals_endpoint] = pages(1)
+        events = await sg.get_summary_stats(events=True)
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(session.calls[0][:2], (sg.totals_endpoint, None))
+
+    @async_test
+    async def test_article_ids_feed_story_stats_as_in_readme(self):
+
+        sg, session = self.grabber({"https://medium.com/@user/stats": pages(2)})
+        data = await sg.get_summary_stats()
+        article_events = await sg.get_all_story_stats(sg.get_article_ids(data))
+
+        self.assertEqual(sg.articles, ["p0-0", "p0-1", "p1-0", "p1-1"])
+        self.assertEqual([p["id"] for p in article_events["data"]["post"]], sg.articles)
+
+    @async_test
+    async def test_get_all_story_stats_preserves_input_order(self):
+
+        sg, session = self.grabber({})
+        stats = await sg.get_all_story_stats(["a", "b", "c"])
+
+        self.assertEqual([p["id"] for p in stats["data"]["post"]], ["a", "b", "c"])
+        self.assertEqual(session.calls[0][1]["operationName"], "StatsPostChart")
+
+    @async_test
+    async def test_get_story_stats_window_can_be_narrowed(self):
+
+        sg, session = self.grabber({})
+        await sg.get_story_stats("a", start_unix=100, end_unix=200)
+
+        variables = session.calls[0][1]["variables"]
+        self.assertEqual((variables["startAt"], variables["endAt"]), (100, 200))
+
+    @async_test
+    async def test_get_story_stats_raises_value_error_if_type_param_not_valid(self):
+
+        sg, _ = self.grabber({})
+        with self.assertRaises(ValueError):
+            await sg.get_story_stats("a", type_="foo")
+
+    @async_test
+    async def test_shared_session_is_left_open(self):
+
+        sg, session = self.grabber({})
+        async with sg:
+            pass
+
+        self.assertIs(sg.session, session)
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp not installed")
+class TestAsyncStatGrabberPublication(unittest.TestCase):
+    def setUp(self):
+
+        self.start, self.stop = datetime(year=2020, month=1, day=11), datetime(year=2020, month=2, day=11)
+        self.collection = {"id": "c1", "slug": "pub", "name": "Pub", "creatorId": "u", "description": "d"}
+
+    @async_test
+    async def test_overview_needs_no_homepage(self):
+
+        session = FakeSession({"https://medium.com/pub/stats/stories": pages(2)})
+        async with AsyncStatGrabberPublication("pub", "sid", "uid", self.start, self.stop, session=session) as sg:
+            overview = await sg.get_all_story_overview()
+
+        self.assertEqual(len(overview), 4)
+        self.assertEqual(len(session.calls), 2)
+
+    @async_test
+    async def test_events_load_collection_id_from_homepage(self):
+
+        session = FakeSession({"https://medium.com/pub": [{"collection": self.collection}]})
+        sg = AsyncStatGrabberPublication("pub", "sid", "uid", self.start, self.stop, session=session)
+        views_url = f"https://medium.com/_/api/collections/c1/stats/views?from={sg.start_unix}&to={sg.stop_unix}"
+        session.routes[views_url] = [{"value": [{"views": 3}]}]
+
+        with self.assertRaises(RuntimeError):
+            _ = sg.name
+        self.assertEqual(repr(sg), "pub")
+        views = await sg.get_events()
+
+        self.assertEqual((sg.id, sg.name), ("c1", "Pub"))
+        self.assertEqual(repr(sg), "Pub - d")
+        self.assertEqual(views, [{"views": 3}])
+        with self.assertRaises(ValueError):
+            await sg.get_events(type_="foo")
+
+    @async_test
+    async def test_get_all_events_loads_homepage_once(self):
+
+        session = FakeSession({"https://medium.com/pub": [{"collection": self.collection}]})
+        sg = AsyncStatGrabberPublication("pub", "sid", "uid", self.start, self.stop, session=session)
+        for type_ in ("views", "visitors"):
+            url = f"https://medium.com/_/api/collections/c1/stats/{type_}?from={sg.start_unix}&to={sg.stop_unix}"
+            session.routes[url] = [{"value": [{type_: 1}]}]
+
+        events = await sg.get_all_events()
+
+        self.assertEqual(events, {"views": [{"views": 1}], "visitors": [{"visitors": 1}]})
+        self.assertEqual(len(session.calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+from benchmarks.harness import compare
+from benchmarks.harness import run_mode
+from benchmarks.import_time import IMPORT_BUDGET_MS
+from benchmarks.import_time import deferred_imports
+from benchmarks.import_time import entry_point_ms
+from benchmarks.import_time import measure
+from benchmarks.mock_server import MockMediumConfig
+from benchmarks.mock_server import MockMediumServer
+from benchmarks.mock_server import post_id
+
+
+class TestHarness(unittest.TestCase):
+    def test_batched_articles_run_against_mock_server(self):
+
+        config = MockMediumConfig(posts=7, page_size=3, days=2)
+        args = Namespace(concurrency=2, batch_size=3)
+        with MockMediumServer(config) as server, tempfile.TemporaryDirectory() as work_dir:
+            result = run_mode(server, "scrape_user", "articles", args, work_dir)
+            exported = os.listdir(os.path.join(work_dir, "stats_exports", "bench", "post_events"))
+
+        # 3 summary pages, then 7 posts in batches of 3
+        self.assertEqual(result["requests"], 3 + 3)
+        self.assertEqual(len(exported), 1)
+        self.assertGreater(result["peak_rss_mb"], 0)
+
+    def test_pipelined_articles_batch_posts_as_pages_arrive(self):
+
+        config = MockMediumConfig(posts=7, page_size=3, days=2)
+        args = Namespace(concurrency=2, batch_size=3, pipeline=True)
+        with MockMediumServer(config) as server, tempfile.TemporaryDirectory() as work_dir:
+            result = run_mode(server, "scrape_user", "articles", args, work_dir)
+            folder = os.path.join(work_dir, "stats_exports", "bench", "post_events")
+            with open(os.path.join(folder, os.listdir(folder)[0])) as f:
+                posts = json.load(f)["data"]["post"]
+
+        # each page of 3 postIds fills one batch
+        self.assertEqual(result["requests"], 3 + 3)
+        self.assertEqual([p["id"] for p in posts], [post_id(i) for i in range(7)])
+
+    def test_compare_flags_growth_beyond_threshold_and_floor(self):
+
+        row = {"command": "scrape_user", "mode": "articles", "wall_seconds": 2.0, "requests": 10, "peak_rss_mb": 40}
+        baseline = {"results": [row]}
+        slower = {**row, "wall_seconds": 3.0, "requests": 11}
+        noise = {**row, "wall_seconds": 2.05, "peak_rss_mb": 43}
+
+        self.assertEqual(len(compare([slower], baseline, 0.25)), 1)
+        self.assertEqual(compare([noise], baseline, 0.0), [])
+
+
+class TestImportTime(unittest.TestCase):
+    def test_cli_entry_point_defers_http_stack(self):
+
+        timings = measure()
+
+        self.assertIn("medium_stats.cli", timings)
+        self.assertEqual(deferred_imports(timings), [])
+
+    def test_cli_entry_point_within_import_budget(self):
+
+        # best of a few runs, so one slow interpreter start doesn't fail the build
+        elapsed = min(entry_point_ms(measure()) for _ in range(3))
+
+        self.assertLess(elapsed, IMPORT_BUDGET_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+from requests.models import Response
+
+from medium_stats.cache import CachingAdapter
+from medium_stats.cache import ResponseCache
+from medium_stats.cache import classify_request
+
+
+def fake_response(request, status_code=200, content=b'{"payload": {}}', headers=None):
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    response.request = request
+    response.url = request.url
+    return response
+
+
+class TestClassifyRequest(unittest.TestCase):
+    def test_graphql_operations_map_to_modes(self):
+
+        self.assertEqual(
+            classify_request("https://medium.com/_/graphql", {"operationName": "StatsPostChart"}), "articles"
+        )
+        batch = {"operationName": "StatsPostReferrersContainerBatch"}
+        self.assertEqual(classify_request("https://medium.com/_/graphql", batch), "referrers")
+
+    def test_urls_map_to_modes(self):
+
+        expected = {
+            "https://medium.com/@user/stats": "summary",
+            "https://medium.com/@user/stats/total/1/2": "events",
+            "https://medium.com/_/api/collections/abc/stats/views?from=1&to=2": "events",
+            "https://medium.com/pub/stats/stories": "story_overview",
+            "https://medium.com/pub": "publication",
+        }
+        for url, mode in expected.items():
+            self.assertEqual(classify_request(url), mode)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name)
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def test_key_depends_on_graphql_variables(self):
+
+        url = "https://medium.com/_/graphql"
+        a = ResponseCache.key("POST", url, {"operationName": "StatsPostChart", "variables": {"postId": "a"}})
+        b = ResponseCache.key("POST", url, {"operationName": "StatsPostChart", "variables": {"postId": "b"}})
+        a_again = ResponseCache.key("POST", url, {"variables": {"postId": "a"}, "operationName": "StatsPostChart"})
+
+        self.assertNotEqual(a, b)
+        self.assertEqual(a, a_again)
+
+    def test_set_then_get_round_trips(self):
+
+        self.cache.set("k", {"stored_at": time.time(), "mode": "summary"}, b"body\nwith newline")
+        meta, body = self.cache.get("k")
+
+        self.assertEqual(meta["mode"], "summary")
+        self.assertEqual(body, b"body\nwith newline")
+
+    def test_entries_expire_per_mode_ttl(self):
+
+        old = time.time() - 2 * 60 * 60
+        self.assertFalse(self.cache.is_fresh({"stored_at": old, "mode": "articles"}))
+        self.assertTrue(self.cache.is_fresh({"stored_at": old, "mode": "referrers"}))
+
+    def test_least_recently_used_entries_evicted_past_size_bound(self):
+
+        cache = ResponseCache(self.tmp.name, max_bytes=300)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.set(key, {"stored_at": 0}, b"x" * 100)
+            os.utime(cache._path(key), (i, i))
+            if key == "b":
+                # reading "a" makes "b" the least recently used entry
+                cache.get("a")
+
+        self.assertIsNotNone(cache.get("a")[0])
+        self.assertIsNone(cache.get("b")[0])
+        self.assertLessEqual(cache._size, 300)
+
+
+class TestCachingAdapter(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = requests.Session()
+        self.session.mount("https://", CachingAdapter(ResponseCache(self.tmp.name)))
+        self.url = "https://medium.com/@user/stats"
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def test_fresh_response_served_without_network(self):
+
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=lambda r, **kw: fake_response(r)) as send:
+            first = self.session.get(self.url)
+            second = self.session.get(self.url)
+
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertTrue(second.from_cache)
+
+    def test_stale_entry_revalidated_with_etag(self):
+
+        headers = {"ETag": '"v1"'}
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=lambda r, **kw: fake_response(r, headers=headers)):
+            self.session.get(self.url)
+
+        with patch("medium_stats.cache.ResponseCache.is_fresh", return_value=False):
+            with patch(
+                "requests.adapters.HTTPAdapter.send", side_effect=lambda r, **kw: fake_response(r, 304, b"")
+            ) as send:
+                response = self.session.get(self.url)
+
+        sent = send.call_args.args[0]
+        self.assertEqual(sent.headers["If-None-Match"], '"v1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'{"payload": {}}')
+
+    def test_graphql_errors_are_not_cached(self):
+
+        error = b'{"errors": [{"message": "boom"}]}'
+        with patch(
+            "requests.adapters.HTTPAdapter.send", side_effect=lambda r, **kw: fake_response(r, content=error)
+        ) as send:
+            for _ in range(2):
+                self.session.post("https://medium.com/_/graphql", json={"operationName": "StatsPostChart"})
+
+        self.assertEqual(send.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
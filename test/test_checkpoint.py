@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from datetime import timezone
+
+from medium_stats.checkpoint import RunCheckpoint
+
+
+class TestRunCheckpoint(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.stop = datetime(2020, 2, 1, tzinfo=timezone.utc)
+        self.now = datetime(2020, 2, 1, 12, 30, tzinfo=timezone.utc)
+        self.checkpoint = RunCheckpoint.create(self.tmp.name, "scrape_user", "me", self.start, self.stop, self.now)
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def load(self):
+
+        return RunCheckpoint.load(self.tmp.name, self.checkpoint.run_id, "scrape_user", "me")
+
+    def test_load_restores_period(self):
+
+        self.assertEqual(self.load().period, (self.start, self.stop, self.now))
+
+    def test_posts_are_only_spooled_when_asked_for(self):
+
+        self.assertFalse(self.load().spool)
+
+        run_id = RunCheckpoint.create(self.tmp.name, "scrape_user", "you", self.start, self.stop, self.now, True).run_id
+        self.assertTrue(RunCheckpoint.load(self.tmp.name, run_id, "scrape_user", "you").spool)
+
+    def test_load_rejects_unknown_run_or_other_target(self):
+
+        with self.assertRaises(ValueError):
+            RunCheckpoint.load(self.tmp.name, "nope", "scrape_user", "me")
+        with self.assertRaises(ValueError):
+            RunCheckpoint.load(self.tmp.name, self.checkpoint.run_id, "scrape_publication", "me")
+
+    def test_interrupted_track_keeps_posts_fetched_so_far(self):
+        def fetched():
+            yield {"id": "a1"}
+            yield {"id": "a2"}
+            raise RuntimeError("connection dropped")
+
+        with self.assertRaises(RuntimeError):
+            list(self.checkpoint.track("articles", ["a1", "a2", "a3"], {}, fetched()))
+
+        self.assertEqual(self.load().completed_posts("articles"), {"a1": {"id": "a1"}, "a2": {"id": "a2"}})
+
+    def test_track_merges_logged_and_new_posts_in_order(self):
+
+        done = {"a2": {"id": "a2"}}
+        posts = list(self.checkpoint.track("articles", ["a1", "a2", "a3"], done, [{"id": "a1"}, {"id": "a3"}]))
+
+        self.assertEqual([p["id"] for p in posts], ["a1", "a2", "a3"])
+
+    def test_truncated_last_log_line_is_ignored(self):
+
+        list(self.checkpoint.track("articles", ["a1"], {}, [{"id": "a1"}]))
+        with open(os.path.join(self.checkpoint.run_dir, "articles.ndjson"), "a") as f:
+            f.write('{"postId": "a2", "po')
+
+        self.assertEqual(list(self.load().completed_posts("articles")), ["a1"])
+
+    def test_completed_modes_persist_and_finish_removes_spool(self):
+
+        self.checkpoint.mark_complete("events")
+        self.assertTrue(self.load().is_complete("events"))
+
+        self.checkpoint.finish()
+        self.assertFalse(os.path.exists(self.checkpoint.run_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import argparse
 import os
 import sys
+import tempfile
 import unittest
 from contextlib import contextmanager
 from datetime import datetime
@@ -9,8 +10,10 @@ from io import StringIO
 
 from medium_stats.cli import PUB_MODE_CHOICES
 from medium_stats.cli import USER_MODE_CHOICES
+from medium_stats.cli import create_directories
 from medium_stats.cli import get_argparser
 from medium_stats.cli import parse_scraper_args
+from medium_stats.cli import read_manifest
 from medium_stats.cli import valid_date
 
 
@@ -219,6 +222,127 @@ class TestScrapeUserCLIArguments(unittest.TestCase):
         for p in parsed_pub:
             self.assertEqual(p.mode, PUB_MODE_CHOICES)
 
+    def test_concurrency_defaults_to_one(self):
+
+        input_ = "scrape_user -u test_user --all".split()
+        parsed = self.parser.parse_args(input_)
+
+        self.assertEqual(parsed.concurrency, 1)
+
+    def test_concurrency_must_be_positive_integer(self):
+
+        invalids = ["0", "-2", "foo"]
+        for i in invalids:
+            input_ = f"scrape_publication -u test_pub --all --concurrency {i}".split()
+            with self.assertRaises(SystemExit):
+                with capture_sys_output() as (out, err):
+                    _ = self.parser.parse_args(input_)
+
+    def test_store_must_be_sqlite_path(self):
+
+        parsed = self.parser.parse_args("scrape_user -u test_user --all --store sqlite:stats.db".split())
+        self.assertEqual(parsed.store, "sqlite:stats.db")
+
+        for invalid in ["stats.db", "sqlite:", "postgres:stats"]:
+            input_ = f"scrape_user -u test_user --all --store {invalid}".split()
+            with self.assertRaises(SystemExit):
+                with capture_sys_output() as (out, err):
+                    _ = self.parser.parse_args(input_)
+            self.assertIn("sqlite", err.getvalue())
+
+    def test_resume_skips_period_requirement(self):
+
+        args = self.parser.parse_args("scrape_user -u test_user --resume test_user-20200101T000000".split())
+        args = parse_scraper_args(args, self.parser)
+
+        self.assertIsNone(args.start)
+
+    def test_resume_and_period_flags_mutually_exclusive(self):
+
+        args = self.parser.parse_args("scrape_user -u test_user --all --resume foo".split())
+        with self.assertRaises(SystemExit):
+            with capture_sys_output() as (out, err):
+                _ = parse_scraper_args(args, self.parser)
+        self.assertIn('"--resume"', err.getvalue())
+
+
+class TestCreateDirectories(unittest.TestCase):
+    def test_missing_folders_created_under_existing_handle_dir(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            create_directories(tmp, "handle", ["agg_stats"])
+            sub_dir = create_directories(tmp, "handle", ["agg_stats", "post_events"])
+
+            self.assertEqual(sorted(os.listdir(sub_dir)), ["agg_stats", "post_events"])
+
+
+class TestScrapeBatchCLIArguments(unittest.TestCase):
+    def setUp(self):
+        self.parser = get_argparser()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.tmp.name, "accounts.txt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def parse_manifest(self, text, extra=""):
+
+        with open(self.manifest, "w") as f:
+            f.write(text)
+        args = self.parser.parse_args(f"scrape_batch {self.manifest} {extra}".split())
+        return args, read_manifest(args.manifest, args, self.parser)
+
+    def test_lines_parsed_as_commands_skipping_comments(self):
+
+        text = """
+        # writers
+        scrape_user -u alice --all
+        scrape_publication -s https://medium.com/pub --start 2020-01-01  # weekly
+        """
+        args, jobs = self.parse_manifest(text.replace("        ", ""), "--format ndjson")
+
+        self.assertEqual([j.command for j in jobs], ["scrape_user", "scrape_publication"])
+        self.assertEqual(jobs[0].u, "alice")
+        self.assertEqual(jobs[1].s, "https://medium.com/pub")
+        self.assertEqual(jobs[1].start, datetime(2020, 1, 1, tzinfo=timezone.utc))
+        self.assertTrue(all(j.format == "ndjson" for j in jobs))
+
+    def test_line_options_override_batch_options(self):
+
+        args, jobs = self.parse_manifest("scrape_user -u alice --all --format compact\n", "--format ndjson")
+
+        self.assertEqual(jobs[0].format, "compact")
+
+    def test_batch_store_shared_by_every_job(self):
+
+        args, jobs = self.parse_manifest(
+            "scrape_user -u alice --all\nscrape_user -u bob --all\n", "--store sqlite:s.db"
+        )
+
+        self.assertEqual([j.store for j in jobs], ["sqlite:s.db"] * 2)
+
+    def test_batch_compress_applies_unless_a_line_sets_its_own(self):
+
+        text = "scrape_user -u alice --all\nscrape_user -u bob --all --compress gzip\n"
+        args, jobs = self.parse_manifest(text, "--compress zstd")
+
+        self.assertEqual([j.compress for j in jobs], ["zstd", "gzip"])
+        self.assertIsNone(self.parse_manifest("scrape_user -u alice --all\n")[1][0].compress)
+
+    def test_unknown_command_triggers_arg_error(self):
+
+        with self.assertRaises(SystemExit):
+            with capture_sys_output() as (out, err):
+                _ = self.parse_manifest("fetch_cookies --email foo@bar.com --pwd foobar\n")
+        self.assertIn("manifest line 1", err.getvalue())
+
+    def test_invalid_line_triggers_arg_error(self):
+
+        with self.assertRaises(SystemExit):
+            with capture_sys_output() as (out, err):
+                _ = self.parse_manifest("scrape_user -u alice\n")
+        self.assertIn("Period must be set", err.getvalue())
+
 
 class TestCookieFetcherCLIArguments(unittest.TestCase):
     def setUp(self):
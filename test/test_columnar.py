@@ -0,0 +1,127 @@
+import csv
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+from unittest.mock import patch
+
+from medium_stats.columnar import DAILY_STATS_COLUMNS
+from medium_stats.columnar import POST_EVENT_FIELDS
+from medium_stats.columnar import DailyStatsFrame
+from medium_stats.columnar import PostEventsTable
+from medium_stats.columnar import flatten_post_events
+from medium_stats.columnar import resolve_columnar_format
+
+HAS_PYARROW = bool(find_spec("pyarrow"))
+HAS_NUMPY = bool(find_spec("numpy"))
+
+
+def fake_post(post_id="a1"):
+    return {
+        "id": post_id,
+        "dailyStats": [
+            {"periodStartedAt": 2000, "views": 5, "internalReferrerViews": 1, "memberTtr": 30},
+            {"periodStartedAt": 1000, "views": 3, "internalReferrerViews": 0, "memberTtr": 10},
+        ],
+        "earnings": {"dailyEarnings": [{"periodStartedAt": 2000, "periodEndedAt": 2999, "amount": 12}]},
+    }
+
+
+class TestFlattenPostEvents(unittest.TestCase):
+    def test_rows_joined_on_period_and_sorted(self):
+
+        rows = list(flatten_post_events(fake_post()))
+
+        self.assertEqual(rows, [("a1", 1000, 3, 0, 10, None), ("a1", 2000, 5, 1, 30, 12)])
+
+    def test_earnings_without_daily_stats_still_produce_row(self):
+
+        post = {"id": "a1", "dailyStats": [], "earnings": {"dailyEarnings": [{"periodStartedAt": 5, "amount": 1}]}}
+
+        self.assertEqual(list(flatten_post_events(post)), [("a1", 5, None, None, None, 1)])
+
+    def test_missing_post_yields_nothing(self):
+
+        self.assertEqual(list(flatten_post_events(None)), [])
+
+
+class TestPostEventsTable(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.table = PostEventsTable()
+        posts = list(self.table.track([fake_post("a1"), None, fake_post("a2")]))
+        self.assertEqual(len(posts), 3)
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def test_track_flattens_posts_into_columns(self):
+
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(self.table.columns["post_id"], ["a1", "a1", "a2", "a2"])
+
+    def test_csv_fallback_when_pyarrow_missing(self):
+
+        with patch("medium_stats.columnar.find_spec", return_value=None):
+            with patch("builtins.print"):
+                self.assertEqual(resolve_columnar_format("parquet"), "csv")
+                path = self.table.write(os.path.join(self.tmp.name, "events"), "parquet")
+
+        self.assertTrue(path.endswith(".csv"))
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], POST_EVENT_FIELDS)
+        self.assertEqual(len(rows), 5)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_parquet_round_trip_is_typed(self):
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self.table.write(os.path.join(self.tmp.name, "events"), "parquet")
+        table = pq.read_table(path)
+
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.schema.field("views").type, pa.int64())
+        self.assertEqual(table.schema.field("periodStartedAt").type, pa.timestamp("ms", tz="UTC"))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_arrow_ipc_round_trip(self):
+
+        import pyarrow as pa
+
+        path = self.table.write(os.path.join(self.tmp.name, "events"), "arrow")
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+
+        self.assertEqual(table.column_names, POST_EVENT_FIELDS)
+
+
+class TestDailyStatsFrame(unittest.TestCase):
+    def setUp(self):
+
+        self.frame = DailyStatsFrame.from_posts(iter([fake_post("a1"), None, {"id": "a2", "dailyStats": []}]))
+
+    def test_rows_packed_per_post_with_offsets(self):
+
+        self.assertEqual(len(self.frame), 2)
+        self.assertEqual(self.frame.post_ids, ["a1", "a2"])
+        self.assertEqual(list(self.frame.offsets), [0, 2, 2])
+        self.assertEqual(list(self.frame.post("a1")["views"]), [5, 3])
+        self.assertEqual(list(self.frame.post("a2")["memberTtr"]), [])
+        self.assertEqual(self.frame.nbytes, 8 * (3 + 2 * len(DAILY_STATS_COLUMNS)))
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_to_numpy_adds_post_index(self):
+
+        arrays = self.frame.to_numpy()
+
+        self.assertEqual(arrays["periodStartedAt"].tolist(), [2000, 1000])
+        self.assertEqual(arrays["post_index"].tolist(), [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
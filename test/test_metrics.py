@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from requests.models import Response
+
+from medium_stats.metrics import JsonSummarySink
+from medium_stats.metrics import Metrics
+from medium_stats.metrics import PrometheusTextfileSink
+from medium_stats.metrics import request_labels
+from medium_stats.metrics import sink_for_path
+from medium_stats.scraper import StatGrabberUser
+
+
+def fake_response(body, url=""):
+    response = Response()
+    response.status_code = 200
+    response._content = body
+    response.url = url
+    return response
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counters_and_histograms_keyed_by_labels(self):
+
+        metrics = Metrics()
+        metrics.inc("requests_total", endpoint="summary")
+        metrics.inc("requests_total", 2, endpoint="summary")
+        metrics.inc("requests_total", endpoint="graphql", operation="StatsPostChart")
+        for seconds in (0.02, 0.3, 45):
+            metrics.observe("request_seconds", seconds, endpoint="summary")
+
+        snapshot = metrics.snapshot()
+        counts = {tuple(c["labels"].values()): c["value"] for c in snapshot["counters"]}
+        self.assertEqual(counts, {("summary",): 3, ("graphql", "StatsPostChart"): 1})
+
+        histogram = snapshot["histograms"][0]
+        self.assertEqual(histogram["count"], 3)
+        self.assertEqual(histogram["buckets"]["0.05"], 1)
+        self.assertEqual(histogram["buckets"]["0.5"], 2)
+        self.assertEqual(histogram["buckets"]["+Inf"], 3)
+
+    def test_request_labels(self):
+
+        self.assertEqual(request_labels("https://medium.com/@user/stats?limit=50"), {"endpoint": "summary"})
+        self.assertEqual(
+            request_labels("https://medium.com/_/graphql", {"operationName": "StatsPostChartBatch"}),
+            {"endpoint": "graphql", "operation": "StatsPostChartBatch"},
+        )
+
+    def test_prometheus_textfile_format(self):
+
+        metrics = Metrics()
+        metrics.inc("requests_total", endpoint="graphql", operation='Say "hi"')
+        metrics.observe("decode_seconds", 0.2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "medium_stats.prom")
+            metrics.add_sink(sink_for_path(path))
+            metrics.flush()
+            with open(path) as f:
+                lines = f.read().splitlines()
+
+        self.assertIn("# TYPE medium_stats_requests_total counter", lines)
+        self.assertIn('medium_stats_requests_total{endpoint="graphql",operation="Say \\"hi\\""} 1', lines)
+        self.assertIn('medium_stats_decode_seconds_bucket{le="0.1"} 0', lines)
+        self.assertIn('medium_stats_decode_seconds_bucket{le="0.25"} 1', lines)
+        self.assertIn("medium_stats_decode_seconds_count 1", lines)
+
+    def test_json_sink_writes_snapshot(self):
+
+        metrics = Metrics()
+        metrics.inc("retries_total", reason="429")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            self.assertIsInstance(sink_for_path(path), JsonSummarySink)
+            metrics.add_sink(sink_for_path(path))
+            metrics.flush()
+            with open(path) as f:
+                written = json.load(f)
+
+        self.assertEqual(written, metrics.snapshot())
+        self.assertIsInstance(sink_for_path("-"), JsonSummarySink)
+        self.assertIsInstance(sink_for_path("out.prom"), PrometheusTextfileSink)
+
+
+class TestGrabberInstrumentation(unittest.TestCase):
+    def setUp(self):
+
+        self.metrics = Metrics()
+        self.sg = StatGrabberUser(
+            "user", "sid", "uid", datetime(2020, 1, 1), datetime(2020, 2, 1), metrics=self.metrics
+        )
+
+    def counter(self, name, **labels):
+
+        for c in self.metrics.snapshot()["counters"]:
+            if c["name"] == name and c["labels"] == labels:
+                return c["value"]
+
+    def histogram(self, name, **labels):
+
+        for h in self.metrics.snapshot()["histograms"]:
+            if h["name"] == name and h["labels"] == labels:
+                return h
+
+    def test_fetch_and_decode_recorded_per_endpoint(self):
+
+        body = b'])}while(1);</x>{"payload":{"value":[]}}'
+        url = "https://medium.com/@user/stats"
+        with patch.object(self.sg.session, "get", return_value=fake_response(body, url)):
+            self.sg._decode_json(self.sg._fetch(url))
+
+        self.assertEqual(self.counter("requests_total", endpoint="summary"), 1)
+        self.assertEqual(self.counter("response_bytes_total", endpoint="summary"), len(body))
+        self.assertEqual(self.histogram("request_seconds", endpoint="summary")["count"], 1)
+        self.assertEqual(self.histogram("decode_seconds", endpoint="summary")["count"], 1)
+
+    def test_story_stats_recorded_per_operation(self):
+
+        body = b'{"data":{"post":{"id":"a"}}}'
+        with patch.object(self.sg.session, "post", return_value=fake_response(body)):
+            self.sg.get_story_stats("a", type_="referrer")
+
+        labels = {"endpoint": "graphql", "operation": "StatsPostReferrersContainer"}
+        self.assertEqual(self.counter("requests_total", **labels), 1)
+        self.assertEqual(self.histogram("request_seconds", **labels)["count"], 1)
+
+    def test_write_json_recorded_per_format(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.sg.write_json({"a": [1, 2]}, os.path.join(tmp, "out"), format_="ndjson")
+            size = os.path.getsize(path)
+
+        self.assertEqual(self.counter("written_bytes_total", format="ndjson"), size)
+        self.assertEqual(self.histogram("write_seconds", format="ndjson")["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
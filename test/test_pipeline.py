@@ -0,0 +1,67 @@
+import threading
+import time
+import unittest
+
+from medium_stats.pipeline import FeedAborted
+from medium_stats.pipeline import PostIdFeed
+
+
+class TestPostIdFeed(unittest.TestCase):
+    def test_iterates_items_in_order_until_closed(self):
+
+        feed = PostIdFeed()
+        for post_id in ["a1", "a2", "a3"]:
+            feed.put(post_id)
+        feed.close()
+
+        self.assertEqual(list(feed), ["a1", "a2", "a3"])
+
+    def test_put_blocks_while_full_until_consumer_catches_up(self):
+
+        feed = PostIdFeed(maxsize=1)
+
+        def produce():
+            for post_id in ["a1", "a2", "a3"]:
+                feed.put(post_id)
+            feed.close()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        time.sleep(0.05)
+
+        # a1 is queued, a2 waits for room
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(list(feed), ["a1", "a2", "a3"])
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+
+    def test_cancel_releases_blocked_producer(self):
+
+        feed = PostIdFeed(maxsize=1)
+        producer = threading.Thread(target=lambda: [feed.put(post_id) for post_id in ["a1", "a2", "a3"]])
+        producer.start()
+        time.sleep(0.05)
+
+        feed.cancel()
+        producer.join(1)
+
+        self.assertFalse(producer.is_alive())
+
+    def test_producer_failure_raises_in_consumer(self):
+
+        feed = PostIdFeed()
+        feed.put("a1")
+        error = RuntimeError("page 3 failed")
+        feed.close(error)
+
+        received = []
+        with self.assertRaises(FeedAborted) as ctx:
+            for post_id in feed:
+                received.append(post_id)
+
+        self.assertEqual(received, ["a1"])
+        self.assertIs(ctx.exception.__cause__, error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import requests
+from requests.models import Response
+
+from medium_stats.metrics import Metrics
+from medium_stats.scheduler import RequestScheduler
+from medium_stats.scheduler import ScheduledAdapter
+from medium_stats.scheduler import parse_retry_after
+
+
+def fake_response(status_code, headers=None):
+    response = Response()
+    response.status_code = status_code
+    response._content = b"{}"
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_delta_seconds(self):
+
+        self.assertEqual(parse_retry_after("7"), 7.0)
+
+    def test_http_date(self):
+
+        in_ten = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 10))
+        self.assertAlmostEqual(parse_retry_after(in_ten), 10, delta=2)
+
+    def test_missing_or_garbage_returns_none(self):
+
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_token_bucket_limits_rate(self):
+
+        scheduler = RequestScheduler(rate=50, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            scheduler.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(scheduler.stats()["requests"], 6)
+
+    def test_retry_budget_shared_across_requests(self):
+
+        scheduler = RequestScheduler(max_retries=5, retry_budget=2)
+
+        self.assertTrue(scheduler.spend_retry(0))
+        self.assertTrue(scheduler.spend_retry(0))
+        self.assertFalse(scheduler.spend_retry(0))
+        self.assertEqual(scheduler.stats()["budget_exhausted"], 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+
+        scheduler = RequestScheduler(backoff_base=1, backoff_max=4)
+        delays = [scheduler.backoff(10) for _ in range(20)]
+
+        self.assertTrue(all(0 <= d <= 4 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_max_in_flight_caps_concurrent_slots(self):
+
+        scheduler = RequestScheduler(max_in_flight=2)
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def send():
+            with scheduler.slot():
+                with lock:
+                    in_flight[0] += 1
+                    peak[0] = max(peak[0], in_flight[0])
+                time.sleep(0.01)
+                with lock:
+                    in_flight[0] -= 1
+
+        threads = [threading.Thread(target=send) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(peak[0], 2)
+
+
+@patch("medium_stats.scheduler.time.sleep")
+class TestScheduledAdapter(unittest.TestCase):
+    def setUp(self):
+
+        self.scheduler = RequestScheduler(max_retries=3)
+        self.session = requests.Session()
+        self.session.mount("https://", ScheduledAdapter(scheduler=self.scheduler))
+
+    def test_retries_until_success(self, mock_sleep):
+
+        responses = [fake_response(503), fake_response(429), fake_response(200)]
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=responses):
+            response = self.session.get("https://medium.com/@user/stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.scheduler.stats()["retries"], 2)
+
+    def test_retried_responses_release_their_connections(self, mock_sleep):
+
+        responses = [fake_response(503), fake_response(200)]
+        for r in responses:
+            r.raw = MagicMock()
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=responses):
+            self.session.get("https://medium.com/@user/stats")
+
+        responses[0].raw.release_conn.assert_called_once()
+        responses[1].raw.release_conn.assert_not_called()
+
+    def test_retry_after_header_pauses_all_workers(self, mock_sleep):
+
+        responses = [fake_response(429, {"Retry-After": "12"}), fake_response(200)]
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=responses):
+            with patch.object(self.scheduler, "acquire"):
+                self.session.get("https://medium.com/@user/stats")
+
+        self.assertGreater(self.scheduler._paused_until - time.monotonic(), 10)
+        self.assertEqual(self.scheduler.stats()["backoff_seconds"], 12)
+
+    def test_gives_up_after_max_retries(self, mock_sleep):
+
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=[fake_response(500)] * 4) as send:
+            response = self.session.get("https://medium.com/@user/stats")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(send.call_count, 4)
+
+    def test_connection_errors_are_retried(self, mock_sleep):
+
+        side_effect = [requests.exceptions.ConnectionError("reset"), fake_response(200)]
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=side_effect):
+            response = self.session.get("https://medium.com/@user/stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.scheduler.stats()["connection_errors"], 1)
+
+    def test_retries_counted_per_endpoint_into_metrics(self, mock_sleep):
+
+        metrics = Metrics()
+        self.session.mount("https://", ScheduledAdapter(scheduler=self.scheduler, metrics=metrics))
+        responses = [fake_response(503), fake_response(200)]
+        with patch("requests.adapters.HTTPAdapter.send", side_effect=responses):
+            self.session.post("https://medium.com/_/graphql", json={"operationName": "StatsPostChart"})
+
+        counters = metrics.snapshot()["counters"]
+        labels = {"endpoint": "graphql", "operation": "StatsPostChart", "reason": "503"}
+        self.assertEqual(counters, [{"name": "retries_total", "labels": labels, "value": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,24 @@
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
 from datetime import datetime
+from unittest.mock import MagicMock
+from unittest.mock import patch
 
 import requests
 
+from medium_stats.cache import PublicationIdCache
+from medium_stats.scraper import BatchRejectedError
 from medium_stats.scraper import StatGrabberBase
 from medium_stats.scraper import StatGrabberPublication
 from medium_stats.scraper import StatGrabberUser
+from medium_stats.scraper import batch_rejection_pattern
+from medium_stats.scraper import build_batch_query
+from medium_stats.scraper import decode_payload
+from medium_stats.scraper import merge_post_shards
 
 
 class TestStatGrabberBase(unittest.TestCase):
@@ -69,7 +82,12 @@ class TestStatGrabberBase(unittest.TestCase):
 
     # def test_decode_json_raises_type_error_if_param_is_not_response(self):
 
-    # def test_decode_json_returns_valid_json_dict(self):
+    def test_decode_json_returns_valid_json_dict(self):
+
+        sg = StatGrabberBase("sid", "uid", self.valid_start, self.valid_stop)
+        response = MagicMock(content=b'])}while(1);</x>{"success":true,"payload":{"value":[1]}}')
+
+        self.assertEqual(sg._decode_json(response), {"value": [1]})
 
     # TODO - mock input has to be a response object with "while" text and json with "payload" as a key
 
@@ -98,17 +116,415 @@ class TestStatGrabberBase(unittest.TestCase):
             sg.get_story_stats("foobar", True)
             sg.get_story_stats("foobar", "views_read")
 
+    def test_init_concurrency_param_must_be_positive(self):
+
+        with self.assertRaises(ValueError):
+            StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, concurrency=0)
+
+    def test_get_all_story_stats_concurrent_preserves_input_order(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, concurrency=4)
+        post_ids = ["a1", "a2", "a3", "a4", "a5"]
+
+        def fake_story_stats(post_id, type_="view_read", **kwargs):
+            # make earlier posts finish last
+            time.sleep(0.01 * (len(post_ids) - post_ids.index(post_id)))
+            return {"data": {"post": {"id": post_id}}}
+
+        with patch.object(sg, "get_story_stats", side_effect=fake_story_stats):
+            data = sg.get_all_story_stats(post_ids)
+
+        self.assertEqual([p["id"] for p in data["data"]["post"]], post_ids)
+
+    def test_get_all_story_stats_concurrent_matches_sequential_output(self):
+
+        post_ids = ["a1", "a2", "a3"]
+        fake_story_stats = lambda post_id, type_="view_read", **kwargs: {
+            "data": {"post": {"id": post_id, "type": type_}}
+        }
+
+        results = []
+        for n in [1, 3]:
+            sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, concurrency=n)
+            with patch.object(sg, "get_story_stats", side_effect=fake_story_stats):
+                results.append(sg.get_all_story_stats(post_ids, type_="referrer"))
+
+        self.assertEqual(results[0], results[1])
+
+    def fake_batch_post(self, max_batch=None):
+        # answers aliased batch queries, rejecting any batch larger than max_batch
+        def post(url, json):
+            variables = json["variables"]
+            aliases = sorted(k for k in variables if k.startswith("p"))
+            response = MagicMock(status_code=200)
+            if max_batch and len(aliases) > max_batch:
+                response.status_code = 413
+            response.json.return_value = {"data": {a: {"id": variables[a]} for a in aliases}}
+            return response
+
+        return post
+
+    def test_batch_rejection_pattern_only_matches_size_errors(self):
+
+        rejections = ["Query is too complex", "Max query size exceeded", "Query depth limit exceeded"]
+        rejections += ["Too many aliases in query"]
+        others = ["Rate limit exceeded", "Too many requests", "Quota exceeded for this user", "Post not found"]
+
+        self.assertTrue(all(batch_rejection_pattern.search(m) for m in rejections))
+        self.assertFalse(any(batch_rejection_pattern.search(m) for m in others))
+
+    def test_build_batch_query_aliases_each_post(self):
+
+        operation, query = build_batch_query("view_read", 3)
+
+        self.assertEqual(operation, "StatsPostChartBatch")
+        for i in range(3):
+            self.assertIn(f"p{i}: post(id: $p{i})", query)
+        self.assertIn("$startAt: Long!", query)
+        self.assertEqual(query.count("fragment StatsPostChart_dailyStats"), 1)
+
+    def test_build_batch_query_referrer_has_no_period_variables(self):
+
+        operation, query = build_batch_query("referrer", 2)
+
+        self.assertEqual(operation, "StatsPostReferrersContainerBatch")
+        self.assertNotIn("$startAt", query)
+
+    def test_get_all_story_stats_batched_splits_results_in_order(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, batch_size=2)
+        post_ids = ["a1", "a2", "a3", "a4", "a5"]
+
+        with patch.object(sg.session, "post", side_effect=self.fake_batch_post()) as mock_post:
+            data = sg.get_all_story_stats(post_ids)
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(data, {"data": {"post": [{"id": p} for p in post_ids]}})
+
+    def test_get_all_story_stats_batched_shrinks_when_rejected(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, batch_size=8)
+        post_ids = [f"a{i}" for i in range(8)]
+
+        with patch.object(sg.session, "post", side_effect=self.fake_batch_post(max_batch=3)):
+            data = sg.get_all_story_stats(post_ids)
+
+        self.assertEqual(sg.batch_size, 2)
+        self.assertEqual([p["id"] for p in data["data"]["post"]], post_ids)
+
+    def test_get_story_stats_batch_raises_when_single_post_rejected(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, batch_size=2)
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"errors": [{"message": "Query is too complex"}]}
+
+        with patch.object(sg.session, "post", return_value=response):
+            with self.assertRaises(BatchRejectedError):
+                sg.get_all_story_stats(["a1"])
+
+    def test_get_all_story_stats_since_requests_per_post_window(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop)
+        since = {"a2": sg.start_unix + 1000, "a3": sg.start_unix - 1000}
+        starts = {}
+
+        def fake_story_stats(post_id, type_="view_read", start_unix=None, end_unix=None):
+            starts[post_id] = start_unix
+            return {"data": {"post": {"id": post_id}}}
+
+        with patch.object(sg, "get_story_stats", side_effect=fake_story_stats):
+            data = sg.get_all_story_stats(["a1", "a2", "a3"], since=since)
+
+        # marks earlier than the requested period never widen the window
+        expected = {"a1": sg.start_unix, "a2": sg.start_unix + 1000, "a3": sg.start_unix}
+        self.assertEqual(starts, expected)
+        self.assertEqual([p["id"] for p in data["data"]["post"]], ["a1", "a2", "a3"])
+
+    def test_get_all_story_stats_sharded_merges_windows_in_order(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, concurrency=4, shard_days=10)
+        day = 24 * 60 * 60 * 1000
+        windows = []
+
+        def fake_story_stats(post_id, type_="view_read", start_unix=None, end_unix=None):
+            windows.append((post_id, start_unix, end_unix))
+            daily = [{"periodStartedAt": t} for t in (start_unix, end_unix - day)]
+            return {"data": {"post": {"id": post_id, "dailyStats": daily}}}
+
+        with patch.object(sg, "get_story_stats", side_effect=fake_story_stats):
+            data = sg.get_all_story_stats(["a1", "a2"])
+
+        # a 31 day period in 10 day shards
+        shards = sorted({(s, e) for _, s, e in windows})
+        self.assertEqual(len(shards), 4)
+        self.assertEqual((shards[0][0], shards[-1][1]), (sg.start_unix, sg.stop_unix))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(shards, shards[1:])))
+
+        posts = data["data"]["post"]
+        self.assertEqual([p["id"] for p in posts], ["a1", "a2"])
+        periods = [d["periodStartedAt"] for d in posts[0]["dailyStats"]]
+        self.assertEqual(periods, sorted(set(periods)))
+        self.assertEqual(len(periods), 8)
+
+    def test_get_all_story_stats_sharded_posts_share_batched_shards(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, batch_size=4, shard_days=10)
+        day = 24 * 60 * 60 * 1000
+        since = {"a2": sg.start_unix + 15 * day}
+
+        with patch.object(sg.session, "post", side_effect=self.fake_batch_post()) as mock_post:
+            data = sg.get_all_story_stats(["a1", "a2"], since=since)
+
+        # a1 covers all 4 shards; a2 starts mid-way through the second and rides along from the third
+        self.assertEqual(mock_post.call_count, 5)
+        self.assertEqual([p["id"] for p in data["data"]["post"]], ["a1", "a2"])
+
+    def test_iter_story_stats_stream_requests_batches_before_input_ends(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, batch_size=2)
+        requests_before = {}
+
+        with patch.object(sg.session, "post", side_effect=self.fake_batch_post()) as mock_post:
+
+            def arriving():
+                for post_id in ["a1", "a2", "a1", "a3"]:
+                    requests_before[post_id] = mock_post.call_count
+                    yield post_id
+
+            posts = list(sg.iter_story_stats_stream(arriving()))
+
+        # a1 & a2's batch went out before a3 arrived; the partial last batch once the input ended
+        self.assertEqual(requests_before["a3"], 1)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual([p["id"] for p in posts], ["a1", "a2", "a3"])
+
+    def test_iter_story_stats_stream_matches_sharded_batched_output(self):
+
+        day = 24 * 60 * 60 * 1000
+        kwargs = {"concurrency": 3, "batch_size": 2, "shard_days": 10}
+        post_ids = [f"a{i}" for i in range(5)]
+        since = {"a1": self.valid_start.timestamp() * 1000 + 15 * day, "a3": 0}
+
+        def fake_post():
+            def post(url, json):
+                variables = json["variables"]
+                daily = [{"periodStartedAt": variables["startAt"]}, {"periodStartedAt": variables["endAt"] - day}]
+                response = MagicMock(status_code=200)
+                response.json.return_value = {
+                    "data": {a: {"id": variables[a], "dailyStats": daily} for a in variables if a.startswith("p")}
+                }
+                return response
+
+            return post
+
+        results = []
+        for method in ("get_all_story_stats", "iter_story_stats_stream"):
+            sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, **kwargs)
+            with patch.object(sg.session, "post", side_effect=fake_post()), sg.shared_pool():
+                posts = getattr(sg, method)(iter(post_ids), since=dict(since))
+                results.append(posts["data"]["post"] if isinstance(posts, dict) else list(posts))
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[1][0]["dailyStats"]), 8)
+
+    def test_shard_days_must_be_positive(self):
+
+        with self.assertRaises(ValueError):
+            StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, shard_days=0)
+
+    def test_merge_post_shards_dedupes_daily_rows(self):
+
+        shards = [
+            {
+                "id": "a1",
+                "dailyStats": [{"periodStartedAt": 2, "views": 5}, {"periodStartedAt": 1, "views": 4}],
+                "earnings": {"dailyEarnings": [{"periodStartedAt": 1}], "lastCommittedPeriodStartedAt": 1},
+            },
+            {
+                "id": "a1",
+                "dailyStats": [{"periodStartedAt": 2, "views": 5}, {"periodStartedAt": 3, "views": 6}],
+                "earnings": {"dailyEarnings": [{"periodStartedAt": 3}], "lastCommittedPeriodStartedAt": None},
+            },
+        ]
+
+        merged = merge_post_shards(shards)
+
+        self.assertEqual([d["views"] for d in merged["dailyStats"]], [4, 5, 6])
+        self.assertEqual([d["periodStartedAt"] for d in merged["earnings"]["dailyEarnings"]], [1, 3])
+        self.assertEqual(merged["earnings"]["lastCommittedPeriodStartedAt"], 1)
+        self.assertIs(merge_post_shards(shards[:1]), shards[0])
+
+    def test_get_story_stats_frame_packs_daily_stats(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, concurrency=2)
+
+        def fake_story_stats(post_id, type_="view_read", start_unix=None, end_unix=None):
+            daily = [{"__typename": "DailyPostStat", "periodStartedAt": 1000, "views": len(post_id)}]
+            return {"data": {"post": {"id": post_id, "dailyStats": daily}}}
+
+        with patch.object(sg, "get_story_stats", side_effect=fake_story_stats):
+            frame = sg.get_story_stats_frame(["a1", "a22"])
+
+        self.assertEqual(frame.post_ids, ["a1", "a22"])
+        self.assertEqual(list(frame.columns["views"]), [2, 3])
+        self.assertEqual(list(frame.columns["periodStartedAt"]), [1000, 1000])
+
+    def test_shared_pool_interleaves_concurrent_callers_under_one_cap(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop, concurrency=2)
+        lock, calls, in_flight, peak = threading.Lock(), [], [0], [0]
+
+        def work(item):
+            with lock:
+                calls.append(item)
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return item
+
+        results = {}
+        with sg.shared_pool():
+            threads = [
+                threading.Thread(
+                    target=lambda t=t: results.update({t: list(sg._map(work, [(t, i) for i in range(4)]))})
+                )
+                for t in "ab"
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results["a"], [("a", i) for i in range(4)])
+        self.assertEqual(results["b"], [("b", i) for i in range(4)])
+        self.assertEqual(peak[0], 2)
+        # neither caller waits for the other to finish its whole list
+        self.assertLess(calls.index(("b", 0)), calls.index(("a", 3)))
+        self.assertLess(calls.index(("a", 0)), calls.index(("b", 3)))
+        self.assertIsNone(sg._pool)
+
+    def test_gather_runs_calls_side_by_side_returning_results_in_order(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop)
+        # each call only returns once the other has started
+        barrier = threading.Barrier(2, timeout=1)
+
+        def fetch(name):
+            barrier.wait()
+            return name
+
+        self.assertEqual(sg.gather(lambda: fetch("views"), lambda: fetch("visitors")), ["views", "visitors"])
+
+    def test_gather_raises_first_failure_after_every_call_finished(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop)
+        finished = []
+
+        def slow():
+            time.sleep(0.05)
+            finished.append("slow")
+            return "slow"
+
+        def failing():
+            raise RuntimeError("events endpoint down")
+
+        with self.assertRaises(RuntimeError):
+            sg.gather(failing, slow)
+        self.assertEqual(finished, ["slow"])
+
+        results = sg.gather(failing, slow, return_exceptions=True)
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertEqual(results[1], "slow")
+
+    def test_write_json_streams_iterables_as_indented_array(self):
+
+        sg = StatGrabberBase("foo", "bar", self.valid_start, self.valid_stop)
+        records = [{"postId": "a1", "views": [1, 2]}, {"postId": "a2"}]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = sg.write_json(iter(records), os.path.join(tmp, "out"))
+            with open(path) as f:
+                written = f.read()
+
+        self.assertEqual(written, json.dumps(records, indent=2))
+
     # def test_get_story_stats_returns_json_dict(self):
 
     # def test_get_story_stats_makes_post_request(self):
 
 
+class TestDecodePayload(unittest.TestCase):
+    body = '])}while(1);</x>{"success":true,"payload":{"value":[{"title":"caf\u00e9 \u2013 notes"}]}}'
+
+    def test_bytes_and_str_bodies_decode_alike(self):
+
+        expected = {"value": [{"title": "caf\u00e9 \u2013 notes"}]}
+        self.assertEqual(decode_payload(self.body.encode()), expected)
+        self.assertEqual(decode_payload(self.body), expected)
+
+    def test_unprefixed_body_decodes(self):
+
+        self.assertEqual(decode_payload(b'{"payload":{"a":1}}'), {"a": 1})
+
+    def test_stdlib_fallback_without_orjson(self):
+
+        with patch("medium_stats.scraper.orjson", None):
+            self.assertEqual(decode_payload(self.body.encode()), decode_payload(self.body))
+
+
+def fake_pages(n_pages, per_page=2):
+    # decoded payloads chained by "paging.next" cursors, like Medium's stats pages
+    pages = []
+    for i in range(n_pages):
+        page = {"value": [{"postId": f"p{i}_{j}"} for j in range(per_page)], "paging": {}}
+        if i < n_pages - 1:
+            page["paging"]["next"] = {"to": f"cursor{i + 1}"}
+        pages.append(page)
+    return pages
+
+
 class TestStatGrabberUser(unittest.TestCase):
+    def setUp(self):
+
+        self.sg = StatGrabberUser("user", "foo", "bar", datetime(2020, 1, 1), datetime(2020, 2, 1))
+
     def test_class_inherits_from_StatGrabberBase(self):
 
         subclassed = issubclass(StatGrabberUser, (StatGrabberBase))
         self.assertTrue(subclassed)
 
+    def test_iter_summary_stats_follows_paging_cursors(self):
+
+        with patch.object(self.sg, "_fetch") as mock_fetch, patch.object(
+            self.sg, "_decode_json", side_effect=fake_pages(3)
+        ):
+            records = list(self.sg.iter_summary_stats(limit=2))
+
+        self.assertEqual(len(records), 6)
+        self.assertEqual(mock_fetch.call_count, 3)
+        last_params = mock_fetch.call_args.kwargs["params"]
+        self.assertEqual(last_params["to"], "cursor2")
+
+    def test_iter_summary_stats_is_lazy(self):
+
+        with patch.object(self.sg, "_fetch") as mock_fetch, patch.object(
+            self.sg, "_decode_json", side_effect=fake_pages(3)
+        ):
+            records = self.sg.iter_summary_stats()
+            next(records)
+
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    def test_get_summary_stats_handles_deep_pagination(self):
+
+        with patch.object(self.sg, "_fetch"), patch.object(self.sg, "_decode_json", side_effect=fake_pages(2000, 1)):
+            records = self.sg.get_summary_stats()
+
+        self.assertIsInstance(records, list)
+        self.assertEqual(len(records), 2000)
+
     # def test_events_true_param_triggers_call_to_totals_endpoint(self):
 
     # def test_events_false_param_triggers_call_to_stats_url(self):
@@ -140,6 +556,82 @@ class TestStatGrabberPublication(unittest.TestCase):
         subclassed = issubclass(StatGrabberPublication, (StatGrabberBase))
         self.assertTrue(subclassed)
 
+    def setUp(self):
+
+        self.start, self.stop = datetime(2020, 1, 1), datetime(2020, 2, 1)
+        self.homepage = {"collection": {"id": "c1", "slug": "pub", "name": "Pub", "creatorId": "u1", "description": ""}}
+
+    def test_get_all_story_overview_collects_every_page(self):
+
+        with patch.object(StatGrabberPublication, "_fetch") as mock_fetch, patch.object(
+            StatGrabberPublication, "_decode_json", side_effect=fake_pages(3)
+        ):
+            sg = StatGrabberPublication("pub", "foo", "bar", self.start, self.stop)
+            stories = sg.get_all_story_overview()
+
+        self.assertEqual([s["postId"] for s in stories][-2:], ["p2_0", "p2_1"])
+        self.assertEqual(len(stories), 6)
+        # the homepage is never needed for the overview
+        self.assertEqual(mock_fetch.call_count, 3)
+
+    def test_attrs_loaded_from_homepage_once_on_first_use(self):
+
+        with patch.object(StatGrabberPublication, "_fetch") as mock_fetch, patch.object(
+            StatGrabberPublication, "_decode_json", return_value=self.homepage
+        ):
+            sg = StatGrabberPublication("pub", "foo", "bar", self.start, self.stop)
+            self.assertEqual(mock_fetch.call_count, 0)
+
+            self.assertEqual((sg.name, sg.id, sg.creator), ("Pub", "c1", "u1"))
+            self.assertIn("/collections/c1/stats/views", sg.views_endpoint)
+
+        mock_fetch.assert_called_once_with("https://medium.com/pub")
+
+    def test_collection_id_param_skips_homepage(self):
+
+        with patch.object(StatGrabberPublication, "_fetch") as mock_fetch, patch.object(
+            StatGrabberPublication, "_decode_json", return_value={"value": []}
+        ):
+            sg = StatGrabberPublication("pub", "foo", "bar", self.start, self.stop, collection_id="c9")
+            sg.get_events(type_="visitors")
+
+        mock_fetch.assert_called_once_with(sg.visitors_endpoint)
+        self.assertIn("/collections/c9/stats/visitors", sg.visitors_endpoint)
+
+    def test_get_all_events_fetches_types_side_by_side_after_one_homepage_load(self):
+        def decode(response):
+            url = response.url
+            if url == "https://medium.com/pub":
+                return self.homepage
+            return {"value": [{"type": url.split("/stats/")[1].split("?")[0]}]}
+
+        with patch.object(StatGrabberPublication, "_fetch", side_effect=lambda url: MagicMock(url=url)) as mock_fetch:
+            with patch.object(StatGrabberPublication, "_decode_json", side_effect=decode):
+                sg = StatGrabberPublication("pub", "foo", "bar", self.start, self.stop)
+                events = sg.get_all_events()
+
+        self.assertEqual(events, {"views": [{"type": "views"}], "visitors": [{"type": "visitors"}]})
+        self.assertEqual(mock_fetch.call_count, 3)
+        self.assertEqual(mock_fetch.call_args_list[0][0][0], "https://medium.com/pub")
+
+    def test_id_cache_filled_by_homepage_and_reused(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.object(StatGrabberPublication, "_fetch") as mock_fetch, patch.object(
+                StatGrabberPublication, "_decode_json", return_value=self.homepage
+            ):
+                first = StatGrabberPublication(
+                    "pub", "foo", "bar", self.start, self.stop, id_cache=PublicationIdCache(tmp)
+                )
+                _ = first.id
+                # a later run reads the id back from disk
+                second = StatGrabberPublication(
+                    "pub", "foo", "bar", self.start, self.stop, id_cache=PublicationIdCache(tmp)
+                )
+                self.assertEqual(second.id, "c1")
+
+        self.assertEqual(mock_fetch.call_count, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
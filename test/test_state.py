@@ -0,0 +1,226 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.harness import RedirectAdapter
+from benchmarks.mock_server import MockMediumConfig
+from benchmarks.mock_server import MockMediumServer
+from medium_stats.__main__ import build_shared
+from medium_stats.__main__ import scrape
+from medium_stats.cli import get_argparser
+from medium_stats.cli import parse_scraper_args
+from medium_stats.state import STATE_FILENAME
+from medium_stats.state import FingerprintIndex
+from medium_stats.state import ScrapeState
+from medium_stats.state import fingerprint
+
+
+class TestScrapeState(unittest.TestCase):
+    def setUp(self):
+
+        self.sub_dir = tempfile.mkdtemp()
+        self.posts = [
+            {"id": "a1", "dailyStats": [{"periodStartedAt": 100}, {"periodStartedAt": 300}]},
+            {"id": "a2", "dailyStats": []},
+            None,
+        ]
+
+    def tearDown(self):
+
+        shutil.rmtree(self.sub_dir)
+
+    def test_load_missing_file_returns_empty_marks(self):
+
+        state = ScrapeState.load(self.sub_dir)
+        self.assertEqual(state.get_marks("articles"), {})
+
+    def test_update_records_latest_period_per_post(self):
+
+        state = ScrapeState.load(self.sub_dir)
+        marks = state.update("articles", self.posts)
+
+        self.assertEqual(marks, {"a1": 300})
+
+    def test_update_never_moves_mark_backwards(self):
+
+        state = ScrapeState(os.path.join(self.sub_dir, STATE_FILENAME), {"articles": {"a1": 500}})
+        state.update("articles", self.posts)
+
+        self.assertEqual(state.get_marks("articles")["a1"], 500)
+
+    def test_save_round_trips_through_load(self):
+
+        state = ScrapeState.load(self.sub_dir)
+        state.update("articles", self.posts)
+        path = state.save()
+
+        self.assertEqual(path, os.path.join(self.sub_dir, STATE_FILENAME))
+        self.assertEqual(ScrapeState.load(self.sub_dir).get_marks("articles"), {"a1": 300})
+
+
+class TestFingerprintIndex(unittest.TestCase):
+    def setUp(self):
+
+        self.sub_dir = tempfile.mkdtemp()
+        self.records = [
+            {"postId": "a1", "title": "One", "views": 10, "reads": 2, "claps": 1},
+            {"postId": "a2", "title": "Two", "views": 5, "reads": 0, "claps": 0},
+        ]
+
+    def tearDown(self):
+
+        shutil.rmtree(self.sub_dir)
+
+    def current(self):
+
+        return {r["postId"]: fingerprint(r) for r in self.records}
+
+    def test_fingerprint_only_depends_on_totals(self):
+
+        renamed = {**self.records[0], "title": "Renamed"}
+        read = {**self.records[0], "reads": 3}
+
+        self.assertEqual(fingerprint(renamed), fingerprint(self.records[0]))
+        self.assertNotEqual(fingerprint(read), fingerprint(self.records[0]))
+
+    def test_changed_returns_new_and_updated_posts_per_mode(self):
+
+        index = FingerprintIndex.load(self.sub_dir)
+        self.assertEqual(index.changed("articles", self.current()), ["a1", "a2"])
+
+        index.update("articles", self.current())
+        index.save()
+        self.records[1]["views"] = 6
+
+        index = FingerprintIndex.load(self.sub_dir)
+        self.assertEqual(index.changed("articles", self.current()), ["a2"])
+        # fingerprints are kept per mode, so referrers never fetched are still "changed"
+        self.assertEqual(index.changed("referrers", self.current()), ["a1", "a2"])
+
+    def test_iter_changed_looks_fingerprints_up_as_posts_arrive(self):
+
+        index = FingerprintIndex("unused", {"articles": self.current()})
+        current = {}
+
+        def arriving():
+            for r in self.records:
+                # the fingerprint is only known once the post's page has arrived
+                current[r["postId"]] = fingerprint({**r, "views": r["views"] + (r["postId"] == "a2")})
+                yield r["postId"]
+
+        self.assertEqual(list(index.iter_changed("articles", arriving(), current)), ["a2"])
+
+    def test_windowed_posts_are_only_unchanged_if_their_window_was_covered(self):
+
+        index = FingerprintIndex.load(self.sub_dir)
+        index.update("articles", self.current(), (100, 500))
+        index.save()
+
+        index = FingerprintIndex.load(self.sub_dir)
+        self.assertEqual(index.changed("articles", self.current(), (200, 500)), [])
+        self.assertEqual(index.changed("articles", self.current(), (50, 500)), ["a1", "a2"])
+        self.assertEqual(index.changed("articles", self.current(), (200, 600)), ["a1", "a2"])
+
+    def test_bare_fingerprints_never_cover_a_window(self):
+
+        # as saved before fetched windows were recorded
+        index = FingerprintIndex("unused", {"articles": self.current()})
+
+        self.assertEqual(index.changed("articles", self.current()), [])
+        self.assertEqual(index.changed("articles", self.current(), (200, 500)), ["a1", "a2"])
+
+
+class TestRepeatedRuns(unittest.TestCase):
+    """Whole "articles" runs against the mock server, which serves the last 3 days of any window"""
+
+    def setUp(self):
+
+        self.work_dir = tempfile.mkdtemp()
+        creds = os.path.join(self.work_dir, "creds.ini")
+        with open(creds, "w") as f:
+            f.write("[bench]\nsid = sid\nuid = uid\n")
+        self.argv = ["scrape_user", "-u", "bench", "--creds", creds, "--mode", "articles", "--no-cache"]
+        self.argv += ["--start", "2020-01-01", "--end", "2020-01-11", "--is-utc", "--output_dir", self.work_dir]
+        self.server = MockMediumServer(MockMediumConfig(posts=3, page_size=2, days=3))
+        self.server.__enter__()
+
+    def tearDown(self):
+
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.work_dir)
+
+    def run_scrape(self, *flags):
+        """Runs the command with extra flags, returning the export of the latest period"""
+
+        parser = get_argparser()
+        args = parse_scraper_args(parser.parse_args([*self.argv, *flags]), parser)
+        cache, scheduler = build_shared(args)
+        adapter = RedirectAdapter(self.server.base_url, scheduler=scheduler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scrape(args, cache, scheduler, adapter)
+
+        folder = os.path.join(self.work_dir, "stats_exports", "bench", "post_events")
+        with open(os.path.join(folder, sorted(os.listdir(folder))[-1])) as f:
+            return json.load(f)
+
+    @staticmethod
+    def days(export):
+
+        return {p["id"]: [d["periodStartedAt"] for d in p["dailyStats"]] for p in export["data"]["post"]}
+
+    def test_rerun_over_same_period_keeps_earlier_days(self):
+
+        first = self.days(self.run_scrape("--incremental"))
+        second = self.run_scrape("--incremental")
+
+        # the re-run only fetched from each post's last day on, but its file still holds the first run's days
+        self.assertEqual(list(self.days(second)), list(first))
+        for post_id, periods in self.days(second).items():
+            self.assertEqual(periods[:3], first[post_id])
+            self.assertEqual(len(periods), 5)
+        self.assertEqual(second["periodBegin"], "2020-01-01T00:00:00")
+
+    def test_new_period_begins_where_marks_left_off(self):
+
+        self.run_scrape("--incremental")
+        later = self.run_scrape("--incremental", "--end", "2020-01-20")
+
+        self.assertEqual(later["periodBegin"], "2020-01-10T00:00:00")
+
+    def test_backfilling_an_earlier_period_ignores_later_marks(self):
+
+        self.run_scrape("--incremental", "--start", "2020-02-01", "--end", "2020-02-10")
+        # run_scrape returns the latest period's export, which is still February's
+        self.run_scrape("--incremental")
+        folder = os.path.join(self.work_dir, "stats_exports", "bench", "post_events")
+        with open(os.path.join(folder, sorted(os.listdir(folder))[0])) as f:
+            january = json.load(f)
+
+        self.assertEqual((january["periodBegin"], january["periodEnd"]), ("2020-01-01T00:00:00", "2020-01-11T00:00:00"))
+        for periods in self.days(january).values():
+            self.assertEqual(periods[0], 1578441600000)  # 2020-01-08, the mock's first day of the window
+
+    def test_changed_only_rerun_carries_skipped_posts_over(self):
+
+        first = self.run_scrape("--changed-only")
+        before = self.server.counters["requests"]
+        second = self.run_scrape("--changed-only")
+
+        # nothing changed, so only the 2 summary pages were fetched, but the period's export has every post
+        self.assertEqual(self.server.counters["requests"] - before, 2)
+        self.assertEqual(second["data"]["post"], first["data"]["post"])
+
+    def test_changed_only_refetches_a_period_not_covered_before(self):
+
+        self.run_scrape("--changed-only")
+        wider = self.run_scrape("--changed-only", "--end", "2020-01-20")
+
+        self.assertEqual(len(wider["data"]["post"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
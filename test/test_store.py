@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from functools import partial
+from unittest.mock import patch
+
+from medium_stats.store import SqliteStore
+from medium_stats.store import open_store
+from medium_stats.store import parse_store_spec
+
+
+def daily_post(post_id, days, views=1):
+    return {
+        "id": post_id,
+        "dailyStats": [
+            {"periodStartedAt": d, "views": views, "internalReferrerViews": 0, "memberTtr": 9} for d in days
+        ],
+        "earnings": {"dailyEarnings": [{"periodStartedAt": days[0], "periodEndedAt": days[0] + 1, "amount": 4}]},
+    }
+
+
+class TestSqliteStore(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "stats.db")
+        self.store = open_store(f"sqlite:{self.path}")
+
+    def tearDown(self):
+
+        self.store.close()
+        self.tmp.cleanup()
+
+    def query(self, sql):
+
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_parse_store_spec(self):
+
+        self.assertEqual(parse_store_spec("sqlite:a/b.db"), ("sqlite", "a/b.db"))
+        with self.assertRaises(ValueError):
+            parse_store_spec("a/b.db")
+
+    def test_summary_records_upserted_per_target_and_post(self):
+
+        records = [{"postId": "a1", "title": "One", "views": 3}, {"postId": "a2", "views": 1}]
+        self.store.write("summary", "alice", iter(records), fetched_at=100)
+        self.store.write("story_overview", "pub", {"data": {"story": records[:1]}}, fetched_at=100)
+        self.store.write("summary", "alice", [{"postId": "a1", "title": "One", "views": 5}], fetched_at=200)
+
+        rows = self.query("SELECT target, post_id, views, fetched_at FROM post_summaries ORDER BY target, post_id")
+        self.assertEqual(rows, [("alice", "a1", 5, 200), ("alice", "a2", 1, 100), ("pub", "a1", 3, 100)])
+
+    def test_overlapping_article_runs_upsert_daily_rows(self):
+
+        self.store.write("articles", "alice", {"data": {"post": iter([daily_post("a1", [1, 2, 3]), None])}}, 100)
+        self.store.write("articles", "alice", {"data": {"post": [daily_post("a1", [3, 4], views=7)]}}, 200)
+
+        rows = self.query("SELECT period_started_at, views FROM post_daily_stats ORDER BY period_started_at")
+        self.assertEqual(rows, [(1, 1), (2, 1), (3, 7), (4, 7)])
+        self.assertEqual(
+            self.query("SELECT post_id, period_started_at, amount FROM post_earnings"), [("a1", 1, 4.0), ("a1", 3, 4.0)]
+        )
+
+    def test_rows_written_in_batches(self):
+
+        batches = []
+
+        class RecordingConnection(sqlite3.Connection):
+            def executemany(self, sql, rows):
+                batches.append((sql.split()[4], len(rows)))
+                return super().executemany(sql, rows)
+
+        connect = partial(sqlite3.connect, factory=RecordingConnection)
+        posts = [daily_post(f"a{i}", [1, 2]) for i in range(5)]
+        with patch("medium_stats.store.BATCH_SIZE", 3), patch("sqlite3.connect", connect):
+            with SqliteStore(self.path) as store:
+                store.write("articles", "alice", {"data": {"post": posts}}, 100)
+
+        self.assertEqual([n for table, n in batches if table == "post_daily_stats"], [3, 3, 3, 1])
+        self.assertEqual(len(self.query("SELECT * FROM post_daily_stats")), 10)
+
+    def test_events_and_referrers(self):
+
+        user_events = {"data": {"events": [{"timestampMs": 10, "views": 2, "reads": 1}]}}
+        pub_events = {
+            "data": {"views": [{"timestampMs": 10, "views": 5}], "visitors": [{"timestampMs": 10, "visitors": 3}]}
+        }
+        referrers = {
+            "data": {
+                "post": [
+                    {
+                        "id": "a1",
+                        "referrers": [
+                            {"type": "DIRECT", "sourceIdentifier": "direct", "totalCount": 9, "site": None},
+                            {
+                                "type": "SITE",
+                                "sourceIdentifier": "x.com",
+                                "totalCount": 1,
+                                "site": {"href": "https://x.com/"},
+                            },
+                        ],
+                    }
+                ]
+            }
+        }
+        self.store.write("events", "alice", user_events, 100)
+        self.store.write("events", "pub", pub_events, 100)
+        self.store.write("referrers", "alice", referrers, 100)
+
+        self.assertEqual(
+            self.query("SELECT target, timestamp_ms, views, reads FROM user_events"), [("alice", 10, 2, 1)]
+        )
+        rows = self.query("SELECT type, count FROM publication_events ORDER BY type")
+        self.assertEqual(rows, [("views", 5), ("visitors", 3)])
+        rows = self.query("SELECT source_identifier, total_count, href FROM post_referrers ORDER BY source_identifier")
+        self.assertEqual(rows, [("direct", 9, None), ("x.com", 1, "https://x.com/")])
+
+    def test_reopening_keeps_schema_and_rows(self):
+
+        self.store.write("summary", "alice", [{"postId": "a1"}], 100)
+        self.store.close()
+
+        with SqliteStore(self.path) as store:
+            store.write("summary", "alice", [{"postId": "a2"}], 100)
+        self.store = SqliteStore(self.path)
+
+        self.assertEqual(len(self.query("SELECT * FROM post_summaries")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
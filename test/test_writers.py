@@ -0,0 +1,175 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+from unittest import mock
+
+from medium_stats.writers import iter_json
+from medium_stats.writers import iter_ndjson
+from medium_stats.writers import output_path
+from medium_stats.writers import output_stem
+from medium_stats.writers import read_json
+from medium_stats.writers import read_ndjson
+from medium_stats.writers import resolve_compression
+from medium_stats.writers import write_records
+
+HAS_ZSTANDARD = bool(find_spec("zstandard"))
+
+
+class TestIterJson(unittest.TestCase):
+    def setUp(self):
+
+        self.container = {
+            "data": {"post": [{"id": "a1", "dailyStats": [{"views": 1}, {"views": 2}]}, None]},
+            "periodBegin": "2020-01-01T00:00:00",
+            "type": "postEvents",
+        }
+
+    def test_indented_output_matches_json_dumps(self):
+
+        for obj in [self.container, {}, [], [1, [2, {}]], "foo"]:
+            self.assertEqual("".join(iter_json(obj, indent=2)), json.dumps(obj, indent=2))
+
+    def test_compact_output_matches_json_dumps(self):
+
+        expected = json.dumps(self.container, separators=(",", ":"))
+        self.assertEqual("".join(iter_json(self.container)), expected)
+
+    def test_lazy_iterables_are_streamed_as_arrays(self):
+
+        records = self.container["data"]["post"]
+        lazy = {**self.container, "data": {"post": (r for r in records)}}
+
+        self.assertEqual("".join(iter_json(lazy, indent=2)), json.dumps(self.container, indent=2))
+
+
+class TestIterNdjson(unittest.TestCase):
+    def test_container_writes_one_line_per_record(self):
+
+        container = {"data": {"post": iter([{"id": "a1"}, {"id": "a2"}])}, "type": "postEvents"}
+        lines = list(iter_ndjson(container))
+
+        self.assertEqual(lines, ['{"id":"a1"}\n', '{"id":"a2"}\n'])
+
+    def test_multiple_collections_are_tagged(self):
+
+        container = {"data": {"views": [{"count": 1}], "visitors": [{"count": 2}]}}
+        lines = [json.loads(line) for line in iter_ndjson(container)]
+
+        self.assertEqual(lines[1], {"collection": "visitors", "record": {"count": 2}})
+
+    def test_plain_list_writes_one_line_per_record(self):
+
+        self.assertEqual(len(list(iter_ndjson([{"a": 1}, {"b": 2}, {"c": 3}]))), 3)
+
+
+class TestWriteRecords(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "stats.json")
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def test_output_path_sets_extension_for_format(self):
+
+        self.assertEqual(output_path("foo_post_events.json", "ndjson"), "foo_post_events.ndjson")
+        self.assertEqual(output_path("foo_post_events", "compact"), "foo_post_events.json")
+        with self.assertRaises(ValueError):
+            output_path("foo", "xml")
+
+    def test_failed_write_leaves_previous_file_and_no_temp_file(self):
+
+        write_records([{"a": 1}], self.path)
+
+        def failing():
+            yield {"a": 2}
+            raise RuntimeError("connection dropped")
+
+        with self.assertRaises(RuntimeError):
+            write_records(failing(), self.path)
+
+        self.assertEqual(os.listdir(self.tmp.name), ["stats.json"])
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), [{"a": 1}])
+
+
+class TestCompressedOutput(unittest.TestCase):
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "stats.json")
+        self.container = {"data": {"post": [{"id": f"a{i}", "views": i} for i in range(100)]}, "type": "postEvents"}
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def test_output_path_appends_compression_suffix(self):
+
+        self.assertEqual(output_path("foo.json", "ndjson", "gzip"), "foo.ndjson.gz")
+        self.assertEqual(output_path("foo.json.gz", "json", "zstd"), "foo.json.zst")
+        self.assertEqual(output_stem("dir/foo.ndjson.zst"), "dir/foo")
+        with self.assertRaises(ValueError):
+            output_path("foo", "json", "bz2")
+
+    def test_gzip_round_trips_json_and_ndjson(self):
+
+        json_path = write_records(self.container, self.path, "json", "gzip")
+        ndjson_path = write_records(self.container, self.path, "ndjson", "gzip")
+
+        self.assertEqual(json_path, self.path + ".gz")
+        self.assertEqual(read_json(json_path), self.container)
+        self.assertEqual(list(read_ndjson(ndjson_path)), self.container["data"]["post"])
+        with gzip.open(json_path, "rt") as f:
+            self.assertEqual(f.read(), json.dumps(self.container, indent=2))
+
+    def test_gzip_header_has_no_temp_file_name(self):
+
+        path = write_records(self.container, self.path, "compact", "gzip")
+
+        with open(path, "rb") as f:
+            self.assertNotIn(b".tmp", f.read(64))
+
+    @unittest.skipUnless(HAS_ZSTANDARD, "zstandard not installed")
+    def test_zstd_round_trips_json_and_ndjson(self):
+
+        json_path = write_records(self.container, self.path, "compact", "zstd")
+        ndjson_path = write_records(self.container, self.path, "ndjson", "zstd")
+
+        self.assertEqual(json_path, self.path + ".zst")
+        self.assertEqual(read_json(json_path), self.container)
+        self.assertEqual(list(read_ndjson(ndjson_path)), self.container["data"]["post"])
+
+    def test_zstd_falls_back_to_gzip_without_zstandard(self):
+
+        with mock.patch("medium_stats.writers.find_spec", return_value=None), mock.patch("builtins.print"):
+            self.assertEqual(resolve_compression("zstd"), "gzip")
+            path = write_records(self.container, self.path, "json", "zstd")
+
+        self.assertEqual(path, self.path + ".gz")
+        self.assertEqual(read_json(path), self.container)
+
+    def test_failed_compressed_write_leaves_no_temp_file(self):
+        def failing():
+            yield {"a": 1}
+            raise RuntimeError("connection dropped")
+
+        with self.assertRaises(RuntimeError):
+            write_records({"data": {"post": failing()}}, self.path, "ndjson", "gzip")
+
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_plain_files_read_back_too(self):
+
+        write_records(self.container, self.path, "ndjson")
+
+        self.assertEqual(len(list(read_ndjson(output_path(self.path, "ndjson")))), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()